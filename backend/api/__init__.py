@@ -4,6 +4,7 @@ from .auth.controller import router as auth_router
 from .account.controller import router as account_router
 from .users.controller import router as users_router
 from .roles.controller import router as roles_router
+from .debug.controller import diagnostics_router
 
 api_router = APIRouter()
 
@@ -11,6 +12,9 @@ if settings.DEBUG_MODE:
     from .debug.controller import router as debug_router
     api_router.include_router(debug_router, prefix="/debug")
 
+# Permission-guarded diagnostics stay available when DEBUG_MODE is off
+api_router.include_router(diagnostics_router, prefix="/debug")
+
 # Add new API modules below.
 api_router.include_router(auth_router, prefix="/auth")
 api_router.include_router(account_router, prefix="/account")
@@ -1,12 +1,15 @@
+from typing import Optional
+from utils import parse_fields
 from core.redis import get_redis
 from core.dependencies import get_db
+from core.rate_limit import request_cost
 from core.security import verify_token
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, Depends, HTTPException
-from .schema import UserProfile, UserUpdate, PasswordChange
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from .schema import UserProfile, UserUpdate, PasswordChange, USER_PROFILE_FIELDS
 from utils.response import APIResponse, parse_responses, common_responses
 from .services import get_user_by_id, update_user_profile, change_password
-from utils.custom_exception import AuthenticationException, NotFoundException
+from utils.custom_exception import AuthenticationException, NotFoundException, ValidationException
 
 router = APIRouter(tags=["Account"])
 
@@ -15,23 +18,30 @@ router = APIRouter(tags=["Account"])
     response_model=APIResponse[UserProfile],
     summary="Get current user profile",
     responses=parse_responses({
-        200: ("User profile retrieved successfully", UserProfile)
+        200: ("User profile retrieved successfully", UserProfile),
+        400: "Unknown fields"
     }, common_responses)
 )
 async def get_user_profile_api(
     token: dict = Depends(verify_token),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    fields: Optional[str] = Query(None, description=f"Only return these fields, id is always included (comma separated, available: {','.join(USER_PROFILE_FIELDS)})")
 ):
     """
     Get the current authenticated user's profile information.
     """
     try:
         user_id = token.get("sub")
-        user = await get_user_by_id(db, user_id)
+        selected_fields = parse_fields(fields, USER_PROFILE_FIELDS)
+        user = await get_user_by_id(db, user_id, fields=selected_fields or USER_PROFILE_FIELDS)
         
         if not user:
             raise NotFoundException("User not found")
         
+        if selected_fields:
+            response = APIResponse(code=200, message="User profile retrieved successfully", data=dict(user._mapping))
+            return Response(content=response.model_dump_json(), media_type="application/json")
+        
         user_data = UserProfile(
             id=user.id,
             first_name=user.first_name,
@@ -43,6 +53,8 @@ async def get_user_profile_api(
         )
         
         return APIResponse(code=200, message="User profile retrieved successfully", data=user_data)
+    except ValidationException as e:
+        raise HTTPException(status_code=400, detail=e.message)
     except NotFoundException:
         raise HTTPException(status_code=404, detail="User not found")
     except Exception:
@@ -100,6 +112,7 @@ async def update_user_profile_api(
         401: ("Invalid or expired token / Current password is incorrect", None)
     }, common_responses)
 )
+@request_cost(20, hashing=True)
 async def change_user_password_api(
     password_change: PasswordChange,
     token: dict = Depends(verify_token),
@@ -12,6 +12,9 @@ class UserProfile(BaseModel):
     status: bool = Field(..., description="User status")
     created_at: datetime = Field(..., description="User creation time")
 
+# Fields that can be selected with the `fields` query parameter
+USER_PROFILE_FIELDS = list(UserProfile.model_fields)
+
 class UserUpdate(BaseModel):
     first_name: Optional[str] = Field(None, min_length=1, max_length=50, description="First name")
     last_name: Optional[str] = Field(None, min_length=1, max_length=50, description="Last name")
@@ -1,13 +1,20 @@
-from typing import Optional
 from sqlalchemy import select
 from models.users import Users
+from sqlalchemy.engine import Row
+from typing import Optional, List, Union
 from .schema import UserUpdate, PasswordChange
 from sqlalchemy.ext.asyncio import AsyncSession
 from utils.custom_exception import AuthenticationException, ServerException
 from core.security import hash_password, verify_password, clear_user_all_sessions
 
-async def get_user_by_id(db: AsyncSession, user_id: str) -> Optional[Users]:
-    """Get user info by id"""
+async def get_user_by_id(db: AsyncSession, user_id: str, fields: Optional[List[str]] = None) -> Optional[Union[Users, Row]]:
+    """Get user info by id, as a lightweight row of the given fields when fields are provided"""
+    if fields:
+        result = await db.execute(
+            select(*(getattr(Users, field) for field in fields)).where(Users.id == user_id)
+        )
+        return result.first()
+    
     result = await db.execute(
         select(Users).where(Users.id == user_id)
     )
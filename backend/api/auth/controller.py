@@ -1,6 +1,7 @@
 import logging
 from core.redis import get_redis
 from core.config import settings
+from core.rate_limit import rate_limit, request_cost
 from .schema import UserResponse
 from core.dependencies import get_db
 from datetime import datetime, timedelta
@@ -48,6 +49,7 @@ router = APIRouter(tags=["Auth"])
         409: ("Email already exists", None)
     }, common_responses)
 )
+@request_cost(10, hashing=True)
 async def register_api(
     user_data: UserRegister,
     request: Request,
@@ -104,6 +106,8 @@ async def register_api(
         401: ("Invalid email or password", None)
     }, common_responses)
 )
+@rate_limit((5, 30), status_codes=[401, 403], clear_on_success=True)
+@request_cost(10, hashing=True)
 async def login_api(
     user_data: UserLogin,
     request: Request,
@@ -209,6 +213,7 @@ async def logout_api(
         401: ("Invalid or expired session", None)
     }, common_responses)
 )
+@rate_limit((60, 60))
 async def token_api(
     request: Request,
     db: AsyncSession = Depends(get_db),
@@ -241,6 +246,7 @@ async def token_api(
         404: ("User not found", None)
     }, common_responses)
 )
+@request_cost(10, hashing=True)
 async def reset_password_api(
     request: Request,
     response: Response,
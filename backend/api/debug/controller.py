@@ -1,14 +1,34 @@
 import logging
+from core.config import settings
+from core.dependencies import get_db
+from core.security import verify_token
+from core.permissions import Permission
+from core.rbac import require_permission
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi_limiter.depends import RateLimiter
-from utils.response import parse_responses, APIResponse
-from .services import get_ip_debug_info, clear_blocked_ips
-from .schema import IPDebugResponse, ClearBlockedIPsResponse
-from fastapi import APIRouter, Request, Depends, HTTPException
+from utils.custom_exception import ConflictException, NotFoundException, ValidationException
+from utils.response import parse_responses, common_responses, APIResponse
+from .services import (
+    get_ip_debug_info, clear_blocked_ips, profile_worker, build_profile_response,
+    start_memory_tracing, stop_memory_tracing, get_memory_tracing, take_memory_snapshot,
+    get_memory_snapshots, diff_memory_snapshots, get_slow_requests
+)
+from .schema import (
+    IPDebugResponse, ClearBlockedIPsResponse, ProfileFormat, ProfileResponse,
+    MemoryTracingRequest, MemoryTracingResponse, MemorySnapshot, MemorySnapshotList, MemoryGroupBy, MemoryDiffResponse,
+    SlowRequestList
+)
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
 
 logger = logging.getLogger(__name__)
 
+# Included only when DEBUG_MODE is on
 router = APIRouter(tags=["Debug"])
 
+# Permission-guarded diagnostics, included regardless of DEBUG_MODE
+diagnostics_router = APIRouter(tags=["Debug"])
+
 @router.get("/test-ip", 
             response_model=APIResponse[IPDebugResponse],
             summary="Test IP detection",
@@ -45,4 +65,203 @@ async def clear_blocked_ips_api():
             data=result
         )
     except Exception:
-        raise HTTPException(status_code=500)
\ No newline at end of file
+        raise HTTPException(status_code=500)
+
+@diagnostics_router.get(
+    "/profile",
+    response_model=APIResponse[ProfileResponse],
+    summary="Sample the stacks of the worker serving this request",
+    responses=parse_responses({
+        200: ("Profile collected successfully", ProfileResponse),
+        409: ("A profile is already running in this worker", None)
+    }, common_responses)
+)
+@require_permission([Permission.DIAGNOSE_SYSTEM])
+async def profile_worker_api(
+    request: Request,
+    token: dict = Depends(verify_token),
+    db: AsyncSession = Depends(get_db),
+    seconds: float = Query(5, gt=0, le=settings.PROFILER_MAX_SECONDS, description="How long to sample"),
+    hz: int = Query(100, ge=1, le=settings.PROFILER_MAX_HZ, description="Target samples per second"),
+    all_threads: bool = Query(False, description="Sample every thread instead of only the event loop"),
+    profile_format: ProfileFormat = Query(ProfileFormat.JSON, alias="format", description="json, or collapsed stacks for flamegraph.pl / speedscope"),
+    max_stacks: int = Query(200, ge=1, le=10000, description="Most frequent stacks returned in json format")
+):
+    """Wall-clock sampling profile of one worker, safe to run in production"""
+    # Release the pooled connection used by the permission check while sampling
+    await db.close()
+    try:
+        sampler = await profile_worker(seconds, hz, all_threads)
+    except ConflictException:
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker")
+    except Exception:
+        raise HTTPException(status_code=500)
+
+    if profile_format == ProfileFormat.COLLAPSED:
+        return PlainTextResponse(sampler.collapsed())
+    return APIResponse(
+        code=200,
+        message="Profile collected successfully",
+        data=build_profile_response(sampler, max_stacks)
+    )
+
+@diagnostics_router.get(
+    "/memory/tracing",
+    response_model=APIResponse[MemoryTracingResponse],
+    summary="Get tracemalloc status of the worker serving this request",
+    responses=parse_responses({
+        200: ("Memory tracing status retrieved successfully", MemoryTracingResponse)
+    }, common_responses)
+)
+@require_permission([Permission.DIAGNOSE_SYSTEM])
+async def get_memory_tracing_api(
+    request: Request,
+    token: dict = Depends(verify_token),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get tracemalloc status of this worker"""
+    try:
+        result = await get_memory_tracing()
+        return APIResponse(code=200, message="Memory tracing status retrieved successfully", data=result)
+    except Exception:
+        raise HTTPException(status_code=500)
+
+@diagnostics_router.post(
+    "/memory/tracing",
+    response_model=APIResponse[MemoryTracingResponse],
+    summary="Start tracemalloc in the worker serving this request",
+    responses=parse_responses({
+        200: ("Memory tracing started successfully", MemoryTracingResponse)
+    }, common_responses)
+)
+@require_permission([Permission.DIAGNOSE_SYSTEM])
+async def start_memory_tracing_api(
+    tracing_data: MemoryTracingRequest,
+    request: Request,
+    token: dict = Depends(verify_token),
+    db: AsyncSession = Depends(get_db)
+):
+    """Start tracemalloc in this worker, or restart it with a new frame depth"""
+    try:
+        result = await start_memory_tracing(tracing_data.frames)
+        return APIResponse(code=200, message="Memory tracing started successfully", data=result)
+    except Exception:
+        raise HTTPException(status_code=500)
+
+@diagnostics_router.delete(
+    "/memory/tracing",
+    response_model=APIResponse[MemoryTracingResponse],
+    summary="Stop tracemalloc in the worker serving this request",
+    responses=parse_responses({
+        200: ("Memory tracing stopped successfully", MemoryTracingResponse)
+    }, common_responses)
+)
+@require_permission([Permission.DIAGNOSE_SYSTEM])
+async def stop_memory_tracing_api(
+    request: Request,
+    token: dict = Depends(verify_token),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stop tracemalloc in this worker and free its traces"""
+    try:
+        result = await stop_memory_tracing()
+        return APIResponse(code=200, message="Memory tracing stopped successfully", data=result)
+    except Exception:
+        raise HTTPException(status_code=500)
+
+@diagnostics_router.post(
+    "/memory/snapshots",
+    response_model=APIResponse[MemorySnapshot],
+    response_model_exclude_none=True,
+    summary="Take a tracemalloc snapshot in the worker serving this request",
+    responses=parse_responses({
+        200: ("Memory snapshot taken successfully", MemorySnapshot),
+        400: ("Memory tracing is not running in this worker", None)
+    }, common_responses)
+)
+@require_permission([Permission.DIAGNOSE_SYSTEM])
+async def take_memory_snapshot_api(
+    request: Request,
+    token: dict = Depends(verify_token),
+    db: AsyncSession = Depends(get_db)
+):
+    """Snapshot this worker's traced allocations; the snapshot id starts with its pid"""
+    try:
+        result = await take_memory_snapshot()
+        return APIResponse(code=200, message="Memory snapshot taken successfully", data=result)
+    except ValidationException:
+        raise HTTPException(status_code=400, detail="Memory tracing is not running in this worker")
+    except Exception:
+        raise HTTPException(status_code=500)
+
+@diagnostics_router.get(
+    "/memory/snapshots",
+    response_model=APIResponse[MemorySnapshotList],
+    response_model_exclude_none=True,
+    summary="List memory snapshots of all workers",
+    responses=parse_responses({
+        200: ("Memory snapshots retrieved successfully", MemorySnapshotList)
+    }, common_responses)
+)
+@require_permission([Permission.DIAGNOSE_SYSTEM])
+async def get_memory_snapshots_api(
+    request: Request,
+    token: dict = Depends(verify_token),
+    db: AsyncSession = Depends(get_db)
+):
+    """List stored snapshots of every worker, grouped by pid"""
+    try:
+        result = await get_memory_snapshots()
+        return APIResponse(code=200, message="Memory snapshots retrieved successfully", data=result)
+    except Exception:
+        raise HTTPException(status_code=500)
+
+@diagnostics_router.get(
+    "/memory/diff",
+    response_model=APIResponse[MemoryDiffResponse],
+    summary="Compare two memory snapshots",
+    responses=parse_responses({
+        200: ("Memory snapshots compared successfully", MemoryDiffResponse),
+        404: ("Snapshot not found", None)
+    }, common_responses)
+)
+@require_permission([Permission.DIAGNOSE_SYSTEM])
+async def diff_memory_snapshots_api(
+    request: Request,
+    token: dict = Depends(verify_token),
+    db: AsyncSession = Depends(get_db),
+    base_id: str = Query(..., alias="base", description="Earlier snapshot id"),
+    target_id: str = Query(..., alias="target", description="Later snapshot id, may belong to another worker"),
+    group_by: MemoryGroupBy = Query(MemoryGroupBy.LINENO, description="Group allocation sites by line, file or full traceback"),
+    limit: int = Query(30, ge=1, le=500, description="Number of allocation sites returned")
+):
+    """Top allocation sites by growth between two snapshots"""
+    try:
+        result = await diff_memory_snapshots(base_id, target_id, group_by, limit)
+        return APIResponse(code=200, message="Memory snapshots compared successfully", data=result)
+    except NotFoundException:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    except Exception:
+        raise HTTPException(status_code=500)
+
+@diagnostics_router.get(
+    "/slow-requests",
+    response_model=APIResponse[SlowRequestList],
+    summary="Get slow request captures of the worker serving this request",
+    responses=parse_responses({
+        200: ("Slow requests retrieved successfully", SlowRequestList)
+    }, common_responses)
+)
+@require_permission([Permission.DIAGNOSE_SYSTEM])
+async def get_slow_requests_api(
+    request: Request,
+    token: dict = Depends(verify_token),
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(settings.SLOW_REQUEST_CAPTURE_LIMIT, ge=1, description="Number of captures returned")
+):
+    """Requests that exceeded SLOW_REQUEST_THRESHOLD_SECONDS, with their stacks and SQL in progress"""
+    try:
+        result = await get_slow_requests(limit)
+        return APIResponse(code=200, message="Slow requests retrieved successfully", data=result)
+    except Exception:
+        raise HTTPException(status_code=500)
@@ -1,3 +1,4 @@
+from enum import Enum
 from typing import Optional, List
 from pydantic import BaseModel, Field
 
@@ -9,4 +10,79 @@ class IPDebugResponse(BaseModel):
 
 class ClearBlockedIPsResponse(BaseModel):
     cleared_ips: List[str] = Field(..., description="Cleared blocked IPs")
-    count: int = Field(..., description="Number of cleared IPs")
\ No newline at end of file
+    count: int = Field(..., description="Number of cleared IPs")
+
+class ProfileFormat(str, Enum):
+    JSON: str = "json"
+    COLLAPSED: str = "collapsed"
+
+class ProfileStack(BaseModel):
+    stack: str = Field(..., description="Semicolon-separated frames, outermost first")
+    count: int = Field(..., description="Number of samples with this stack")
+
+class ProfileResponse(BaseModel):
+    pid: int = Field(..., description="Process id of the sampled worker")
+    duration_seconds: float = Field(..., description="Wall time sampled")
+    samples: int = Field(..., description="Number of samples taken")
+    effective_hz: float = Field(..., description="Achieved sample rate, lower than requested when throttled for overhead")
+    sampling_ms: float = Field(..., description="Time spent taking samples")
+    overhead_percent: float = Field(..., description="Sampling time as a share of the sampled wall time")
+    stacks: List[ProfileStack] = Field(..., description="Sampled stacks, most frequent first")
+
+class MemoryTracingRequest(BaseModel):
+    frames: int = Field(1, ge=1, le=100, description="Frames stored per allocation; more frames cost more memory and CPU")
+
+class MemoryTracingResponse(BaseModel):
+    pid: int = Field(..., description="Process id of the worker")
+    tracing: bool = Field(..., description="Whether tracemalloc is running")
+    frames: int = Field(..., description="Frames stored per allocation")
+    traced_bytes: int = Field(..., description="Memory currently traced")
+    traced_peak_bytes: int = Field(..., description="Peak traced memory since tracing started")
+    tracemalloc_bytes: int = Field(..., description="Memory used by tracemalloc itself")
+
+class MemorySnapshot(BaseModel):
+    snapshot_id: str = Field(..., description="Snapshot id, <pid>-<epoch ms>")
+    pid: int = Field(..., description="Process id of the worker that took the snapshot")
+    taken_at: float = Field(..., description="Unix time the snapshot was taken")
+    file_bytes: int = Field(..., description="Size of the snapshot file")
+    traced_bytes: Optional[int] = Field(None, description="Memory traced in the snapshot")
+
+class MemorySnapshotList(BaseModel):
+    snapshots: List[MemorySnapshot] = Field(..., description="Snapshots of all workers, by pid then time")
+
+class MemoryGroupBy(str, Enum):
+    LINENO: str = "lineno"
+    FILENAME: str = "filename"
+    TRACEBACK: str = "traceback"
+
+class MemoryDiffEntry(BaseModel):
+    location: str = Field(..., description="Most recent frame of the allocation site")
+    traceback: List[str] = Field(..., description="Allocation frames, most recent first")
+    size_diff: int = Field(..., description="Change in bytes between the snapshots")
+    size: int = Field(..., description="Bytes in the target snapshot")
+    count_diff: int = Field(..., description="Change in number of blocks")
+    count: int = Field(..., description="Blocks in the target snapshot")
+
+class MemoryDiffResponse(BaseModel):
+    base_id: str = Field(..., description="Base snapshot id")
+    target_id: str = Field(..., description="Target snapshot id")
+    group_by: MemoryGroupBy = Field(..., description="Grouping of allocation sites")
+    total_size_diff: int = Field(..., description="Total change in bytes across all sites")
+    entries: List[MemoryDiffEntry] = Field(..., description="Sites with the largest change, largest first")
+
+class SlowRequestCapture(BaseModel):
+    request_id: str = Field(..., description="Request id")
+    method: str = Field(..., description="HTTP method")
+    path: str = Field(..., description="Request path")
+    route: Optional[str] = Field(None, description="Route template, if routing had completed")
+    elapsed_ms: float = Field(..., description="Time the request had been running when captured")
+    captured_at: float = Field(..., description="Unix time of the capture")
+    statement: Optional[str] = Field(None, description="SQL statement executing at capture time")
+    statement_elapsed_ms: Optional[float] = Field(None, description="Time the statement had been running")
+    coroutine_stack: List[str] = Field(..., description="Await chain of the request, outermost first")
+    loop_stack: List[str] = Field(..., description="Event loop thread stack at capture time, outermost first")
+
+class SlowRequestList(BaseModel):
+    pid: int = Field(..., description="Process id of the worker")
+    threshold_ms: float = Field(..., description="Duration after which a request is captured")
+    captures: List[SlowRequestCapture] = Field(..., description="Captures of this worker, newest first")
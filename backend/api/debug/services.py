@@ -1,9 +1,20 @@
+import os
+import asyncio
+import threading
 from fastapi import Request
 from utils import get_real_ip
 import redis.asyncio as aioredis
 from core.config import settings
-from utils.custom_exception import ServerException
-from .schema import IPDebugResponse, ClearBlockedIPsResponse
+from core.profiler import ProfilerBusyError, StackSampler, sample_stacks
+from core import memory_profiler
+from core.memory_profiler import MemoryTracingError, SnapshotNotFoundError
+from core.slow_requests import slow_request_watchdog
+from utils.custom_exception import ConflictException, NotFoundException, ServerException, ValidationException
+from .schema import (
+    IPDebugResponse, ClearBlockedIPsResponse, ProfileResponse, ProfileStack,
+    MemoryTracingResponse, MemorySnapshot, MemorySnapshotList, MemoryGroupBy, MemoryDiffResponse,
+    SlowRequestCapture, SlowRequestList
+)
 
 async def get_ip_debug_info(request: Request) -> IPDebugResponse:
     try:
@@ -27,4 +38,91 @@ async def clear_blocked_ips() -> ClearBlockedIPsResponse:
                 cleared.append(key.replace("block:", ""))
         return ClearBlockedIPsResponse(cleared_ips=cleared, count=len(cleared))
     except Exception as e:
-        raise ServerException(f"Failed to clear blocked IPs: {e}")
\ No newline at end of file
+        raise ServerException(f"Failed to clear blocked IPs: {e}")
+
+async def profile_worker(seconds: float, hz: int, all_threads: bool = False) -> StackSampler:
+    """Sample this worker's stacks for `seconds` without blocking its event loop"""
+    # The event loop runs in this thread; sampling happens on a separate one
+    loop_thread_id = None if all_threads else threading.get_ident()
+    try:
+        return await asyncio.to_thread(
+            sample_stacks, seconds, hz, settings.PROFILER_MAX_OVERHEAD, loop_thread_id
+        )
+    except ProfilerBusyError as e:
+        raise ConflictException(str(e))
+    except Exception as e:
+        raise ServerException(f"Failed to profile worker: {e}")
+
+def build_profile_response(sampler: StackSampler, max_stacks: int) -> ProfileResponse:
+    return ProfileResponse(
+        pid=os.getpid(),
+        duration_seconds=round(sampler.duration, 3),
+        samples=sampler.samples,
+        effective_hz=round(sampler.samples / sampler.duration, 1) if sampler.duration else 0.0,
+        sampling_ms=round(sampler.sampling_seconds * 1000, 2),
+        overhead_percent=round(sampler.overhead * 100, 3),
+        stacks=[
+            ProfileStack(stack=stack, count=count)
+            for stack, count in sampler.stacks.most_common(max_stacks)
+        ]
+    )
+
+async def start_memory_tracing(frames: int) -> MemoryTracingResponse:
+    try:
+        memory_profiler.start_tracing(frames)
+        return MemoryTracingResponse(**memory_profiler.tracing_status())
+    except Exception as e:
+        raise ServerException(f"Failed to start memory tracing: {e}")
+
+async def stop_memory_tracing() -> MemoryTracingResponse:
+    try:
+        memory_profiler.stop_tracing()
+        return MemoryTracingResponse(**memory_profiler.tracing_status())
+    except Exception as e:
+        raise ServerException(f"Failed to stop memory tracing: {e}")
+
+async def get_memory_tracing() -> MemoryTracingResponse:
+    return MemoryTracingResponse(**memory_profiler.tracing_status())
+
+async def take_memory_snapshot() -> MemorySnapshot:
+    """Snapshot this worker's traced allocations to the shared snapshot directory"""
+    try:
+        info = await asyncio.to_thread(
+            memory_profiler.take_snapshot, settings.MEMORY_SNAPSHOT_DIR, settings.MEMORY_MAX_SNAPSHOTS_PER_WORKER
+        )
+        return MemorySnapshot(**info)
+    except MemoryTracingError as e:
+        raise ValidationException(str(e))
+    except Exception as e:
+        raise ServerException(f"Failed to take memory snapshot: {e}")
+
+async def get_memory_snapshots() -> MemorySnapshotList:
+    try:
+        return MemorySnapshotList(
+            snapshots=[MemorySnapshot(**info) for info in memory_profiler.list_snapshots(settings.MEMORY_SNAPSHOT_DIR)]
+        )
+    except Exception as e:
+        raise ServerException(f"Failed to list memory snapshots: {e}")
+
+async def diff_memory_snapshots(base_id: str, target_id: str, group_by: MemoryGroupBy, limit: int) -> MemoryDiffResponse:
+    try:
+        diff = await asyncio.to_thread(
+            memory_profiler.diff_snapshots, settings.MEMORY_SNAPSHOT_DIR, base_id, target_id, group_by.value, limit
+        )
+        return MemoryDiffResponse(base_id=base_id, target_id=target_id, group_by=group_by, **diff)
+    except SnapshotNotFoundError as e:
+        raise NotFoundException(str(e))
+    except Exception as e:
+        raise ServerException(f"Failed to diff memory snapshots: {e}")
+
+async def get_slow_requests(limit: int) -> SlowRequestList:
+    """Slow request captures of this worker, newest first"""
+    try:
+        captures = slow_request_watchdog.get_captures()[:limit]
+        return SlowRequestList(
+            pid=os.getpid(),
+            threshold_ms=slow_request_watchdog.threshold * 1000,
+            captures=[SlowRequestCapture(**capture) for capture in captures]
+        )
+    except Exception as e:
+        raise ServerException(f"Failed to get slow requests: {e}")
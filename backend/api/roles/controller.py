@@ -1,11 +1,15 @@
+import redis
+from core.redis import get_redis
 from core.dependencies import get_db
 from core.security import verify_token
 from core.rbac import require_permission
+from core.rate_limit import rate_limit
 from core.permissions import Permission
 from sqlalchemy.ext.asyncio import AsyncSession
 from utils.response import APIResponse, parse_responses, common_responses
 from fastapi import APIRouter, Depends, HTTPException, Request, Path, Response
 from utils.custom_exception import NotFoundException, ConflictException, ServerException
+from api.users.services import invalidate_user_facets
 from .services import (
     get_all_roles, create_role, update_role, delete_role, 
     get_role_attribute_mapping, update_role_attribute_mapping,
@@ -87,11 +91,14 @@ async def update_role_api(
     role_data: RoleUpdate = None,
     request: Request = None,
     token: dict = Depends(verify_token),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis)
 ):
     """Update role information"""
     try:
         role = await update_role(db, role_id, role_data)
+        # The user facets count users per role name
+        await invalidate_user_facets(redis_client)
         return APIResponse(code=200, message="Role updated successfully", data=role)
     except NotFoundException:
         raise HTTPException(status_code=404, detail="Role not found")
@@ -116,11 +123,13 @@ async def delete_role_api(
     role_id: str = Path(..., description="Role ID"),
     request: Request = None,
     token: dict = Depends(verify_token),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis)
 ):
     """Delete a role"""
     try:
         await delete_role(db, role_id)
+        await invalidate_user_facets(redis_client)
         return APIResponse(code=200, message="Role deleted successfully")
     except NotFoundException:
         raise HTTPException(status_code=404, detail="Role not found")
@@ -228,6 +237,7 @@ async def update_role_attribute_mapping_api(
         200: ("User permissions retrieved", PermissionCheckResponse, PermissionCheckResponse.get_example_response())
     }, common_responses)
 )
+@rate_limit((60, 60))
 async def get_user_permissions_api(
     request: Request = None,
     token: dict = Depends(verify_token),
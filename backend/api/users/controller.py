@@ -1,20 +1,30 @@
 import redis
 from typing import Optional
+from utils import parse_fields
 from core.redis import get_redis
+from core.config import settings
 from core.dependencies import get_db
 from core.security import verify_token
 from core.permissions import Permission
 from core.rbac import require_permission
+from core.database import AsyncSessionLocal
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from utils.response import APIResponse, parse_responses, common_responses
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Path, Response
-from .services import get_all_users, create_user, update_user, delete_users, reset_user_password
+from .services import (
+    get_all_users, create_user, update_user, delete_users, reset_user_password, import_users, get_import_format,
+    export_users, get_user_facets, invalidate_user_facets, bulk_update_users
+)
 from .schema import (
     UserPagination, UserSortBy, UserCreate, UserUpdate, UserDelete, PasswordReset, UserResponse, 
     UserDeleteBatchResponse, user_delete_success_response_example, user_delete_partial_response_example, 
-    user_delete_failed_response_example
+    user_delete_failed_response_example, UserImportFormat, UserImportResponse, user_import_success_response_example,
+    user_import_partial_response_example, user_import_failed_response_example, UserExportFormat, USER_FIELDS,
+    UserFacets, UserBulkUpdate, UserUpdateBatchResponse, user_bulk_update_success_response_example,
+    user_bulk_update_partial_response_example, user_bulk_update_failed_response_example
 )
-from utils.custom_exception import NotFoundException, ConflictException
+from utils.custom_exception import NotFoundException, ConflictException, ValidationException, PayloadTooLargeException
 
 router = APIRouter(tags=["Users"])
 
@@ -23,7 +33,8 @@ router = APIRouter(tags=["Users"])
     response_model=APIResponse[UserPagination],
     summary="Get all users",
     responses=parse_responses({
-        200: ("Successfully retrieved users", UserPagination)
+        200: ("Successfully retrieved users", UserPagination),
+        400: "Unknown fields"
     }, common_responses)
 )
 @require_permission([Permission.VIEW_USERS, Permission.MANAGE_USERS])
@@ -37,9 +48,11 @@ async def get_users(
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(10, ge=1, le=100, description="Number of users per page"),
     sort_by: Optional[UserSortBy] = Query(None, description="Sort by field"),
-    desc: bool = Query(False, description="Sort order")
+    desc: bool = Query(False, description="Sort order"),
+    fields: Optional[str] = Query(None, description=f"Only return these fields, id is always included (comma separated, available: {','.join(USER_FIELDS)})")
 ):
     try:
+        selected_fields = parse_fields(fields, USER_FIELDS)
         data = await get_all_users(
             db=db,
             keyword=keyword,
@@ -48,12 +61,81 @@ async def get_users(
             page=page,
             per_page=per_page,
             sort_by=sort_by.value if sort_by else None,
-            desc=desc
-        )        
-        return APIResponse(code=200, message="Successfully retrieved users", data=data)
+            desc=desc,
+            fields=selected_fields
+        )
+        response = APIResponse(code=200, message="Successfully retrieved users", data=data)
+        if selected_fields:
+            # Partial users do not match UserPagination, so bypass response model validation
+            return Response(content=response.model_dump_json(), media_type="application/json")
+        return response
+    except ValidationException as e:
+        raise HTTPException(status_code=400, detail=e.message)
     except Exception:
         raise HTTPException(status_code=500)
 
+@router.get(
+    "/facets",
+    response_model=APIResponse[UserFacets],
+    summary="Get user filter counts",
+    responses=parse_responses({
+        200: ("Successfully retrieved user facets", UserFacets)
+    }, common_responses)
+)
+@require_permission([Permission.VIEW_USERS, Permission.MANAGE_USERS])
+async def get_user_facets_api(
+    request: Request,
+    token: dict = Depends(verify_token),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
+    keyword: Optional[str] = Query(None, description="Keyword to search for users")
+):
+    """Get user counts per status and per role for the keyword filter"""
+    try:
+        data = await get_user_facets(db, redis_client, keyword=keyword)
+        return APIResponse(code=200, message="Successfully retrieved user facets", data=data)
+    except Exception:
+        raise HTTPException(status_code=500)
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    summary="Export users",
+    responses=parse_responses({
+        200: {
+            "description": "Users exported successfully",
+            "content": {"text/csv": {}, "application/x-ndjson": {}}
+        }
+    }, common_responses)
+)
+@require_permission([Permission.VIEW_USERS, Permission.MANAGE_USERS])
+async def export_users_api(
+    request: Request,
+    token: dict = Depends(verify_token),
+    db: AsyncSession = Depends(get_db),
+    export_format: UserExportFormat = Query(UserExportFormat.CSV, alias="format", description="Export format"),
+    keyword: Optional[str] = Query(None, description="Keyword to search for users"),
+    status: Optional[str] = Query(None, description="Filter user status (multiple values separated by commas, example: true,false)"),
+    role: Optional[str] = Query(None, description="Filter user role (multiple values separated by commas, example: admin,manager)")
+):
+    """Export filtered users as a streamed CSV or NDJSON file"""
+    async def stream():
+        # The request session is closed before streaming starts, so use a dedicated one
+        async with AsyncSessionLocal() as export_db:
+            async for chunk in export_users(export_db, export_format, keyword=keyword, status=status, role=role):
+                yield chunk
+    
+    if export_format == UserExportFormat.CSV:
+        media_type = "text/csv"
+    else:
+        media_type = "application/x-ndjson"
+    
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="users.{export_format.value}"'}
+    )
+
 @router.post(
     "",
     response_model=APIResponse[UserResponse],
@@ -68,24 +150,111 @@ async def create_user_api(
     user_data: UserCreate,
     request: Request,
     token: dict = Depends(verify_token),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis)
 ):
     """Create a new user account"""
     try:
         user = await create_user(db, user_data)
+        await invalidate_user_facets(redis_client)
         return APIResponse(code=200, message="User created successfully", data=user)
     except Exception as e:
         if "Email already exists" in str(e):
             raise HTTPException(status_code=409, detail="Email already exists")
         raise HTTPException(status_code=500)
 
+@router.post(
+    "/import",
+    response_model=APIResponse[UserImportResponse],
+    response_model_exclude_none=True,
+    summary="Import users",
+    responses=parse_responses({
+        200: ("All users imported successfully", UserImportResponse, user_import_success_response_example),
+        207: ("Users imported with partial success", UserImportResponse, user_import_partial_response_example),
+        400: ("All users failed to import", UserImportResponse, user_import_failed_response_example),
+        413: "Import body or row count over the limit",
+        415: "Unsupported import format"
+    }, common_responses),
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/csv": {
+                    "schema": {"type": "string"},
+                    "example": "first_name,last_name,email,phone,password,status,role\nJohn,Doe,john@example.com,0912345678,password123,true,user"
+                },
+                "application/x-ndjson": {
+                    "schema": {"type": "string"},
+                    "example": '{"first_name": "John", "last_name": "Doe", "email": "john@example.com", "phone": "0912345678", "password": "password123", "role": "user"}'
+                }
+            }
+        }
+    }
+)
+@require_permission([Permission.MANAGE_USERS])
+async def import_users_api(
+    request: Request,
+    token: dict = Depends(verify_token),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
+    import_format: Optional[UserImportFormat] = Query(None, alias="format", description="Import format, detected from Content-Type when omitted")
+):
+    """Import users from a streamed CSV or NDJSON body"""
+    import_format = import_format or get_import_format(request.headers.get("content-type"))
+    if not import_format:
+        raise HTTPException(status_code=415, detail="Unsupported import format")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.USER_IMPORT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Import body exceeds {settings.USER_IMPORT_MAX_BYTES} bytes")
+    
+    try:
+        import_result = await import_users(db, request.stream(), import_format)
+        if import_result.success_count > 0:
+            await invalidate_user_facets(redis_client)
+        
+        if import_result.failed_count == 0:
+            return APIResponse(
+                code=200,
+                message="All users imported successfully",
+                data=import_result
+            )
+        elif import_result.success_count == 0:
+            response = APIResponse(
+                code=400,
+                message="All users failed to import",
+                data=import_result
+            )
+            return Response(
+                content=response.model_dump_json(),
+                status_code=400,
+                media_type="application/json"
+            )
+        else:
+            response = APIResponse(
+                code=207,
+                message="Users imported with partial success",
+                data=import_result
+            )
+            return Response(
+                content=response.model_dump_json(),
+                status_code=207,
+                media_type="application/json"
+            )
+    except PayloadTooLargeException as e:
+        # Batches before the limit are already committed
+        await invalidate_user_facets(redis_client)
+        raise HTTPException(status_code=413, detail=e.message)
+    except Exception:
+        raise HTTPException(status_code=500)
+
 @router.put(
     "/{user_id}",
     response_model=APIResponse[UserResponse],
     response_model_exclude_none=True,
     summary="Update user info",
     responses=parse_responses({
-        200: ("User updated successfully", UserResponse)
+        200: ("User updated successfully", UserResponse),
+        400: "Unknown fields"
     }, common_responses)
 )
 @require_permission([Permission.MANAGE_USERS])
@@ -94,12 +263,21 @@ async def update_user_api(
     token: dict = Depends(verify_token),
     user_id: str = Path(..., description="User ID"),
     user_data: UserUpdate = None,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
+    fields: Optional[str] = Query(None, description="Only return these fields, id is always included (comma separated)")
 ):
     """Update user information"""
     try:
-        user = await update_user(db, user_id, user_data)
-        return APIResponse(code=200, message="User updated successfully", data=user)
+        selected_fields = parse_fields(fields, USER_FIELDS)
+        user = await update_user(db, user_id, user_data, fields=selected_fields)
+        await invalidate_user_facets(redis_client)
+        response = APIResponse(code=200, message="User updated successfully", data=user)
+        if selected_fields:
+            return Response(content=response.model_dump_json(exclude_none=True), media_type="application/json")
+        return response
+    except ValidationException as e:
+        raise HTTPException(status_code=400, detail=e.message)
     except NotFoundException:
         raise HTTPException(status_code=404, detail="User not found")
     except ConflictException:
@@ -107,6 +285,64 @@ async def update_user_api(
     except Exception:
         raise HTTPException(status_code=500)
 
+@router.patch(
+    "",
+    response_model=APIResponse[UserUpdateBatchResponse],
+    response_model_exclude_none=True,
+    summary="Update users",
+    responses=parse_responses({
+        200: ("All users updated successfully", UserUpdateBatchResponse, user_bulk_update_success_response_example),
+        207: ("Users updated with partial success", UserUpdateBatchResponse, user_bulk_update_partial_response_example),
+        400: ("All users failed to update", UserUpdateBatchResponse, user_bulk_update_failed_response_example)
+    }, common_responses)
+)
+@require_permission([Permission.MANAGE_USERS])
+async def bulk_update_users_api(
+    update_data: UserBulkUpdate,
+    request: Request,
+    token: dict = Depends(verify_token),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis)
+):
+    """Apply the same status or role change to multiple users"""
+    try:
+        batch_result = await bulk_update_users(db, redis_client, update_data, token)
+        if batch_result.success_count > 0:
+            await invalidate_user_facets(redis_client)
+        
+        if batch_result.failed_count == 0:
+            return APIResponse(
+                code=200,
+                message="All users updated successfully",
+                data=batch_result
+            )
+        elif batch_result.success_count == 0:
+            response = APIResponse(
+                code=400,
+                message="All users failed to update",
+                data=batch_result
+            )
+            return Response(
+                content=response.model_dump_json(),
+                status_code=400,
+                media_type="application/json"
+            )
+        else:
+            response = APIResponse(
+                code=207,
+                message="Users updated with partial success",
+                data=batch_result
+            )
+            return Response(
+                content=response.model_dump_json(),
+                status_code=207,
+                media_type="application/json"
+            )
+    except ValidationException as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except Exception:
+        raise HTTPException(status_code=500)
+
 @router.delete(
     "",
     response_model=APIResponse[UserDeleteBatchResponse],
@@ -129,6 +365,8 @@ async def delete_users_api(
     """Delete multiple users"""
     try:
         batch_result = await delete_users(db, redis_client, delete_data.user_ids, token)
+        if batch_result.success_count > 0:
+            await invalidate_user_facets(redis_client)
         
         # Determine response code based on results
         if batch_result.failed_count == 0:
@@ -1,8 +1,8 @@
 from enum import Enum
 from datetime import datetime
 from core.config import settings
-from typing import List, Optional
-from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, EmailStr, Field, field_validator
 
 class UserResponse(BaseModel):
     id: str = Field(..., description="User ID")
@@ -21,6 +21,24 @@ class UserPagination(BaseModel):
     per_page: int = Field(..., description="Number of users per page")
     total_pages: int = Field(..., description="Total number of pages")
 
+# Fields that can be selected with the `fields` query parameter
+USER_FIELDS = list(UserResponse.model_fields)
+
+class UserFieldsPagination(BaseModel):
+    users: List[Dict[str, Any]] = Field(..., description="List of users with only the requested fields")
+    total: int = Field(..., description="Total number of users")
+    page: int = Field(..., description="Current page number")
+    per_page: int = Field(..., description="Number of users per page")
+    total_pages: int = Field(..., description="Total number of pages")
+
+class UserFacetCount(BaseModel):
+    value: Optional[str] = Field(None, description="Filter value, null for users without a role")
+    count: int = Field(..., description="Number of users with this value")
+
+class UserFacets(BaseModel):
+    status: List[UserFacetCount] = Field(..., description="User counts per status (true, false)")
+    role: List[UserFacetCount] = Field(..., description="User counts per role")
+
 class UserSortBy(str, Enum):
     FIRST_NAME: str = "first_name"
     LAST_NAME: str = "last_name"
@@ -64,6 +82,50 @@ class UserDeleteBatchResponse(BaseModel):
     success_count: int = Field(..., description="Number of successfully deleted users")
     failed_count: int = Field(..., description="Number of failed deletions")
 
+class UserBulkUpdate(BaseModel):
+    user_ids: List[str] = Field(..., min_items=1, description="List of user IDs to update")
+    status: Optional[bool] = Field(None, description="User status, omit to leave unchanged")
+    role: Optional[str] = Field(None, description="User role, null removes the current role")
+
+    @field_validator("status")
+    @classmethod
+    def status_not_null(cls, value: Optional[bool]) -> bool:
+        # Unlike role, status has no "unset" value: null would be written to a non-nullable flag
+        if value is None:
+            raise ValueError("status cannot be null")
+        return value
+
+class UserUpdateResult(BaseModel):
+    user_id: str = Field(..., description="User ID")
+    status: str = Field(..., description="Processing status: success, failed", example="success|failed", pattern="^(success|failed)$")
+    message: str = Field(..., description="Result message")
+
+class UserUpdateBatchResponse(BaseModel):
+    results: List[UserUpdateResult] = Field(..., description="Individual user update results")
+    total_users: int = Field(..., description="Total number of users processed")
+    success_count: int = Field(..., description="Number of successfully updated users")
+    failed_count: int = Field(..., description="Number of failed updates")
+
+class UserImportFormat(str, Enum):
+    CSV: str = "csv"
+    NDJSON: str = "ndjson"
+
+class UserExportFormat(str, Enum):
+    CSV: str = "csv"
+    NDJSON: str = "ndjson"
+
+class UserImportError(BaseModel):
+    row: int = Field(..., description="Row number in the import file (header excluded)")
+    email: Optional[str] = Field(None, description="User email address of the row")
+    message: str = Field(..., description="Error message")
+
+class UserImportResponse(BaseModel):
+    errors: List[UserImportError] = Field(..., description="Rows that failed to import")
+    total_rows: int = Field(..., description="Total number of rows processed")
+    success_count: int = Field(..., description="Number of successfully imported users")
+    failed_count: int = Field(..., description="Number of failed rows")
+    errors_truncated: bool = Field(False, description="Whether the error list was truncated")
+
 user_delete_success_response_example = {
     "code": 200,
     "message": "All users deleted successfully",
@@ -123,4 +185,113 @@ user_delete_failed_response_example = {
         "success_count": 0,
         "failed_count": 1
     }
+}
+
+user_import_success_response_example = {
+    "code": 200,
+    "message": "All users imported successfully",
+    "data": {
+        "errors": [],
+        "total_rows": 2,
+        "success_count": 2,
+        "failed_count": 0,
+        "errors_truncated": False
+    }
+}
+
+user_import_partial_response_example = {
+    "code": 207,
+    "message": "Users imported with partial success",
+    "data": {
+        "errors": [
+            {
+                "row": 2,
+                "email": "user2@example.com",
+                "message": "Email already exists"
+            }
+        ],
+        "total_rows": 2,
+        "success_count": 1,
+        "failed_count": 1,
+        "errors_truncated": False
+    }
+}
+
+user_import_failed_response_example = {
+    "code": 400,
+    "message": "All users failed to import",
+    "data": {
+        "errors": [
+            {
+                "row": 1,
+                "email": "user1@example.com",
+                "message": "Role 'manager' not found"
+            }
+        ],
+        "total_rows": 1,
+        "success_count": 0,
+        "failed_count": 1,
+        "errors_truncated": False
+    }
+}
+
+user_bulk_update_success_response_example = {
+    "code": 200,
+    "message": "All users updated successfully",
+    "data": {
+        "results": [
+            {
+                "user_id": "uuid-user-id-1",
+                "status": "success",
+                "message": "User updated successfully"
+            },
+            {
+                "user_id": "uuid-user-id-2",
+                "status": "success",
+                "message": "User updated successfully"
+            }
+        ],
+        "total_users": 2,
+        "success_count": 2,
+        "failed_count": 0
+    }
+}
+
+user_bulk_update_partial_response_example = {
+    "code": 207,
+    "message": "Users updated with partial success",
+    "data": {
+        "results": [
+            {
+                "user_id": "uuid-user-id-1",
+                "status": "success",
+                "message": "User updated successfully"
+            },
+            {
+                "user_id": "uuid-user-id-2",
+                "status": "failed",
+                "message": "User not found"
+            }
+        ],
+        "total_users": 2,
+        "success_count": 1,
+        "failed_count": 1
+    }
+}
+
+user_bulk_update_failed_response_example = {
+    "code": 400,
+    "message": "All users failed to update",
+    "data": {
+        "results": [
+            {
+                "user_id": "uuid-user-id-1",
+                "status": "failed",
+                "message": "User not found"
+            }
+        ],
+        "total_users": 1,
+        "success_count": 0,
+        "failed_count": 1
+    }
 }
\ No newline at end of file
@@ -1,20 +1,96 @@
+import io
+import csv
+import json
 import redis
+import codecs
+import hashlib
 import logging
+from uuid_utils import uuid7
+from pydantic import ValidationError
+from core.config import settings
+from core.redis import redis_call
 from models.users import Users
 from models.roles import Roles
 from models.role_mapper import RoleMapper
 from models.login_logs import LoginLogs
 from models.user_sessions import UserSessions
 from models.password_reset_tokens import PasswordResetTokens
-from typing import Optional, List
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_, delete, case
-from core.security import hash_password, clear_user_all_sessions
-from .schema import UserResponse, UserPagination, UserCreate, UserUpdate, UserDeleteBatchResponse, UserDeleteResult
-from utils.custom_exception import ServerException, ConflictException, NotFoundException
+from typing import Optional, List, Dict, Tuple, Union, Any, AsyncIterator
+from sqlalchemy import select, func, or_, delete, case, insert, update, union_all, literal, cast, String
+from core.security import hash_password, hash_passwords, clear_user_all_sessions
+from .schema import (
+    UserResponse, UserPagination, UserCreate, UserUpdate, UserDeleteBatchResponse, UserDeleteResult,
+    UserImportFormat, UserImportError, UserImportResponse, UserExportFormat, UserFieldsPagination, USER_FIELDS,
+    UserFacets, UserFacetCount, UserBulkUpdate, UserUpdateResult, UserUpdateBatchResponse
+)
+from utils.custom_exception import ServerException, ConflictException, NotFoundException, ValidationException, PayloadTooLargeException
 
 logger = logging.getLogger(__name__)
 
+# Bumped on every user write so cached facets are invalidated without scanning keys
+USER_FACETS_VERSION_KEY = "cache:users:facets:version"
+
+# MySQL error codes carried in IntegrityError.orig.args[0]
+MYSQL_DUPLICATE_ENTRY = 1062
+MYSQL_NO_REFERENCED_ROW = 1452
+
+def _apply_user_filters(
+    query,
+    keyword: Optional[str] = None,
+    status: Optional[str] = None,
+    role: Optional[str] = None
+):
+    """Apply keyword, status and role filters to a users query"""
+    if keyword:
+        query = query.where(
+            or_(
+                Users.first_name.ilike(f"%{keyword}%"),
+                Users.last_name.ilike(f"%{keyword}%"),
+                Users.email.ilike(f"%{keyword}%")
+            )
+        )
+    
+    if status:
+        status_list = [s.strip().lower() == 'true' for s in status.split(',')]
+        if len(status_list) == 1:
+            query = query.where(Users.status == status_list[0])
+        else:
+            query = query.where(Users.status.in_(status_list))
+    
+    if role:
+        role_list = [r.strip() for r in role.split(',')]
+        query = query.join(RoleMapper, Users.id == RoleMapper.user_id)
+        query = query.join(Roles, RoleMapper.role_id == Roles.id)
+        query = query.where(Roles.name.in_(role_list))
+    
+    return query
+
+def _user_role_subquery():
+    """Correlated subquery returning the first role name of a user"""
+    return (
+        select(Roles.name)
+        .join(RoleMapper, Roles.id == RoleMapper.role_id)
+        .where(RoleMapper.user_id == Users.id)
+        .correlate(Users)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+def _user_columns(fields: List[str]) -> list:
+    """Map response field names to the columns selected for them"""
+    return [
+        _user_role_subquery().label("role") if field == "role" else getattr(Users, field)
+        for field in fields
+    ]
+
+async def _get_user_fields(db: AsyncSession, user_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+    """Get the requested fields of a user as a plain dict"""
+    result = await db.execute(select(*_user_columns(fields)).where(Users.id == user_id))
+    row = result.first()
+    return dict(row._mapping) if row else None
+
 async def get_all_users(
     db: AsyncSession,
     keyword: Optional[str] = None,
@@ -23,36 +99,14 @@ async def get_all_users(
     page: int = 1,
     per_page: int = 10,
     sort_by: Optional[str] = None,
-    desc: bool = False
-) -> UserPagination:
-    """Get all users list"""
+    desc: bool = False,
+    fields: Optional[List[str]] = None
+) -> Union[UserPagination, UserFieldsPagination]:
+    """Get all users list, optionally selecting only the requested fields"""
     try:
-        query = select(Users)
-        
-        if keyword:
-            query = query.where(
-                or_(
-                    Users.first_name.ilike(f"%{keyword}%"),
-                    Users.last_name.ilike(f"%{keyword}%"),
-                    Users.email.ilike(f"%{keyword}%")
-                )
-            )
-        
-        if status:
-            status_list = [s.strip().lower() == 'true' for s in status.split(',')]
-            if len(status_list) == 1:
-                query = query.where(Users.status == status_list[0])
-            else:
-                query = query.where(Users.status.in_(status_list))
-        
-        has_role_join = False
-        
-        if role:
-            role_list = [r.strip() for r in role.split(',')]
-            query = query.join(RoleMapper, Users.id == RoleMapper.user_id)
-            query = query.join(Roles, RoleMapper.role_id == Roles.id)
-            query = query.where(Roles.name.in_(role_list))
-            has_role_join = True
+        base_query = select(*_user_columns(fields)) if fields else select(Users)
+        query = _apply_user_filters(base_query, keyword, status, role)
+        has_role_join = bool(role)
         
         if sort_by:
             if sort_by == "role":
@@ -80,26 +134,7 @@ async def get_all_users(
         else:
             query = query.order_by(Users.id.asc())
         
-        count_query = select(func.count(Users.id))
-        if keyword:
-            count_query = count_query.where(
-                or_(
-                    Users.first_name.ilike(f"%{keyword}%"),
-                    Users.last_name.ilike(f"%{keyword}%"),
-                    Users.email.ilike(f"%{keyword}%")
-                )
-            )
-        if status:
-            status_list = [s.strip().lower() == 'true' for s in status.split(',')]
-            if len(status_list) == 1:
-                count_query = count_query.where(Users.status == status_list[0])
-            else:
-                count_query = count_query.where(Users.status.in_(status_list))
-        if role:
-            role_list = [r.strip() for r in role.split(',')]
-            count_query = count_query.join(RoleMapper, Users.id == RoleMapper.user_id)
-            count_query = count_query.join(Roles, RoleMapper.role_id == Roles.id)
-            count_query = count_query.where(Roles.name.in_(role_list))
+        count_query = _apply_user_filters(select(func.count(Users.id)), keyword, status, role)
         
         total_result = await db.execute(count_query)
         total = total_result.scalar()
@@ -108,6 +143,18 @@ async def get_all_users(
         query = query.offset(offset).limit(per_page)
         
         result = await db.execute(query)
+        
+        if fields:
+            # Plain rows skip ORM entity construction and the identity map
+            users = [dict(row._mapping) for row in result]
+            return UserFieldsPagination(
+                users=users,
+                total=total if users else 0,
+                page=page,
+                per_page=per_page,
+                total_pages=(total + per_page - 1) // per_page if users else 0
+            )
+        
         users = result.scalars().all()
         
         if not users:
@@ -153,6 +200,112 @@ async def get_all_users(
     except Exception as e:
         raise ServerException(f"Failed to retrieve users: {str(e)}")
 
+async def get_user_facets(db: AsyncSession, redis_client: redis.Redis, keyword: Optional[str] = None) -> UserFacets:
+    """Get user counts per status and per role for the keyword filter"""
+    cache_key = None
+    try:
+        version = await redis_client.get(USER_FACETS_VERSION_KEY) or "0"
+        keyword_hash = hashlib.sha1((keyword or "").encode()).hexdigest()
+        cache_key = f"cache:users:facets:{version}:{keyword_hash}"
+        cached = await redis_client.get(cache_key)
+        if cached:
+            return UserFacets.model_validate_json(cached)
+    except Exception as e:
+        logger.warning(f"Failed to read user facets cache: {e}")
+    
+    try:
+        status_query = _apply_user_filters(
+            select(
+                literal("status").label("facet"),
+                cast(Users.status, String).label("value"),
+                func.count(Users.id).label("count")
+            ),
+            keyword
+        ).group_by(Users.status)
+        
+        role_query = _apply_user_filters(
+            select(
+                literal("role").label("facet"),
+                Roles.name.label("value"),
+                func.count(func.distinct(Users.id)).label("count")
+            )
+            .outerjoin(RoleMapper, Users.id == RoleMapper.user_id)
+            .outerjoin(Roles, RoleMapper.role_id == Roles.id),
+            keyword
+        ).group_by(Roles.name)
+        
+        # Both facets are counted in a single round trip
+        result = await db.execute(union_all(status_query, role_query))
+        
+        facets = {"status": [], "role": []}
+        for row in result:
+            value = row.value
+            if row.facet == "status":
+                value = "true" if value in ("1", "true") else "false"
+            facets[row.facet].append(UserFacetCount(value=value, count=row.count))
+        
+        user_facets = UserFacets(
+            status=sorted(facets["status"], key=lambda facet: facet.value != "true"),
+            role=sorted(facets["role"], key=lambda facet: (facet.value is None, facet.value or ""))
+        )
+    except Exception as e:
+        raise ServerException(f"Failed to retrieve user facets: {str(e)}")
+    
+    if cache_key:
+        try:
+            await redis_client.set(cache_key, user_facets.model_dump_json(), ex=settings.USER_FACETS_CACHE_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Failed to write user facets cache: {e}")
+    
+    return user_facets
+
+async def invalidate_user_facets(redis_client: redis.Redis) -> None:
+    """Invalidate cached user facets after a user write"""
+    try:
+        await redis_client.incr(USER_FACETS_VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate user facets cache: {e}")
+
+USER_EXPORT_COLUMNS = ["id", "email", "first_name", "last_name", "phone", "status", "created_at", "role"]
+
+async def export_users(
+    db: AsyncSession,
+    export_format: UserExportFormat,
+    keyword: Optional[str] = None,
+    status: Optional[str] = None,
+    role: Optional[str] = None
+) -> AsyncIterator[str]:
+    """Stream filtered users as CSV or NDJSON chunks from a server-side cursor"""
+    # Role is resolved inside the one query instead of per user
+    query = _apply_user_filters(select(*_user_columns(USER_EXPORT_COLUMNS)), keyword, status, role).order_by(Users.id.asc())
+    
+    if export_format == UserExportFormat.CSV:
+        yield ",".join(USER_EXPORT_COLUMNS) + "\r\n"
+    
+    result = await db.stream(query.execution_options(yield_per=settings.USER_EXPORT_CHUNK_SIZE))
+    async for partition in result.partitions():
+        buffer = io.StringIO()
+        if export_format == UserExportFormat.CSV:
+            writer = csv.writer(buffer)
+            for row in partition:
+                writer.writerow([
+                    row.id,
+                    row.email,
+                    row.first_name,
+                    row.last_name,
+                    row.phone,
+                    "true" if row.status else "false",
+                    row.created_at.isoformat() if row.created_at else "",
+                    row.role or ""
+                ])
+        else:
+            for row in partition:
+                record = dict(row._mapping)
+                record["created_at"] = row.created_at.isoformat() if row.created_at else None
+                buffer.write(json.dumps(record, ensure_ascii=False))
+                buffer.write("\n")
+        yield buffer.getvalue()
+
 async def create_user(db: AsyncSession, user_data: UserCreate) -> UserResponse:
     """Create a new user"""
     try:
@@ -198,57 +351,149 @@ async def create_user(db: AsyncSession, user_data: UserCreate) -> UserResponse:
     except Exception as e:
         raise ServerException(f"Failed to create user: {str(e)}")
 
-async def update_user(db: AsyncSession, user_id: str, user_data: UserUpdate) -> UserResponse:
-    """Update user information"""
+async def update_user(
+    db: AsyncSession,
+    user_id: str,
+    user_data: UserUpdate,
+    fields: Optional[List[str]] = None
+) -> Union[UserResponse, Dict[str, Any]]:
+    """Update user information, optionally returning only the requested fields"""
     try:
         result = await db.execute(
-            select(Users).where(Users.id == user_id)
+            select(Users.email).where(Users.id == user_id)
         )
-        user = result.scalar_one_or_none()
-        if not user:
+        current_email = result.scalar_one_or_none()
+        if current_email is None:
             raise NotFoundException("User not found")
         
         # Check if the email is already used by another user
-        if user_data.email and user_data.email != user.email:
+        if user_data.email and user_data.email != current_email:
             result = await db.execute(
-                select(Users).where(Users.email == user_data.email, Users.id != user_id)
+                select(Users.id).where(Users.email == user_data.email, Users.id != user_id)
             )
             if result.scalar_one_or_none():
                 raise ConflictException("Email already exists")
         
         update_data = user_data.model_dump(exclude_unset=True, exclude={'role'})
-        for field, value in update_data.items():
-            setattr(user, field, value)
-        
-        await db.commit()
-        await db.refresh(user)
+        if update_data:
+            await db.execute(
+                update(Users).where(Users.id == user_id).values(**update_data)
+            )
+            await db.commit()
         
         if 'role' in user_data.model_dump(exclude_unset=True):
             await _update_user_role(db, user_id, user_data.role)
         
-        role_query = select(Roles.name).join(
-            RoleMapper, Roles.id == RoleMapper.role_id
-        ).where(RoleMapper.user_id == user.id).limit(1)
-        
-        role_result = await db.execute(role_query)
-        user_role = role_result.scalar()
-        
-        return UserResponse(
-            id=user.id,
-            email=user.email,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            phone=user.phone,
-            status=user.status,
-            created_at=user.created_at,
-            role=user_role
-        )
+        user = await _get_user_fields(db, user_id, fields or USER_FIELDS)
+        if fields:
+            return user
+        return UserResponse(**user)
         
     except (ConflictException, NotFoundException):
         raise
     except Exception as e:
         raise ServerException(f"Failed to update user: {str(e)}")
 
+async def bulk_update_users(
+    db: AsyncSession,
+    redis_client: redis.Redis,
+    update_data: UserBulkUpdate,
+    token: Optional[dict] = None
+) -> UserUpdateBatchResponse:
+    """Apply one status/role patch to many users with set-based statements in one transaction"""
+    patch = update_data.model_dump(exclude_unset=True, exclude={"user_ids"})
+    if not patch:
+        raise ValidationException("No fields to update")
+    
+    try:
+        current_user_id = token.get("sub") if token else None
+        user_ids = list(dict.fromkeys(update_data.user_ids))
+        failures = {}
+        
+        result = await db.execute(
+            select(Users.id).where(Users.id.in_(user_ids))
+        )
+        existing_ids = set(result.scalars().all())
+        
+        role_id = None
+        if patch.get("role"):
+            role_result = await db.execute(
+                select(Roles.id).where(Roles.name == patch["role"])
+            )
+            role_id = role_result.scalar_one_or_none()
+        
+        for user_id in user_ids:
+            if user_id not in existing_ids:
+                failures[user_id] = "User not found"
+            elif patch.get("role") and role_id is None:
+                failures[user_id] = f"Role '{patch['role']}' not found"
+            elif patch.get("status") is False and user_id == current_user_id:
+                failures[user_id] = "Cannot disable your own account"
+        
+        target_ids = [user_id for user_id in user_ids if user_id not in failures]
+        revoked_session_ids = []
+        
+        if target_ids:
+            if "status" in patch:
+                await db.execute(
+                    update(Users).where(Users.id.in_(target_ids)).values(status=patch["status"])
+                )
+            
+            if "role" in patch:
+                await db.execute(
+                    delete(RoleMapper).where(RoleMapper.user_id.in_(target_ids))
+                )
+                if role_id:
+                    await db.execute(
+                        insert(RoleMapper),
+                        [{"user_id": user_id, "role_id": role_id} for user_id in target_ids]
+                    )
+            
+            if patch.get("status") is False:
+                session_result = await db.execute(
+                    select(UserSessions.id).where(
+                        UserSessions.user_id.in_(target_ids),
+                        UserSessions.is_active == True
+                    )
+                )
+                revoked_session_ids = session_result.scalars().all()
+                if revoked_session_ids:
+                    await db.execute(
+                        update(UserSessions)
+                        .where(UserSessions.id.in_(revoked_session_ids))
+                        .values(is_active=False)
+                    )
+            
+            await db.commit()
+        
+        if revoked_session_ids:
+            # A single multi-key DEL revokes every disabled user's session in one round trip.
+            # The update is already committed, so a Redis failure is logged rather than
+            # reported as a failed update that clients would retry
+            try:
+                await redis_call(redis_client.delete(*(f"session:{sid}" for sid in revoked_session_ids)), name="delete")
+            except Exception as e:
+                logger.error(f"Failed to revoke {len(revoked_session_ids)} cached sessions after bulk update: {e}")
+        
+        results = [
+            UserUpdateResult(
+                user_id=user_id,
+                status="failed" if user_id in failures else "success",
+                message=failures.get(user_id, "User updated successfully")
+            )
+            for user_id in user_ids
+        ]
+        
+        return UserUpdateBatchResponse(
+            results=results,
+            total_users=len(user_ids),
+            success_count=len(target_ids),
+            failed_count=len(failures)
+        )
+        
+    except Exception as e:
+        raise ServerException(f"Failed to update users: {str(e)}")
+
 async def delete_users(db: AsyncSession, redis_client: redis.Redis, user_ids: List[str], token: Optional[dict] = None) -> UserDeleteBatchResponse:
     """Delete multiple users with detailed batch processing results"""
     try:
@@ -354,6 +599,239 @@ async def reset_user_password(
     except Exception as e:
         raise ServerException(f"Failed to reset password: {str(e)}")
 
+def get_import_format(content_type: Optional[str]) -> Optional[UserImportFormat]:
+    """Detect import format from the request Content-Type header"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in ("text/csv", "application/csv"):
+        return UserImportFormat.CSV
+    if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"):
+        return UserImportFormat.NDJSON
+    return None
+
+async def import_users(
+    db: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    import_format: UserImportFormat
+) -> UserImportResponse:
+    """Import users from a streamed CSV or NDJSON body using batched inserts"""
+    try:
+        role_ids = await _get_role_id_map(db)
+        errors = []
+        errors_truncated = False
+        total_rows = 0
+        failed_count = 0
+        batch = []
+        
+        async def flush(batch):
+            nonlocal failed_count, errors_truncated
+            batch_errors = sorted(await _import_user_batch(db, batch, role_ids), key=lambda error: error.row)
+            failed_count += len(batch_errors)
+            # Keep the error report bounded so memory stays flat for large files
+            room = settings.USER_IMPORT_MAX_ERRORS - len(errors)
+            if len(batch_errors) > room:
+                errors_truncated = True
+            errors.extend(batch_errors[:max(room, 0)])
+        
+        async for row in _iter_import_rows(_limit_body_size(chunks, settings.USER_IMPORT_MAX_BYTES), import_format):
+            total_rows += 1
+            if total_rows > settings.USER_IMPORT_MAX_ROWS:
+                raise PayloadTooLargeException(
+                    f"Import exceeds {settings.USER_IMPORT_MAX_ROWS} rows",
+                    details={"processed_rows": total_rows - 1 - len(batch)}
+                )
+            batch.append(row)
+            if len(batch) >= settings.USER_IMPORT_BATCH_SIZE:
+                await flush(batch)
+                batch = []
+        
+        if batch:
+            await flush(batch)
+        
+        return UserImportResponse(
+            errors=errors,
+            total_rows=total_rows,
+            success_count=total_rows - failed_count,
+            failed_count=failed_count,
+            errors_truncated=errors_truncated
+        )
+        
+    except PayloadTooLargeException:
+        raise
+    except Exception as e:
+        raise ServerException(f"Failed to import users: {str(e)}")
+
+async def _get_role_id_map(db: AsyncSession) -> Dict[str, str]:
+    """Get all roles as a name to id map"""
+    result = await db.execute(select(Roles.name, Roles.id))
+    return {row.name: row.id for row in result}
+
+async def _limit_body_size(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    """Pass the body through, raising PayloadTooLargeException once it exceeds `max_bytes`"""
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            raise PayloadTooLargeException(f"Import body exceeds {max_bytes} bytes")
+        yield chunk
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a streamed body into text lines without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+async def _iter_import_rows(
+    chunks: AsyncIterator[bytes],
+    import_format: UserImportFormat
+) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (row number, row data, parse error) for each non-empty row"""
+    header = None
+    row_number = 0
+    pending_lines = []
+    pending_quotes = 0
+    async for line in _iter_lines(chunks):
+        if not pending_lines and not line.strip():
+            continue
+        
+        if import_format == UserImportFormat.CSV:
+            # A quoted field may span lines: RFC 4180 escapes quotes by doubling them,
+            # so the record is complete once its quote count is even
+            pending_lines.append(line)
+            pending_quotes += line.count('"')
+            if pending_quotes % 2:
+                continue
+            record = "\n".join(pending_lines)
+            pending_lines = []
+            pending_quotes = 0
+            values = next(csv.reader([record]))
+            if header is None:
+                header = [column.strip().lower() for column in values]
+                continue
+            row_number += 1
+            if len(values) != len(header):
+                yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            # Empty CSV cells fall back to schema defaults
+            yield row_number, {k: v.strip() for k, v in zip(header, values) if v.strip()}, None
+        else:
+            row_number += 1
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield row_number, None, "Invalid JSON"
+                continue
+            if not isinstance(row, dict):
+                yield row_number, None, "Row must be a JSON object"
+                continue
+            yield row_number, row, None
+    
+    if pending_lines and header is not None:
+        yield row_number + 1, None, "Unterminated quoted field"
+
+def _import_integrity_message(error: IntegrityError, user_data: UserCreate) -> str:
+    """Describe why a single import row was rejected by the database"""
+    code = error.orig.args[0] if error.orig is not None and error.orig.args else None
+    if code == MYSQL_DUPLICATE_ENTRY:
+        return "Email already exists"
+    if code == MYSQL_NO_REFERENCED_ROW and user_data.role:
+        return f"Role '{user_data.role}' not found"
+    logger.warning("Import row %s rejected by the database: %s", user_data.email, error.orig)
+    return "Rejected by a database constraint"
+
+async def _import_user_batch(
+    db: AsyncSession,
+    batch: List[Tuple[int, Optional[dict], Optional[str]]],
+    role_ids: Dict[str, str]
+) -> List[UserImportError]:
+    """Validate, hash and insert one batch of import rows, returning per-row errors"""
+    errors = []
+    valid_rows = []
+    seen_emails = set()
+    
+    for row_number, row, parse_error in batch:
+        if parse_error:
+            errors.append(UserImportError(row=row_number, message=parse_error))
+            continue
+        
+        email = row.get("email") if isinstance(row.get("email"), str) else None
+        try:
+            user_data = UserCreate(**row)
+        except ValidationError as e:
+            err = e.errors()[0]
+            field = ".".join(str(loc) for loc in err["loc"])
+            errors.append(UserImportError(row=row_number, email=email, message=f"{field}: {err['msg']}"))
+            continue
+        
+        if user_data.role and user_data.role not in role_ids:
+            errors.append(UserImportError(row=row_number, email=email, message=f"Role '{user_data.role}' not found"))
+            continue
+        
+        if user_data.email.lower() in seen_emails:
+            errors.append(UserImportError(row=row_number, email=email, message="Duplicate email in import file"))
+            continue
+        
+        seen_emails.add(user_data.email.lower())
+        valid_rows.append((row_number, user_data))
+    
+    if valid_rows:
+        result = await db.execute(
+            select(Users.email).where(Users.email.in_([user_data.email for _, user_data in valid_rows]))
+        )
+        existing_emails = {email.lower() for email in result.scalars().all()}
+        if existing_emails:
+            for row_number, user_data in valid_rows:
+                if user_data.email.lower() in existing_emails:
+                    errors.append(UserImportError(row=row_number, email=user_data.email, message="Email already exists"))
+            valid_rows = [item for item in valid_rows if item[1].email.lower() not in existing_emails]
+    
+    if not valid_rows:
+        return errors
+    
+    hashed_passwords = await hash_passwords([user_data.password for _, user_data in valid_rows])
+    
+    user_rows = []
+    role_rows = []
+    for (row_number, user_data), hashed in zip(valid_rows, hashed_passwords):
+        user_id = str(uuid7())
+        user_rows.append({
+            "id": user_id,
+            "first_name": user_data.first_name,
+            "last_name": user_data.last_name,
+            "email": user_data.email,
+            "phone": user_data.phone,
+            "hash_password": hashed,
+            "status": user_data.status
+        })
+        role_rows.append({"user_id": user_id, "role_id": role_ids[user_data.role]} if user_data.role else None)
+    
+    try:
+        await db.execute(insert(Users), user_rows)
+        mapped_roles = [role_row for role_row in role_rows if role_row]
+        if mapped_roles:
+            await db.execute(insert(RoleMapper), mapped_roles)
+        await db.commit()
+    except IntegrityError:
+        # A concurrent write took one of the emails or deleted a role, retry row by row to isolate it
+        await db.rollback()
+        for (row_number, user_data), user_row, role_row in zip(valid_rows, user_rows, role_rows):
+            try:
+                await db.execute(insert(Users), [user_row])
+                if role_row:
+                    await db.execute(insert(RoleMapper), [role_row])
+                await db.commit()
+            except IntegrityError as e:
+                await db.rollback()
+                errors.append(UserImportError(row=row_number, email=user_data.email, message=_import_integrity_message(e, user_data)))
+    
+    return errors
+
 async def _assign_user_role(db: AsyncSession, user_id: str, role_name: str) -> None:
     """Assign a role to a user"""
     try:
@@ -0,0 +1,87 @@
+"""
+Measure the per-request overhead of the middleware stack.
+
+Runs the same route through a bare FastAPI app and through an app with
+register_middlewares() applied, calling the ASGI interface directly so the
+numbers are not dominated by an HTTP client.
+
+Usage (from the backend directory, with the usual environment variables set):
+    python -m benchmarks.middleware_overhead [--requests 20000]
+"""
+import time
+import asyncio
+import argparse
+from fastapi import FastAPI
+from middleware import register_middlewares
+
+
+def build_app(with_middlewares: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    if with_middlewares:
+        register_middlewares(app)
+    return app
+
+
+def build_scope() -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/ping",
+        "raw_path": b"/api/ping",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"origin", b"http://localhost:3000"),
+            (b"user-agent", b"middleware-benchmark"),
+        ],
+        # Whitelisted client so the rate limiter does not need Redis
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+
+
+async def call(app: FastAPI) -> None:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(build_scope(), receive, send)
+
+
+async def measure(app: FastAPI, requests: int) -> float:
+    """Return the mean time per request in microseconds"""
+    for _ in range(min(requests // 10, 1000)):
+        await call(app)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+async def main(requests: int) -> None:
+    bare = await measure(build_app(False), requests)
+    stacked = await measure(build_app(True), requests)
+
+    print(f"requests per run:      {requests}")
+    print(f"bare app:              {bare:8.1f} us/request")
+    print(f"with middlewares:      {stacked:8.1f} us/request")
+    print(f"middleware overhead:   {stacked - bare:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Middleware stack overhead benchmark")
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -3,7 +3,10 @@ load_dotenv()  # Load .env
 
 import os
 import yaml
+from typing import Dict, List
 import logging.config
+from core.log_queue import start_log_queue
+from core.log_writer import FILE_HANDLER_NAME, make_writer_handler
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -17,6 +20,63 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
     SSL_ENABLE: bool = False
 
+    # Logging settings
+    LOG_FORMAT: str = "text"  # "text" or "json"
+    LOG_QUEUE_SIZE: int = 10000  # records buffered for the background log writer
+    LOG_AGGREGATION: bool = True  # under gunicorn, one process writes logs/app.log for all workers
+    LOG_WRITER_BATCH_SIZE: int = 500
+    LOG_WRITER_PUT_TIMEOUT_SECONDS: float = 1.0  # a worker waits this long on a full writer queue before dropping a record
+
+    # Access log settings: errors (status >= 400) and slow requests are always logged, the rest sampled
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+    ACCESS_LOG_SAMPLE_RATES: Dict[str, float] = {}  # per route template, e.g. {"/api/auth/token": 0.01}
+    ACCESS_LOG_SLOW_MS: float = 1000
+    ACCESS_LOG_MAX_LINES_PER_SECOND: int = 200  # per worker, beyond this lines are only counted; 5xx and slow lines are exempt
+    ACCESS_LOG_SUMMARY_INTERVAL_SECONDS: float = 60  # 0 disables the per-route summary
+    ACCESS_LOG_SUMMARY_RESERVOIR: int = 1024  # latency samples kept per route for percentiles
+
+    # Metrics settings
+    METRICS_ENABLED: bool = True  # Prometheus /metrics, blocked at nginx and scraped on the Docker network
+    # Client IPs (resolved behind TRUSTED_PROXIES) that may read /metrics; others get 404.
+    # Add a scraper outside the compose network by its address, e.g. "10.0.5.9/32"
+    METRICS_ALLOWED_NETWORKS: List[str] = ["127.0.0.1/32", "::1/128", "10.250.0.0/24"]
+    METRICS_MULTIPROC_DIR: str = "/tmp/prometheus_multiproc"  # shared by gunicorn workers
+    SERVER_TIMING_ENABLED: bool = False  # per-request db/redis/hash breakdown in Server-Timing and access logs
+    QUERY_COUNTER_ENABLED: bool = True  # per-request statement count, DB time and N+1 detection
+    REPEATED_QUERY_THRESHOLD: int = 10  # same normalized SQL more often than this in one request is flagged
+
+    # Diagnostics settings: on-demand profiler, memory snapshots and the slow request watchdog
+    PROFILER_MAX_SECONDS: float = 30
+    PROFILER_MAX_HZ: int = 250
+    PROFILER_MAX_OVERHEAD: float = 0.02  # sampler backs off to stay under this share of wall time
+    MEMORY_TRACE_FRAMES: int = 0  # >0 starts tracemalloc with this depth in every worker at startup
+    MEMORY_SNAPSHOT_DIR: str = "/tmp/memory_snapshots"  # shared by workers, so any worker can diff any snapshot
+    MEMORY_MAX_SNAPSHOTS_PER_WORKER: int = 10
+    SLOW_REQUEST_WATCHDOG_ENABLED: bool = True
+    SLOW_REQUEST_THRESHOLD_SECONDS: float = 1.0
+    SLOW_REQUEST_CAPTURE_LIMIT: int = 50  # captures kept per worker
+
+    # Event loop lag is always sampled into event_loop_lag_seconds; admission control also reads it
+    EVENT_LOOP_LAG_INTERVAL_SECONDS: float = 0.1
+
+    # Admission control: shed non-priority requests with 503 while a worker is overloaded
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_LOOP_LAG_SECONDS: float = 0.5
+    ADMISSION_MAX_IN_FLIGHT: int = 200  # per worker
+    ADMISSION_RETRY_AFTER_SECONDS: int = 2
+    ADMISSION_PRIORITY_PATHS: List[str] = ["/api/auth/token", "/healthz", "/metrics"]  # always admitted
+
+    # Tracing settings: spans around DB, Redis and hashing calls per request, exported as OTLP/JSON
+    TRACING_ENABLED: bool = False
+    TRACE_SAMPLE_RATE: float = 0.01  # slow, failed and upstream-sampled requests are always exported
+    TRACE_SLOW_MS: float = 1000
+    TRACE_MAX_SPANS: int = 500  # per request, beyond this spans are only counted
+    TRACE_OTLP_ENDPOINT: str = ""  # OTLP/HTTP collector, e.g. http://otel-collector:4318/v1/traces
+    TRACE_EXPORT_FILE: str = "logs/traces.jsonl"  # used when no endpoint is set
+    TRACE_EXPORT_FILE_MAX_BYTES: int = 100 * 1024 * 1024  # rotated to <file>.1 beyond this
+    TRACE_EXPORT_QUEUE_SIZE: int = 1000  # traces waiting for the exporter thread, per worker
+    TRACE_SERVICE_NAME: str = "backend"
+
     # Database settings
     DATABASE_URL: str
     DATABASE_URL_TEST: str
@@ -35,6 +95,7 @@ class Settings(BaseSettings):
     HOSTNAME: str
     BACKEND_PORT: str
     FRONTEND_PORT: str
+    CORS_PREFLIGHT_CACHE_SIZE: int = 1024
 
     # JWT settings
     SECRET_KEY: str
@@ -55,6 +116,37 @@ class Settings(BaseSettings):
     RATE_LIMIT: int = 200
     RATE_LIMIT_WINDOW_SECONDS: int = 300  # 5 minutes
     BLOCK_TIME_SECONDS: int = 600  # 10 minutes
+    # Proxies allowed to set X-Forwarded-For / X-Real-IP: loopback and the compose backend-network,
+    # where nginx runs. Any other peer is taken as the client. To put another proxy or load balancer
+    # in front, add only its address, e.g. TRUSTED_PROXIES='["127.0.0.1/32", "::1/128", "10.250.0.0/24", "10.0.5.7/32"]'
+    TRUSTED_PROXIES: List[str] = ["127.0.0.1/32", "::1/128", "10.250.0.0/24"]
+
+    # Rate limit settings: per-worker local counting and the per-IP CPU cost budget
+    RATE_LIMIT_LOCAL_SYNC_BATCH: int = 10  # requests counted per worker before syncing to Redis
+    RATE_LIMIT_LOCAL_SYNC_INTERVAL_SECONDS: float = 5
+    RATE_LIMIT_LOCAL_THRESHOLD: float = 0.8  # fraction of the limit after which every request syncs
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = 10000
+    RATE_LIMIT_CPU_BUDGET: int = 100  # cost units per IP, see core.rate_limit.request_cost
+    RATE_LIMIT_CPU_WINDOW_SECONDS: int = 60
+
+    # Password hashing settings
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_CONCURRENCY: int = 16  # in-flight hashing requests per worker
+
+    # Redis guard settings
+    REDIS_CALL_TIMEOUT_SECONDS: float = 0.25
+    REDIS_BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive failures before the breaker opens
+    REDIS_BREAKER_RESET_SECONDS: float = 10
+    SESSION_LOCAL_CACHE_SECONDS: float = 30  # used only while Redis is unavailable
+    SESSION_LOCAL_CACHE_MAX_ENTRIES: int = 10000
+
+    # User import/export settings
+    USER_IMPORT_BATCH_SIZE: int = 500
+    USER_IMPORT_MAX_ERRORS: int = 1000
+    USER_IMPORT_MAX_ROWS: int = 100000
+    USER_IMPORT_MAX_BYTES: int = 50 * 1024 * 1024  # keep nginx's client_max_body_size for /api/users/import in sync
+    USER_EXPORT_CHUNK_SIZE: int = 1000
+    USER_FACETS_CACHE_TTL_SECONDS: int = 30
 
     # Default admin user settings
     DEFAULT_ADMIN_EMAIL: str = "admin@example.com"
@@ -79,4 +171,32 @@ def setup_logging(yaml_path="logging_config.yaml"):
     if "loggers" in config:
         for logger in config["loggers"].values():
             logger["level"] = log_level
-    logging.config.dictConfig(config)
\ No newline at end of file
+    # Structured output: every handler writes JSON lines
+    if settings.LOG_FORMAT == "json":
+        config["formatters"] = {name: {"()": "core.log_formatter.JsonFormatter"} for name in config.get("formatters", {})}
+    else:
+        config["formatters"] = {
+            name: {"()": "core.log_formatter.TextFormatter", "fmt": formatter.get("format")}
+            for name, formatter in config.get("formatters", {}).items()
+        }
+    # Under gunicorn with log aggregation, the master's writer process owns the log file
+    file_config = config["handlers"].get(FILE_HANDLER_NAME, {})
+    writer_handler = make_writer_handler(
+        file_config,
+        config["formatters"].get(file_config.get("formatter"), {}).get("fmt"),
+        settings.LOG_FORMAT == "json",
+        settings.LOG_WRITER_PUT_TIMEOUT_SECONDS
+    ) if file_config else None
+    writer_loggers = []
+    if writer_handler is not None:
+        config["handlers"].pop(FILE_HANDLER_NAME, None)
+        logger_configs = {None: config.get("root", {}), **config.get("loggers", {})}
+        for name, logger in logger_configs.items():
+            if FILE_HANDLER_NAME in logger.get("handlers", []):
+                logger["handlers"] = [h for h in logger["handlers"] if h != FILE_HANDLER_NAME]
+                writer_loggers.append(name)
+    logging.config.dictConfig(config)
+    for name in writer_loggers:
+        logging.getLogger(name).addHandler(writer_handler)
+    # Run the configured handlers on a background thread behind a bounded queue
+    start_log_queue([None, *config.get("loggers", {})], settings.LOG_QUEUE_SIZE)
\ No newline at end of file
@@ -1,6 +1,13 @@
+import time
 import logging
 from core.config import settings
-from sqlalchemy import create_engine
+from core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_WAIT
+from core.request_timing import record_timing
+from core.query_counter import record_query
+from core.slow_requests import note_statement
+from core.tracing import SPAN_KIND_CLIENT, begin_span, end_span
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
@@ -13,11 +20,31 @@ def make_async_url(url: str) -> str:
         return url.replace("mysql+pymysql://", "mysql+aiomysql://", 1)
     return url
 
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """API connection pool that reports checkout wait time and usage to /metrics"""
+
+    def _do_get(self):
+        start_time = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start_time)
+            self._report_usage()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._report_usage()
+
+    def _report_usage(self):
+        DB_POOL_CHECKED_OUT.set(self.checkedout())
+        DB_POOL_OVERFLOW.set(max(self.overflow(), 0))
+
 # Async engine/session for API
 async_engine = create_async_engine(
     make_async_url(settings.DATABASE_URL),
     echo=settings.DEBUG_MODE,
     future=True,
+    poolclass=InstrumentedAsyncQueuePool,
     pool_pre_ping=True,
     pool_recycle=settings.DB_POOL_RECYCLE,
     pool_size=settings.DB_POOL_SIZE,
@@ -31,6 +58,46 @@ AsyncSessionLocal = async_sessionmaker(
     bind=async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False, autocommit=False
 )
 
+# Per-request query count and time, for the query counter and the Server-Timing header,
+# the statement in progress for slow request captures, and a span per statement for tracing
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.query_started_at = time.perf_counter()
+    note_statement(statement)
+    context.query_span = begin_span("db.query", SPAN_KIND_CLIENT, {
+        "db.system.name": "mysql",
+        "db.operation.name": statement.split(None, 1)[0].upper() if statement else None,
+        "db.query.text": statement,
+    })
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.query_started_at
+    note_statement(None)
+    record_timing("db", elapsed)
+    record_query(statement, elapsed)
+    end_span(context.query_span)
+
+def _handle_error(exception_context):
+    # Failed statements never reach after_cursor_execute
+    context = exception_context.execution_context
+    span = getattr(context, "query_span", None)
+    if span is not None:
+        context.query_span = None
+        end_span(span, exception_context.original_exception)
+
+def instrument_engine(engine):
+    """Report an async engine's statements to the active request timing, query counter and trace"""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+if (
+    settings.SERVER_TIMING_ENABLED
+    or settings.QUERY_COUNTER_ENABLED
+    or settings.SLOW_REQUEST_WATCHDOG_ENABLED
+    or settings.TRACING_ENABLED
+):
+    instrument_engine(async_engine)
+
 # Sync engine/session for migration and schedule
 engine = create_engine(
     settings.DATABASE_URL,
@@ -0,0 +1,56 @@
+import json
+import logging
+from datetime import datetime
+
+# First-class fields copied from a record's `extra` when present
+LOG_FIELDS = (
+    "event",
+    "request_id",
+    "route",
+    "method",
+    "path",
+    "status",
+    "duration_ms",
+    "ip",
+    "user_agent",
+    "user_id",
+    "error_code",
+    "stats",
+    "timings",
+    "queries",
+)
+
+class TextFormatter(logging.Formatter):
+    """Format records as text lines, appending the request id of records logged while serving a request"""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        request_id = getattr(record, "request_id", None)
+        # Access lines already carry it in their message
+        if request_id and "request_id=" not in record.message:
+            line += f" request_id={request_id}"
+        return line
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, for LOG_FORMAT=json"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created).astimezone().isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in LOG_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                payload[field] = value
+
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exception"] = record.exc_text
+        if record.stack_info:
+            payload["stack"] = self.formatStack(record.stack_info)
+
+        return json.dumps(payload, ensure_ascii=False, default=str)
@@ -0,0 +1,119 @@
+import copy
+import queue
+import atexit
+import logging
+from typing import List, Optional, Tuple
+from logging.handlers import QueueHandler, QueueListener
+from core.request_context import get_request_id
+
+_exception_formatter = logging.Formatter()
+
+def prepare_record(record: logging.LogRecord) -> logging.LogRecord:
+    """
+    Copy a record for another thread or process: merge the message arguments and
+    render the traceback into exc_text, keeping `extra` fields and the raw message
+    apart so the final formatter (text or JSON) still sees them.
+    """
+    record = copy.copy(record)
+    record.msg = record.getMessage()
+    record.args = None
+    if record.exc_info:
+        record.exc_text = _exception_formatter.formatException(record.exc_info)
+        record.exc_info = None
+    return record
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks the caller.
+
+    Records are put on a bounded queue together with the handlers they are meant for;
+    when the queue is full the record is dropped and counted instead.
+    """
+    dropped = 0
+
+    def __init__(self, log_queue: queue.Queue, target_handlers: Tuple[logging.Handler, ...]):
+        super().__init__(log_queue)
+        self.target_handlers = target_handlers
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = prepare_record(record)
+        # Runs in the logging thread; context variables do not reach the listener thread
+        if getattr(record, "request_id", None) is None:
+            record.request_id = get_request_id()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait((record, self.target_handlers))
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+class DispatchingQueueListener(QueueListener):
+    """Single background listener that passes each record to the handlers it was queued for"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue, respect_handler_level=True)
+        self.reported_dropped = 0
+        self.last_handlers: Tuple[logging.Handler, ...] = ()
+
+    def _emit(self, record: logging.LogRecord, handlers: Tuple[logging.Handler, ...]):
+        for handler in handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def report_dropped(self):
+        """Log how many records were dropped since the last report"""
+        dropped = DroppingQueueHandler.dropped
+        if dropped > self.reported_dropped:
+            warning = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0,
+                "Log queue full, dropped %d log records (%d total)",
+                (dropped - self.reported_dropped, dropped), None
+            )
+            self.reported_dropped = dropped
+            self._emit(warning, self.last_handlers)
+
+    def handle(self, item: Tuple[logging.LogRecord, Tuple[logging.Handler, ...]]):
+        record, handlers = item
+        self.last_handlers = handlers
+        self.report_dropped()
+        self._emit(self.prepare(record), handlers)
+
+    def stop(self):
+        super().stop()
+        self.report_dropped()
+
+_listener: Optional[DispatchingQueueListener] = None
+
+def start_log_queue(logger_names: List[Optional[str]], maxsize: int):
+    """
+    Move the handlers of the given loggers (None for root) behind a bounded queue,
+    so file and console I/O run on a background thread instead of the event loop.
+    """
+    global _listener
+    stop_log_queue()
+
+    log_queue = queue.Queue(maxsize=maxsize)
+    for name in logger_names:
+        logger = logging.getLogger(name)
+        handlers = tuple(h for h in logger.handlers if not isinstance(h, DroppingQueueHandler))
+        if not handlers:
+            continue
+        for handler in handlers:
+            logger.removeHandler(handler)
+        logger.addHandler(DroppingQueueHandler(log_queue, handlers))
+
+    _listener = DispatchingQueueListener(log_queue)
+    _listener.start()
+
+def stop_log_queue():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def get_dropped_log_records() -> int:
+    return DroppingQueueHandler.dropped
+
+atexit.register(stop_log_queue)
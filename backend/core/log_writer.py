@@ -0,0 +1,174 @@
+import os
+import time
+import queue
+import yaml
+import signal
+import logging
+import multiprocessing
+from typing import Optional
+from logging.handlers import QueueHandler, TimedRotatingFileHandler
+from core.log_queue import DroppingQueueHandler, prepare_record
+from core.log_formatter import JsonFormatter, TextFormatter
+
+FILE_HANDLER_NAME = "file"
+
+# Created by the gunicorn master before forking, so every worker inherits it
+_writer_queue: Optional[multiprocessing.Queue] = None
+_writer_process: Optional[multiprocessing.Process] = None
+
+class BatchedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """Rotating file handler that is flushed once per batch by the writer instead of per record"""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+def _make_formatter(log_format: Optional[str], json_logs: bool) -> logging.Formatter:
+    return JsonFormatter() if json_logs else TextFormatter(log_format)
+
+def _is_process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class ProcessQueueHandler(QueueHandler):
+    """
+    Send records to the shared log writer process.
+
+    Runs on the background log thread, never on the event loop, so a full writer queue
+    blocks for up to `put_timeout` and the backpressure lands in the bounded in-process
+    queue instead of discarding records. A record is only dropped (and counted) when the
+    writer stays stuck for the whole timeout. Once the writer process is gone, records
+    go to `fallback_handler` instead, which appends to the log file without rotating it.
+    """
+    def __init__(self, log_queue: multiprocessing.Queue, writer_pid: int, fallback_handler: logging.Handler,
+                 put_timeout: float = 1.0, check_interval: float = 1.0):
+        super().__init__(log_queue)
+        self.writer_pid = writer_pid
+        self.fallback_handler = fallback_handler
+        self.put_timeout = put_timeout
+        self.check_interval = check_interval
+        self.writer_alive = True
+        self._checked_at = time.monotonic()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return prepare_record(record)
+
+    def _check_writer(self, force: bool = False) -> bool:
+        now = time.monotonic()
+        if self.writer_alive and (force or now - self._checked_at >= self.check_interval):
+            self._checked_at = now
+            if not _is_process_alive(self.writer_pid):
+                self.writer_alive = False
+                self.fallback_handler.handle(logging.makeLogRecord({
+                    "name": __name__,
+                    "levelno": logging.ERROR,
+                    "levelname": "ERROR",
+                    "msg": f"Log writer process {self.writer_pid} is gone, writing logs from worker {os.getpid()} directly",
+                }))
+        return self.writer_alive
+
+    def enqueue(self, record: logging.LogRecord):
+        if self._check_writer():
+            try:
+                self.queue.put(record, timeout=self.put_timeout)
+                return
+            except queue.Full:
+                if self._check_writer(force=True):
+                    DroppingQueueHandler.dropped += 1
+                    return
+        self.fallback_handler.handle(record)
+
+    def close(self):
+        self.fallback_handler.close()
+        super().close()
+
+def make_writer_handler(handler_config: dict, log_format: Optional[str], json_logs: bool, put_timeout: float) -> Optional[ProcessQueueHandler]:
+    """
+    Handler that replaces the file handler in a worker forked from a master running the
+    writer, or None outside of one. `handler_config` is the file handler's logging config.
+    """
+    if _writer_queue is None:
+        return None
+    # Appending without rotation is safe from several processes; only the writer rotates
+    fallback_handler = logging.FileHandler(handler_config["filename"], encoding=handler_config.get("encoding"), delay=True)
+    fallback_handler.setFormatter(_make_formatter(log_format, json_logs))
+    return ProcessQueueHandler(_writer_queue, _writer_process.pid, fallback_handler, put_timeout)
+
+def _run_writer(log_queue: multiprocessing.Queue, handler_kwargs: dict, log_format: Optional[str], json_logs: bool, batch_size: int):
+    """Writer process: owns the log file and its rotation, writes records in batches"""
+    # Shutdown is driven by the master through the queue sentinel
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    handler = BatchedTimedRotatingFileHandler(**handler_kwargs)
+    handler.setFormatter(_make_formatter(log_format, json_logs))
+
+    running = True
+    while running:
+        batch = [log_queue.get()]
+        while len(batch) < batch_size:
+            try:
+                batch.append(log_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        for record in batch:
+            if record is None:
+                running = False
+                continue
+            # Rotation happens here, in the only process that writes the file
+            handler.handle(record)
+        handler.flush_batch()
+
+    handler.close()
+
+def start_log_writer(yaml_path: str, maxsize: int, batch_size: int, json_logs: bool = False):
+    """
+    Start the process that writes the file handler's records for all workers.
+    Must run in the gunicorn master before workers are forked.
+    """
+    global _writer_queue, _writer_process
+    with open(yaml_path, "r") as f:
+        config = yaml.safe_load(f)
+
+    handler_kwargs = dict(config["handlers"][FILE_HANDLER_NAME])
+    handler_kwargs.pop("class", None)
+    handler_kwargs.pop("level", None)
+    formatter_name = handler_kwargs.pop("formatter", None)
+    log_format = config.get("formatters", {}).get(formatter_name, {}).get("format")
+
+    os.makedirs(os.path.dirname(handler_kwargs["filename"]) or ".", exist_ok=True)
+
+    _writer_queue = multiprocessing.Queue(maxsize=maxsize)
+    _writer_process = multiprocessing.Process(
+        target=_run_writer,
+        args=(_writer_queue, handler_kwargs, log_format, json_logs, batch_size),
+        name="log-writer",
+        daemon=True
+    )
+    _writer_process.start()
+
+def stop_log_writer(timeout: float = 5):
+    """Let the writer drain its queue and exit"""
+    global _writer_queue, _writer_process
+    if _writer_process is None:
+        return
+    try:
+        _writer_queue.put(None, timeout=timeout)
+    except queue.Full:
+        # The writer is stuck or gone; do not hang the master's shutdown
+        pass
+    _writer_process.join(timeout)
+    _writer_queue = None
+    _writer_process = None
+
+def get_writer_queue() -> Optional[multiprocessing.Queue]:
+    """Queue of the shared log writer, if this process was forked from a master running one"""
+    return _writer_queue
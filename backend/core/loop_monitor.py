@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from typing import Optional
+from core.config import settings
+from core.metrics import EVENT_LOOP_LAG
+
+logger = logging.getLogger(__name__)
+
+class EventLoopLagMonitor:
+    """
+    Measure how late the event loop runs scheduled callbacks.
+
+    A background task sleeps for `interval` and records how much later than
+    requested it woke up. `lag` is the smoothed recent lag; while the loop is
+    stalled right now, the time since the missed wake-up counts as lag too,
+    so callers see a blocked loop before the monitor itself gets to run.
+    """
+    def __init__(self, interval: float, smoothing: float = 0.3):
+        self.interval = interval
+        self.smoothing = smoothing
+        self.smoothed_lag = 0.0
+        self._expected_wake: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._expected_wake = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._expected_wake = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            sample = max(loop.time() - self._expected_wake, 0.0)
+            self.smoothed_lag += self.smoothing * (sample - self.smoothed_lag)
+            EVENT_LOOP_LAG.observe(sample)
+
+    @property
+    def lag(self) -> float:
+        if self._expected_wake is None:
+            return 0.0
+        stall = asyncio.get_running_loop().time() - self._expected_wake
+        return max(self.smoothed_lag, stall)
+
+loop_lag_monitor = EventLoopLagMonitor(settings.EVENT_LOOP_LAG_INTERVAL_SECONDS)
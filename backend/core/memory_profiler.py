@@ -0,0 +1,157 @@
+import os
+import re
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+# Snapshot files are named "<pid>-<epoch ms>.snapshot" so any worker can list and load them
+SNAPSHOT_ID_PATTERN = re.compile(r"^(\d+)-(\d+)$")
+SNAPSHOT_SUFFIX = ".snapshot"
+
+# Allocations made by tracemalloc itself and the import system are noise in diffs
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+class MemoryTracingError(Exception):
+    """tracemalloc is not running in this worker"""
+
+class SnapshotNotFoundError(Exception):
+    """No snapshot file exists for the given id"""
+
+def start_tracing(frames: int):
+    """Start tracemalloc keeping `frames` frames per allocation, restarting it if the depth changes"""
+    if tracemalloc.is_tracing():
+        if tracemalloc.get_traceback_limit() == frames:
+            return
+        tracemalloc.stop()
+    tracemalloc.start(frames)
+
+def stop_tracing():
+    tracemalloc.stop()
+
+def tracing_status() -> Dict:
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    return {
+        "pid": os.getpid(),
+        "tracing": tracing,
+        "frames": tracemalloc.get_traceback_limit() if tracing else 0,
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "tracemalloc_bytes": tracemalloc.get_tracemalloc_memory(),
+    }
+
+def _snapshot_info(snapshot_id: str, path: str) -> Dict:
+    pid, taken_at_ms = SNAPSHOT_ID_PATTERN.match(snapshot_id).groups()
+    return {
+        "snapshot_id": snapshot_id,
+        "pid": int(pid),
+        "taken_at": int(taken_at_ms) / 1000,
+        "file_bytes": os.path.getsize(path),
+    }
+
+def list_snapshots(directory: str, pid: Optional[int] = None) -> List[Dict]:
+    """Snapshots of every worker (or of one pid), oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in os.listdir(directory):
+        snapshot_id = name[:-len(SNAPSHOT_SUFFIX)]
+        if not name.endswith(SNAPSHOT_SUFFIX) or not SNAPSHOT_ID_PATTERN.match(snapshot_id):
+            continue
+        try:
+            info = _snapshot_info(snapshot_id, os.path.join(directory, name))
+        except FileNotFoundError:
+            # Pruned by another worker since listdir
+            continue
+        if pid is None or info["pid"] == pid:
+            snapshots.append(info)
+    return sorted(snapshots, key=lambda info: (info["pid"], info["taken_at"]))
+
+def _is_process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _prune_snapshots(directory: str, max_snapshots: int):
+    """
+    Keep the newest `max_snapshots` of this worker, and the newest `max_snapshots` left
+    behind by workers that have exited, so recycled workers cannot fill the directory
+    while a recent restart can still be diffed against.
+    """
+    own_pid = os.getpid()
+    alive = {}
+    own_snapshots, dead_snapshots = [], []
+    for info in list_snapshots(directory):
+        pid = info["pid"]
+        if pid == own_pid:
+            own_snapshots.append(info)
+            continue
+        if pid not in alive:
+            alive[pid] = _is_process_alive(pid)
+        if not alive[pid]:
+            dead_snapshots.append(info)
+
+    dead_snapshots.sort(key=lambda info: info["taken_at"])
+    for old in own_snapshots[:-max_snapshots] + dead_snapshots[:-max_snapshots]:
+        try:
+            os.remove(os.path.join(directory, old["snapshot_id"] + SNAPSHOT_SUFFIX))
+        except FileNotFoundError:
+            # Another worker pruned it first
+            pass
+
+def take_snapshot(directory: str, max_snapshots: int) -> Dict:
+    """
+    Snapshot this worker's traced allocations to disk, keeping its newest `max_snapshots`
+    and at most `max_snapshots` of exited workers
+    """
+    if not tracemalloc.is_tracing():
+        raise MemoryTracingError("tracemalloc is not running in this worker")
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    os.makedirs(directory, exist_ok=True)
+    snapshot_id = f"{os.getpid()}-{int(time.time() * 1000)}"
+    path = os.path.join(directory, snapshot_id + SNAPSHOT_SUFFIX)
+    snapshot.dump(path)
+
+    _prune_snapshots(directory, max_snapshots)
+
+    info = _snapshot_info(snapshot_id, path)
+    info["traced_bytes"] = sum(trace.size for trace in snapshot.traces)
+    return info
+
+def _load_snapshot(directory: str, snapshot_id: str) -> tracemalloc.Snapshot:
+    path = os.path.join(directory, snapshot_id + SNAPSHOT_SUFFIX)
+    if not SNAPSHOT_ID_PATTERN.match(snapshot_id) or not os.path.isfile(path):
+        raise SnapshotNotFoundError(f"Snapshot {snapshot_id} not found")
+    return tracemalloc.Snapshot.load(path)
+
+def diff_snapshots(directory: str, base_id: str, target_id: str, group_by: str, limit: int) -> Dict:
+    """Top allocation sites by growth from `base_id` to `target_id`; the two may come from different workers"""
+    base = _load_snapshot(directory, base_id)
+    target = _load_snapshot(directory, target_id)
+    stats = target.compare_to(base, group_by)
+
+    return {
+        "total_size_diff": sum(stat.size_diff for stat in stats),
+        "entries": [
+            {
+                # tracemalloc orders frames oldest first; the allocation site is the last one
+                "location": f"{stat.traceback[-1].filename}:{stat.traceback[-1].lineno}",
+                "traceback": [f"{frame.filename}:{frame.lineno}" for frame in reversed(stat.traceback)],
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in stats[:limit]
+        ],
+    }
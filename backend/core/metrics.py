@@ -0,0 +1,123 @@
+import os
+from functools import lru_cache
+from ipaddress import ip_address, ip_network
+from typing import Tuple
+from core.config import settings
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Set by gunicorn.conf.py before workers fork; each worker then writes its samples to
+# files in this directory and /metrics sums them, so any worker can answer a scrape.
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status class",
+    ["method", "route", "status_class"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Database connections currently checked out of the API pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Database connections open beyond DB_POOL_SIZE",
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a connection from the API pool",
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Statements executed per HTTP request by route template",
+    ["route"],
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+DB_REPEATED_QUERY_REQUESTS = Counter(
+    "db_repeated_query_requests_total",
+    "Requests that ran the same normalized SQL more than REPEATED_QUERY_THRESHOLD times (likely N+1)",
+    ["route"],
+)
+
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds",
+    "Latency of guarded Redis calls, including timeouts",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5),
+)
+
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "Passwords submitted to the hashing worker pool and not yet hashed",
+    multiprocess_mode="livesum",
+)
+
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total",
+    "Requests rejected by the rate limiter",
+    ["reason"],
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a scheduled wake-up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests admitted and not yet finished",
+    multiprocess_mode="livesum",
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Requests shed by admission control",
+    ["reason"],
+)
+
+SCHEDULER_JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds",
+    "Scheduled job run time",
+    ["job", "outcome"],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+)
+
+_scrape_networks = tuple(ip_network(cidr, strict=False) for cidr in settings.METRICS_ALLOWED_NETWORKS)
+
+@lru_cache(maxsize=1024)
+def is_scrape_allowed(ip: str) -> bool:
+    """Check whether a client IP is in METRICS_ALLOWED_NETWORKS"""
+    try:
+        address = ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in _scrape_networks)
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Return the exposition payload and content type, merged across workers when running under gunicorn"""
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -11,6 +11,9 @@ class Permission(Enum):
     # Role management attributes
     VIEW_ROLES = ("view-roles", "system-management", "role-management")
     MANAGE_ROLES = ("manage-roles", "system-management", "role-management")
+
+    # Diagnostics attributes
+    DIAGNOSE_SYSTEM = ("diagnose-system", "system-management", "diagnostics")
     
     def __init__(
         self,
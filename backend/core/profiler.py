@@ -0,0 +1,101 @@
+import sys
+import time
+import threading
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Dict, Optional
+
+class ProfilerBusyError(Exception):
+    """A profile is already being taken in this worker"""
+
+class StackSampler:
+    """
+    Wall-clock sampling profiler for the threads of this process.
+
+    Reads `sys._current_frames()` from a background thread and counts collapsed
+    stacks ("root;...;leaf"), the input format of flamegraph.pl and speedscope.
+    The time spent taking samples is measured, and the sampler sleeps longer
+    whenever needed to keep it under `max_overhead` of wall time.
+
+    Samples are taken when the sampler gets the GIL, i.e. where the target releases it
+    (I/O waits, the event loop's select) or at the interpreter switch interval, so CPU
+    bursts shorter than a few milliseconds between waits are under-counted.
+    """
+    def __init__(self, hz: int, max_overhead: float, thread_id: Optional[int] = None):
+        self.interval = 1.0 / hz
+        self.max_overhead = max_overhead
+        self.thread_id = thread_id  # None samples every thread except the sampler
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.duration = 0.0
+        self._labels: Dict[CodeType, str] = {}
+        self._thread_names: Dict[int, str] = {}
+
+    def run(self, seconds: float):
+        """Sample for `seconds`, blocking the calling thread"""
+        own_id = threading.get_ident()
+        self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        started_at = time.perf_counter()
+        deadline = started_at + seconds
+
+        while True:
+            sample_started_at = time.perf_counter()
+            if sample_started_at >= deadline:
+                break
+            self._take_sample(own_id)
+            cost = time.perf_counter() - sample_started_at
+            self.sampling_seconds += cost
+            self.samples += 1
+            # Sleep at least the interval, and long enough that cost / (cost + sleep) <= max_overhead
+            pause = max(self.interval - cost, cost * (1 / self.max_overhead - 1))
+            time.sleep(min(pause, max(deadline - time.perf_counter(), 0)))
+
+        self.duration = time.perf_counter() - started_at
+
+    def _take_sample(self, own_id: int):
+        frames = sys._current_frames()
+        if self.thread_id is not None:
+            frame = frames.get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._collapse(frame)] += 1
+            return
+        for thread_id, frame in frames.items():
+            if thread_id != own_id:
+                thread_name = self._thread_names.get(thread_id, str(thread_id))
+                self.stacks[f"{thread_name};{self._collapse(frame)}"] += 1
+
+    def _collapse(self, frame: FrameType) -> str:
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                module = frame.f_globals.get("__name__", "?")
+                label = self._labels[code] = f"{module}:{code.co_qualname}"
+            labels.append(label)
+            frame = frame.f_back
+        labels.reverse()
+        return ";".join(labels)
+
+    @property
+    def overhead(self) -> float:
+        return self.sampling_seconds / self.duration if self.duration else 0.0
+
+    def collapsed(self) -> str:
+        """Stacks in collapsed format, one "frames count" line each, most frequent first"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+# One profile at a time per worker, so concurrent requests cannot stack up samplers
+_profile_lock = threading.Lock()
+
+def sample_stacks(seconds: float, hz: int, max_overhead: float, thread_id: Optional[int] = None) -> StackSampler:
+    """Run a sampler for `seconds` in the calling thread; raises ProfilerBusyError if one is running"""
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running in this worker")
+    try:
+        sampler = StackSampler(hz, max_overhead, thread_id)
+        sampler.run(seconds)
+        return sampler
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,62 @@
+import re
+from functools import lru_cache
+from contextvars import ContextVar, Token
+from typing import Dict, List, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+# "IN (%s, %s, %s)" and multi-row VALUES lists vary in length with the data, not the query shape
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:%s|\?|%\(\w+\)s)(?:\s*,\s*(?:%s|\?|%\(\w+\)s))*\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+
+@lru_cache(maxsize=2048)
+def normalize_sql(statement: str) -> str:
+    """Reduce a statement to its shape, so repeats with different parameters compare equal"""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _PLACEHOLDER_LIST.sub("(?)", statement)
+    return _NUMBER.sub("?", statement)
+
+class QueryStats:
+    """Statements executed within one scope (a request or a test block), grouped by normalized SQL"""
+    __slots__ = ("parent", "count", "duration", "statements")
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.parent = parent
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Dict[str, int] = {}
+
+    def add(self, statement: str, seconds: float):
+        normalized = normalize_sql(statement)
+        stats = self
+        # Nested scopes (a test around a request) all see the statement
+        while stats is not None:
+            stats.count += 1
+            stats.duration += seconds
+            stats.statements[normalized] = stats.statements.get(normalized, 0) + 1
+            stats = stats.parent
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Normalized statements executed more than `threshold` times, most frequent first"""
+        return sorted(
+            ((sql, count) for sql, count in self.statements.items() if count > threshold),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+def start_query_counting() -> Token:
+    """Start counting statements in the current context; pass the token to stop_query_counting"""
+    return _current_stats.set(QueryStats(parent=_current_stats.get()))
+
+def stop_query_counting(token: Token):
+    _current_stats.reset(token)
+
+def get_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+def record_query(statement: str, seconds: float):
+    """Count an executed statement for the current request, if counting is active"""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.add(statement, seconds)
@@ -0,0 +1,55 @@
+from typing import Callable, List, Optional, Tuple
+
+RATE_LIMIT_POLICY_ATTRIBUTE = "__rate_limit_policy__"
+REQUEST_COST_ATTRIBUTE = "__request_cost__"
+
+def rate_limit(
+    limit: Optional[Tuple[int, int]],
+    status_codes: Optional[List[int]] = None,
+    clear_on_success: bool = False,
+):
+    """
+    Attach a rate limit policy to a route endpoint.
+    Only endpoints decorated with this override the default rate limit settings.
+
+    The policy is read by RateLimiterMiddleware when the app starts and is keyed by
+    method and route template, so every "DELETE /api/users/{user_id}" request shares
+    one counter while other methods on the same path keep their own policy.
+
+    Args:
+        limit: (allowed_requests, time_window_seconds), or None to disable rate limiting
+        status_codes: Count only responses with these status codes
+        clear_on_success: Clear the counter on 2xx responses
+    """
+    def decorator(func: Callable) -> Callable:
+        setattr(func, RATE_LIMIT_POLICY_ATTRIBUTE, {
+            "limit": limit,
+            "status_codes": status_codes,
+            "clear_on_success": clear_on_success
+        })
+        return func
+    return decorator
+
+def get_rate_limit_policy(endpoint: Callable) -> Optional[dict]:
+    """Return the rate limit policy attached to an endpoint, if any"""
+    return getattr(endpoint, RATE_LIMIT_POLICY_ATTRIBUTE, None)
+
+
+def request_cost(cost: int, hashing: bool = False):
+    """
+    Weight a route against the per-IP CPU budget (RATE_LIMIT_CPU_BUDGET units per
+    RATE_LIMIT_CPU_WINDOW_SECONDS). Routes without a cost do not use the budget.
+
+    Args:
+        cost: Budget units consumed by each request
+        hashing: The route runs bcrypt; in-flight requests are capped per worker by
+            PASSWORD_HASH_MAX_CONCURRENCY and rejected with 503 beyond that
+    """
+    def decorator(func: Callable) -> Callable:
+        setattr(func, REQUEST_COST_ATTRIBUTE, {"cost": cost, "hashing": hashing})
+        return func
+    return decorator
+
+def get_request_cost(endpoint: Callable) -> Optional[dict]:
+    """Return the request cost attached to an endpoint, if any"""
+    return getattr(endpoint, REQUEST_COST_ATTRIBUTE, None)
@@ -1,14 +1,124 @@
+import time
+import asyncio
+import logging
 import redis.asyncio as aioredis
+from typing import Any, Awaitable, Optional
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
 from core.config import settings
+from core.metrics import REDIS_COMMAND_DURATION
+from core.request_timing import record_timing
+from core.tracing import SPAN_KIND_CLIENT, trace_span
+
+logger = logging.getLogger(__name__)
 
 _redis = None
 
+class InstrumentedRedis(aioredis.Redis):
+    """Redis client that adds each command's round trip to the current request's Server-Timing and trace"""
+
+    async def execute_command(self, *args, **options):
+        start_time = time.perf_counter()
+        try:
+            with trace_span(f"redis {args[0]}", SPAN_KIND_CLIENT, {"db.system.name": "redis"}):
+                return await super().execute_command(*args, **options)
+        finally:
+            record_timing("redis", time.perf_counter() - start_time)
+
 async def init_redis():
     global _redis
-    _redis = await aioredis.from_url(
+    _redis = await InstrumentedRedis.from_url(
         settings.REDIS_URL, encoding="utf-8", decode_responses=True
     )
     return _redis
 
 def get_redis():
-    return _redis
\ No newline at end of file
+    return _redis
+
+class RedisUnavailableError(Exception):
+    """Redis call timed out, failed to connect, or was skipped because the breaker is open"""
+
+class RedisCircuitBreaker:
+    """
+    Circuit breaker shared by all guarded Redis calls in a worker.
+
+    Opens after `failure_threshold` consecutive timeouts or connection errors. While open,
+    calls fail immediately; after `reset_seconds` one probe call is let through and its
+    result closes or re-opens the breaker.
+    """
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.probing or time.monotonic() - self.opened_at < self.reset_seconds:
+            return False
+        self.probing = True
+        return True
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.warning("Redis circuit breaker closed")
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Redis circuit breaker opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Let another probe through if the current one ended without a result (e.g. it was cancelled)"""
+        self.probing = False
+
+redis_breaker = RedisCircuitBreaker(
+    settings.REDIS_BREAKER_FAILURE_THRESHOLD,
+    settings.REDIS_BREAKER_RESET_SECONDS
+)
+
+async def redis_call(command: Awaitable, timeout: Optional[float] = None, name: str = "command") -> Any:
+    """
+    Await a Redis command with a deadline through the shared circuit breaker.
+
+    Raises RedisUnavailableError when the breaker is open or the command times out or
+    cannot connect; callers choose whether to fail open or closed. Other errors are
+    raised unchanged and do not trip the breaker. `name` labels the latency metric.
+    """
+    if not redis_breaker.allow():
+        if asyncio.iscoroutine(command):
+            command.close()
+        raise RedisUnavailableError("Redis circuit breaker is open")
+    is_probe = redis_breaker.is_open
+
+    start_time = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(command, timeout or settings.REDIS_CALL_TIMEOUT_SECONDS)
+    except (asyncio.TimeoutError, RedisTimeoutError, RedisConnectionError, OSError) as e:
+        REDIS_COMMAND_DURATION.labels(name).observe(time.perf_counter() - start_time)
+        redis_breaker.record_failure()
+        raise RedisUnavailableError(f"Redis call failed: {type(e).__name__}") from e
+    except Exception:
+        # Redis answered, so it is reachable
+        REDIS_COMMAND_DURATION.labels(name).observe(time.perf_counter() - start_time)
+        redis_breaker.record_success()
+        raise
+    finally:
+        # A cancelled probe records neither outcome; without this the breaker would never probe again
+        if is_probe:
+            redis_breaker.release_probe()
+
+    REDIS_COMMAND_DURATION.labels(name).observe(time.perf_counter() - start_time)
+    redis_breaker.record_success()
+    return result
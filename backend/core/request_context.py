@@ -0,0 +1,15 @@
+from contextvars import ContextVar, Token
+from typing import Optional
+
+# Kept free of other imports so logging setup can use it before settings load
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+def bind_request_id(request_id: str) -> Token:
+    """Make `request_id` the id of the current request; pass the token to reset_request_id"""
+    return _request_id.set(request_id)
+
+def reset_request_id(token: Token):
+    _request_id.reset(token)
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
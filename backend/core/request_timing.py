@@ -0,0 +1,73 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Optional
+
+# Components reported in Server-Timing, in header order
+TIMING_COMPONENTS = ("db", "redis", "hash")
+
+class RequestTimings:
+    """Time spent per component (db, redis, hash) during one request"""
+    __slots__ = ("started_at", "totals", "counts")
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, name: str, seconds: float):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def breakdown(self) -> Dict[str, dict]:
+        """Milliseconds and call count per component, plus "app" for the remaining Python time"""
+        total = time.perf_counter() - self.started_at
+        result = {
+            name: {"dur": round(self.totals[name] * 1000, 2), "count": self.counts[name]}
+            for name in TIMING_COMPONENTS
+            if name in self.totals
+        }
+        # Concurrent calls (e.g. parallel hashing) can overlap, so clamp at zero
+        app_seconds = max(total - sum(self.totals.values()), 0.0)
+        result["app"] = {"dur": round(app_seconds * 1000, 2)}
+        result["total"] = {"dur": round(total * 1000, 2)}
+        return result
+
+    def server_timing_header(self) -> str:
+        parts = []
+        for name, entry in self.breakdown().items():
+            if "count" in entry:
+                parts.append(f'{name};dur={entry["dur"]};desc="{entry["count"]}x"')
+            else:
+                parts.append(f'{name};dur={entry["dur"]}')
+        return ", ".join(parts)
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+def start_request_timing() -> Token:
+    """Start collecting timings for the current request; pass the token to stop_request_timing"""
+    return _current_timings.set(RequestTimings())
+
+def stop_request_timing(token: Token):
+    _current_timings.reset(token)
+
+def get_request_timings() -> Optional[RequestTimings]:
+    return _current_timings.get()
+
+def record_timing(name: str, seconds: float):
+    """Add a measured call to the current request, if timing is being collected"""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+@contextmanager
+def track_timing(name: str):
+    """Measure the enclosed block as one call of `name` for the current request"""
+    if _current_timings.get() is None:
+        yield
+        return
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - start_time)
@@ -1,29 +1,74 @@
 import ast
+import time
 import redis
+import asyncio
 import logging
 from models.users import Users
 from jose import jwt, JWTError
-from core.redis import get_redis
+from core.redis import get_redis, redis_call, RedisUnavailableError
 from core.config import settings
+from core.metrics import PASSWORD_HASH_QUEUE_DEPTH
+from core.request_timing import track_timing
+from core.tracing import trace_span
 from core.dependencies import get_db
 from sqlalchemy import update, select
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from models.user_sessions import UserSessions
 from sqlalchemy.ext.asyncio import AsyncSession
 from utils.custom_exception import ServerException
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Request, status, Depends
+from concurrent.futures import ThreadPoolExecutor
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 logger = logging.getLogger(__name__)
 
+# Sessions seen recently by this worker, used only while Redis is unavailable: {sid: (cached_at, session_data)}
+_session_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+def _cache_session(sid: str, session_data: Dict[str, Any]):
+    _session_cache.pop(sid, None)
+    if len(_session_cache) >= settings.SESSION_LOCAL_CACHE_MAX_ENTRIES:
+        # Dicts keep insertion order, so the first entry is the oldest
+        _session_cache.pop(next(iter(_session_cache)))
+    _session_cache[sid] = (time.monotonic(), session_data)
+
+def _get_cached_session(sid: str) -> Optional[Dict[str, Any]]:
+    cached = _session_cache.get(sid)
+    if cached and time.monotonic() - cached[0] < settings.SESSION_LOCAL_CACHE_SECONDS:
+        return cached[1]
+    return None
+
+# Worker pool for bcrypt, so hashing never runs on the event loop (bcrypt releases the GIL while hashing)
+hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+
+def _track_queue_depth(future: asyncio.Future) -> asyncio.Future:
+    """Count a hashing job in PASSWORD_HASH_QUEUE_DEPTH until the pool has finished it"""
+    PASSWORD_HASH_QUEUE_DEPTH.inc()
+    future.add_done_callback(lambda _: PASSWORD_HASH_QUEUE_DEPTH.dec())
+    return future
+
 async def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    loop = asyncio.get_running_loop()
+    with track_timing("hash"), trace_span("password.hash"):
+        return await _track_queue_depth(loop.run_in_executor(hash_executor, pwd_context.hash, password))
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash multiple passwords in parallel on the hashing worker pool"""
+    loop = asyncio.get_running_loop()
+    futures = [_track_queue_depth(loop.run_in_executor(hash_executor, pwd_context.hash, password)) for password in passwords]
+    with track_timing("hash"), trace_span("password.hash", attributes={"password.count": len(passwords)}):
+        return await asyncio.gather(*futures)
 
 async def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    loop = asyncio.get_running_loop()
+    with track_timing("hash"), trace_span("password.verify"):
+        return await _track_queue_depth(loop.run_in_executor(hash_executor, pwd_context.verify, plain_password, hashed_password))
 
 async def create_access_token(data: Dict[str, Any]) -> str:
     to_encode = data.copy()
@@ -67,19 +112,35 @@ async def get_token(credentials: Optional[HTTPAuthorizationCredentials] = Depend
 async def verify_session(sid: str, token: str, redis_client) -> Dict[str, Any]:
     try:
         redis_key = f"session:{sid}"
-        raw = await redis_client.get(redis_key)
-        if not raw:
-            raise ValueError("Invalid or expired session")
         try:
-            session_data = ast.literal_eval(raw)
-        except (ValueError, SyntaxError):
-            logger.error(f"Invalid session data: {raw}")
-            raise ValueError("Invalid session data")
+            raw = await redis_call(redis_client.get(redis_key), name="get")
+        except RedisUnavailableError as e:
+            # Fail closed unless this worker verified the session moments ago
+            session_data = _get_cached_session(sid)
+            if session_data is None:
+                logger.warning(f"Session check unavailable for {sid}: {e}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Service temporarily unavailable",
+                    headers={"Retry-After": "1"}
+                )
+        else:
+            if not raw:
+                _session_cache.pop(sid, None)
+                raise ValueError("Invalid or expired session")
+            try:
+                session_data = ast.literal_eval(raw)
+            except (ValueError, SyntaxError):
+                logger.error(f"Invalid session data: {raw}")
+                raise ValueError("Invalid session data")
+            _cache_session(sid, session_data)
         
         if session_data.get("access_token") and session_data.get("access_token") != token:
             logger.error(f"Token mismatch: {session_data.get('access_token')} != {token}")
             raise JWTError("Token mismatch")    
         return session_data
+    except HTTPException:
+        raise
     except JWTError as e:
         logger.warning(f"JWT validation failed: {type(e).__name__}: {str(e)}")
         raise HTTPException(
@@ -95,7 +156,7 @@ async def verify_session(sid: str, token: str, redis_client) -> Dict[str, Any]:
             headers={"WWW-Authenticate": "Bearer"}
         )
 
-async def verify_token(token: str = Depends(get_token), redis_client = Depends(get_redis), db: AsyncSession = Depends(get_db)) -> Dict[str, Any]:
+async def verify_token(request: Request, token: str = Depends(get_token), redis_client = Depends(get_redis), db: AsyncSession = Depends(get_db)) -> Dict[str, Any]:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         sid = payload.get("sid")
@@ -111,6 +172,8 @@ async def verify_token(token: str = Depends(get_token), redis_client = Depends(g
                 detail="Account is disabled"
             )
         
+        # Expose the user to the access log
+        request.state.user_id = payload.get("sub")
         return payload
         
     except JWTError as e:
@@ -180,7 +243,7 @@ async def extend_session_ttl(redis_client, session_id: str, session_data: Dict[s
         
         # Reset TTL, start from current time
         ttl = settings.SESSION_EXPIRE_MINUTES * 60
-        await redis_client.setex(f"session:{session_id}", ttl, str(session_data))
+        await redis_call(redis_client.setex(f"session:{session_id}", ttl, str(session_data)), name="setex")
         
     except Exception as e:
         logger.error(f"Failed to extend session TTL: {e}")
@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextvars import ContextVar
+from types import FrameType
+from typing import Dict, List, Optional
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_STATEMENT_LENGTH = 2000
+
+class InFlightRequest:
+    """A request being served by this worker, with the SQL statement it is currently executing"""
+    __slots__ = ("scope", "task", "request_id", "started_at", "statement", "statement_started_at", "captured")
+
+    def __init__(self, scope: dict, task: asyncio.Task, request_id: str):
+        self.scope = scope
+        self.task = task
+        self.request_id = request_id
+        self.started_at = time.perf_counter()
+        self.statement: Optional[str] = None
+        self.statement_started_at: Optional[float] = None
+        self.captured = False
+
+_current_request: ContextVar[Optional[InFlightRequest]] = ContextVar("in_flight_request", default=None)
+
+def note_statement(statement: Optional[str]):
+    """Record the statement the current request is executing (None once it finishes)"""
+    entry = _current_request.get()
+    if entry is not None:
+        entry.statement = statement
+        entry.statement_started_at = time.perf_counter() if statement else None
+
+def _frame_label(frame: FrameType) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}:{frame.f_lineno}"
+
+def _coroutine_stack(task: asyncio.Task) -> List[str]:
+    """Await chain of a task, outermost first (Task.get_stack only returns the top frame)"""
+    labels = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        labels.append(_frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return labels
+
+def _thread_stack(thread_id: int) -> List[str]:
+    frame = sys._current_frames().get(thread_id)
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+class SlowRequestWatchdog:
+    """
+    Capture the stacks of requests that run longer than `threshold` seconds.
+
+    A daemon thread checks the in-flight requests of this worker every `interval`,
+    so it also fires when a request blocks the event loop. Each slow request is
+    captured once: its coroutine await chain, the event loop thread's stack and
+    the SQL statement in progress. The last `capacity` captures are kept.
+    """
+    def __init__(self, threshold: float, capacity: int):
+        self.threshold = threshold
+        self.interval = min(threshold / 4, 0.25)
+        self.in_flight: Dict[int, InFlightRequest] = {}
+        self.captures = deque(maxlen=capacity)
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def begin(self, scope: dict, request_id: str):
+        """Register the current task's request; returns the token for end()"""
+        # Started lazily so each gunicorn worker gets its own thread after the fork
+        if self._thread is None or self._pid != os.getpid():
+            self._start()
+        entry = InFlightRequest(scope, asyncio.current_task(), request_id)
+        self.in_flight[id(entry)] = entry
+        return entry, _current_request.set(entry)
+
+    def end(self, token):
+        entry, context_token = token
+        _current_request.reset(context_token)
+        self.in_flight.pop(id(entry), None)
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._loop_thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="slow-request-watchdog", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            for entry in list(self.in_flight.values()):
+                if not entry.captured and now - entry.started_at >= self.threshold:
+                    entry.captured = True
+                    try:
+                        self._capture(entry, now)
+                    except Exception as e:
+                        logger.error(f"Failed to capture slow request {entry.request_id}: {e}")
+
+    def _capture(self, entry: InFlightRequest, now: float):
+        scope = entry.scope
+        route = getattr(scope.get("route"), "path", None)
+        statement = entry.statement
+        statement_started_at = entry.statement_started_at
+        capture = {
+            "pid": self._pid,
+            "request_id": entry.request_id,
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "route": route,
+            "elapsed_ms": round((now - entry.started_at) * 1000, 1),
+            "captured_at": time.time(),
+            "statement": statement[:MAX_STATEMENT_LENGTH] if statement else None,
+            "statement_elapsed_ms": round((now - statement_started_at) * 1000, 1) if statement_started_at else None,
+            "coroutine_stack": _coroutine_stack(entry.task) if entry.task else [],
+            "loop_stack": _thread_stack(self._loop_thread_id),
+        }
+        self.captures.append(capture)
+
+        innermost = capture["coroutine_stack"][-1] if capture["coroutine_stack"] else None
+        logger.warning(
+            f"Slow request: {capture['method']} {capture['path']} running for {capture['elapsed_ms']} ms "
+            f"(threshold {self.threshold * 1000:.0f} ms), awaiting {innermost}"
+            + (f", executing SQL for {capture['statement_elapsed_ms']} ms" if statement else ""),
+            extra={
+                "event": "slow_request",
+                "request_id": entry.request_id,
+                "route": route,
+                "method": capture["method"],
+                "path": capture["path"],
+                "duration_ms": capture["elapsed_ms"],
+            }
+        )
+
+    def get_captures(self) -> List[dict]:
+        """Captures of this worker, newest first"""
+        return list(reversed(self.captures))
+
+slow_request_watchdog = SlowRequestWatchdog(
+    settings.SLOW_REQUEST_THRESHOLD_SECONDS,
+    settings.SLOW_REQUEST_CAPTURE_LIMIT
+)
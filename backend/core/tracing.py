@@ -0,0 +1,265 @@
+import os
+import re
+import json
+import time
+import queue
+import random
+import logging
+import threading
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Dict, List, Optional, Tuple
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_ERROR = 2
+
+# W3C Trace Context: version-trace_id-parent_id-flags
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+TRACE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+MAX_ATTRIBUTE_LENGTH = 2000
+
+class Trace:
+    """Finished spans of one request, buffered until the request ends"""
+    __slots__ = ("trace_id", "remote_parent_id", "upstream_sampled", "spans", "dropped", "max_spans")
+
+    def __init__(self, trace_id: str, remote_parent_id: Optional[str], upstream_sampled: bool, max_spans: int):
+        self.trace_id = trace_id
+        self.remote_parent_id = remote_parent_id
+        self.upstream_sampled = upstream_sampled
+        self.spans: List["Span"] = []
+        self.dropped = 0
+        self.max_spans = max_spans
+
+    def add(self, span: "Span"):
+        # Bounded so an N+1 loop cannot grow one request's trace without limit
+        if len(self.spans) < self.max_spans:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+class Span:
+    """A timed operation within a trace, with OTLP-style attributes"""
+    __slots__ = ("trace", "name", "kind", "span_id", "parent_id", "start_ns", "started_at", "duration_ns", "attributes", "error")
+
+    def __init__(self, trace: Trace, name: str, kind: int, parent_id: Optional[str], attributes: Optional[Dict[str, Any]]):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        # Wall clock for the start, monotonic clock for the duration
+        self.start_ns = time.time_ns()
+        self.started_at = time.perf_counter_ns()
+        self.duration_ns = 0
+        self.attributes = dict(attributes) if attributes else {}
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None):
+        self.duration_ns = time.perf_counter_ns() - self.started_at
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def _parse_traceparent(traceparent: Optional[str]) -> Tuple[Optional[str], Optional[str], bool]:
+    match = TRACEPARENT_PATTERN.match(traceparent.strip().lower()) if traceparent else None
+    if match is None or match.group(1) == "0" * 32:
+        return None, None, False
+    trace_id, parent_id, flags = match.groups()
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+def start_request_trace(name: str, request_id: str, traceparent: Optional[str], attributes: Dict[str, Any]) -> Tuple[Span, Token]:
+    """
+    Open the server span of a request and make it current; pass both to finish_request_trace.
+
+    An incoming W3C traceparent header continues the caller's trace. Otherwise a
+    request id that is already a 32-hex-digit id (the generated ones are) doubles as
+    the trace id, so a request id from the logs finds its trace directly.
+    """
+    trace_id, remote_parent_id, upstream_sampled = _parse_traceparent(traceparent)
+    if trace_id is None:
+        trace_id = request_id if TRACE_ID_PATTERN.match(request_id) else os.urandom(16).hex()
+    trace = Trace(trace_id, remote_parent_id, upstream_sampled, settings.TRACE_MAX_SPANS)
+    root = Span(trace, name, SPAN_KIND_SERVER, remote_parent_id, attributes)
+    root.set_attribute("request_id", request_id)
+    return root, _current_span.set(root)
+
+def finish_request_trace(root: Span, token: Token, error: Optional[BaseException] = None):
+    """
+    Close the server span and export the trace if it is kept.
+
+    Slow requests, failed requests and requests the caller sampled are always kept,
+    the rest with probability TRACE_SAMPLE_RATE, so the traces worth reading survive
+    any sample rate.
+    """
+    _current_span.reset(token)
+    root.end(error)
+    trace = root.trace
+    if trace.dropped:
+        root.set_attribute("trace.dropped_spans", trace.dropped)
+    trace.spans.append(root)
+
+    failed = root.error is not None or root.attributes.get("http.response.status_code", 0) >= 500
+    if (
+        trace.upstream_sampled
+        or failed
+        or root.duration_ns >= settings.TRACE_SLOW_MS * 1_000_000
+        or random.random() < settings.TRACE_SAMPLE_RATE
+    ):
+        span_exporter.export(trace.spans)
+
+def begin_span(name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+    """
+    Start a leaf span under the current span, or return None outside a traced request.
+    For callbacks that cannot wrap the operation in `trace_span`; close it with end_span.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, name, kind, parent.span_id, attributes)
+
+def end_span(span: Optional[Span], error: Optional[BaseException] = None):
+    if span is not None:
+        span.end(error)
+        span.trace.add(span)
+
+@contextmanager
+def trace_span(name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+    """Trace the enclosed block as a child of the current span; a no-op outside a traced request"""
+    span = begin_span(name, kind, attributes)
+    if span is None:
+        yield None
+        return
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        end_span(span, e)
+        raise
+    else:
+        end_span(span)
+    finally:
+        _current_span.reset(token)
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)[:MAX_ATTRIBUTE_LENGTH]}
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    encoded = {
+        "traceId": span.trace.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.start_ns + span.duration_ns),
+        "attributes": _otlp_attributes(span.attributes),
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = span.parent_id
+    if span.error:
+        encoded["status"] = {"code": STATUS_ERROR, "message": span.error}
+    return encoded
+
+class SpanExporter:
+    """
+    Export finished traces as OTLP/JSON from a background thread.
+
+    Traces are POSTed to `endpoint` (an OTLP/HTTP collector's /v1/traces) when it is set,
+    otherwise appended to `path` as one ExportTraceServiceRequest per line, the format
+    the collector's otlpjsonfile receiver reads. The request path only enqueues; when
+    the queue is full traces are dropped and counted.
+    """
+    def __init__(self, endpoint: str, path: str, max_file_bytes: int, service_name: str, queue_size: int, batch_size: int = 50):
+        self.endpoint = endpoint
+        self.path = path
+        self.max_file_bytes = max_file_bytes
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._resource = {"attributes": _otlp_attributes({"service.name": service_name})}
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def export(self, spans: List[Span]):
+        # Started lazily so each gunicorn worker gets its own thread after the fork
+        if self._thread is None or self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(self._encode(batch))
+            except Exception as e:
+                logger.error(f"Failed to export {len(batch)} traces: {e}")
+
+    def _encode(self, batch: List[List[Span]]) -> bytes:
+        payload = {
+            "resourceSpans": [{
+                "resource": self._resource,
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [_otlp_span(span) for spans in batch for span in spans],
+                }],
+            }]
+        }
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def _write(self, body: bytes):
+        if self.endpoint:
+            request = urllib.request.Request(self.endpoint, data=body, headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(request, timeout=5) as response:
+                response.read()
+            return
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Keep one previous file; a worker still holding the old one finishes its write there
+        if self.max_file_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_file_bytes:
+            os.replace(self.path, self.path + ".1")
+        # A single O_APPEND write per batch keeps lines from different workers whole
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, body + b"\n")
+        finally:
+            os.close(fd)
+
+span_exporter = SpanExporter(
+    settings.TRACE_OTLP_ENDPOINT,
+    settings.TRACE_EXPORT_FILE,
+    settings.TRACE_EXPORT_FILE_MAX_BYTES,
+    settings.TRACE_SERVICE_NAME,
+    settings.TRACE_EXPORT_QUEUE_SIZE
+)
@@ -0,0 +1,38 @@
+# Gunicorn server hooks, loaded automatically from the working directory
+import os
+import shutil
+from core.config import settings
+
+# Must be set before prometheus_client is imported in the master or any worker
+# (see core.metrics.MULTIPROC_DIR_ENV)
+if settings.METRICS_ENABLED:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.METRICS_MULTIPROC_DIR)
+
+# Imported here rather than in child_exit, which can re-enter while an import is in progress
+from prometheus_client import multiprocess
+
+def on_starting(server):
+    """Reset the metrics directory and start the shared log writer, before any worker is forked"""
+    if settings.METRICS_ENABLED:
+        # Samples from a previous run would otherwise be summed into this one
+        metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+    if settings.LOG_AGGREGATION:
+        from core.log_writer import start_log_writer
+        start_log_writer(
+            "logging_config.yaml",
+            settings.LOG_QUEUE_SIZE,
+            settings.LOG_WRITER_BATCH_SIZE,
+            json_logs=settings.LOG_FORMAT == "json"
+        )
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges (pool usage, hashing queue) from /metrics"""
+    if settings.METRICS_ENABLED:
+        multiprocess.mark_process_dead(worker.pid)
+
+def on_exit(server):
+    """Flush and stop the shared log writer after all workers have exited"""
+    from core.log_writer import stop_log_writer
+    stop_log_writer()
@@ -1,9 +1,14 @@
 from core.config import settings, setup_logging
 setup_logging("logging_config.yaml")
 from api import api_router
-from fastapi import FastAPI
+from utils import get_real_ip
+from fastapi import FastAPI, HTTPException, Request, Response
 from core.redis import init_redis, get_redis
 from core.database import init_db
+from core.metrics import is_scrape_allowed, render_metrics
+from core.memory_profiler import start_tracing
+from core.loop_monitor import loop_lag_monitor
+from middleware.request_logging import access_log_summary
 from fastapi_limiter import FastAPILimiter
 from contextlib import asynccontextmanager
 from extensions import register_extensions
@@ -13,12 +18,18 @@ from schedule import scheduler, register_schedules
 # Lifespan event handler
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if settings.MEMORY_TRACE_FRAMES:
+        start_tracing(settings.MEMORY_TRACE_FRAMES)
     await init_db()
     register_schedules()
     scheduler.start()
     await init_redis()
     await FastAPILimiter.init(get_redis())
+    loop_lag_monitor.start()
+    access_log_summary.start()
     yield
+    await access_log_summary.stop()
+    await loop_lag_monitor.stop()
     scheduler.shutdown()
 
 # Control docs exposure by environment variable DEBUG_MODE
@@ -49,4 +60,14 @@ app.include_router(api_router, prefix="/api")
 # Health check endpoint
 @app.get("/healthz", include_in_schema=False)
 async def healthz():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+# Prometheus metrics, aggregated across workers; reads no DB or Redis.
+# Only served to METRICS_ALLOWED_NETWORKS, in case the backend port is reachable without nginx
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics(request: Request):
+        if not is_scrape_allowed(get_real_ip(request)):
+            raise HTTPException(status_code=404)
+        content, content_type = render_metrics()
+        return Response(content=content, media_type=content_type)
@@ -1,10 +1,29 @@
 from fastapi import FastAPI
+from core.config import settings
 from .cors import add_cors_middleware
 from .request_logging import add_request_logging_middleware
+from .metrics import add_metrics_middleware
 from .rate_limiter import add_rate_limiter_middleware
+from .server_timing import add_server_timing_middleware
+from .query_counter import add_query_counter_middleware
+from .slow_requests import add_slow_request_middleware
+from .admission import add_admission_control_middleware
+from .tracing import add_tracing_middleware
 
 
 def register_middlewares(app: FastAPI):
     add_rate_limiter_middleware(app)
+    # Outside the rate limiter so shed requests cost no Redis calls, inside CORS so browsers can read the 503
+    if settings.ADMISSION_CONTROL_ENABLED:
+        add_admission_control_middleware(app)
     add_cors_middleware(app)
-    add_request_logging_middleware(app)
\ No newline at end of file
+    if settings.METRICS_ENABLED:
+        add_metrics_middleware(app)
+    add_request_logging_middleware(app)
+    if settings.QUERY_COUNTER_ENABLED:
+        add_query_counter_middleware(app)
+    if settings.SLOW_REQUEST_WATCHDOG_ENABLED:
+        add_slow_request_middleware(app)
+    if settings.SERVER_TIMING_ENABLED:
+        add_server_timing_middleware(app)
+    add_tracing_middleware(app)
\ No newline at end of file
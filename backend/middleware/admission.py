@@ -0,0 +1,76 @@
+import logging
+from core.config import settings
+from core.loop_monitor import loop_lag_monitor
+from core.metrics import ADMISSION_REJECTIONS, HTTP_REQUESTS_IN_FLIGHT
+from utils.response import APIResponse
+from fastapi import FastAPI, status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from .request_view import get_request_view
+
+logger = logging.getLogger(__name__)
+
+class AdmissionControlMiddleware:
+    """
+    Shed load with an immediate 503 while this worker is overloaded.
+
+    A worker is overloaded when the event loop lag exceeds ADMISSION_MAX_LOOP_LAG_SECONDS
+    or ADMISSION_MAX_IN_FLIGHT requests are already running. Paths in
+    ADMISSION_PRIORITY_PATHS (token refresh, health and metrics) are always admitted,
+    so sessions stay alive and the worker stays observable while other routes back off.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.priority_paths = frozenset(settings.ADMISSION_PRIORITY_PATHS)
+        self.max_lag = settings.ADMISSION_MAX_LOOP_LAG_SECONDS
+        self.max_in_flight = settings.ADMISSION_MAX_IN_FLIGHT
+        self.in_flight = 0
+        self.shedding = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_view = get_request_view(scope)
+
+        if request_view.path not in self.priority_paths:
+            reason = self._overload_reason()
+            if reason:
+                ADMISSION_REJECTIONS.labels(reason).inc()
+                await self._server_overloaded()(scope, receive, send)
+                return
+
+        self.in_flight += 1
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+
+    def _server_overloaded(self) -> JSONResponse:
+        resp = APIResponse[None](code=503, message="Server overloaded. Try again later.")
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            content=resp.model_dump(exclude_none=True),
+                            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)})
+
+    def _overload_reason(self):
+        """Return why the worker is overloaded, or None; logs when shedding starts and stops"""
+        reason = None
+        lag = loop_lag_monitor.lag
+        if lag > self.max_lag:
+            reason = "loop_lag"
+        elif self.in_flight >= self.max_in_flight:
+            reason = "in_flight"
+
+        if bool(reason) != self.shedding:
+            self.shedding = bool(reason)
+            if reason:
+                logger.warning(f"Shedding load ({reason}): loop lag {lag * 1000:.0f} ms, {self.in_flight} requests in flight")
+            else:
+                logger.warning(f"Stopped shedding load: loop lag {lag * 1000:.0f} ms, {self.in_flight} requests in flight")
+        return reason
+
+def add_admission_control_middleware(app: FastAPI):
+    app.add_middleware(AdmissionControlMiddleware)
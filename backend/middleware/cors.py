@@ -1,12 +1,26 @@
+from typing import List, Mapping, Tuple
 from core.config import settings
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import FastAPI
 from urllib.parse import urlparse
+from collections import OrderedDict
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .request_view import get_request_view
 
-class CORSMiddleware(BaseHTTPMiddleware):    
-    def __init__(self, app):
-        super().__init__(app)
+DEFAULT_ALLOWED_HEADERS = [
+    "content-type",
+    "authorization",
+    "accept",
+    "accept-language",
+    "cache-control",
+    "pragma",
+    "x-requested-with",
+]
+
+class CORSMiddleware:    
+    def __init__(self, app: ASGIApp):
+        self.app = app
         
         self.allowed_hosts = [
             f"{settings.HOSTNAME}:{settings.BACKEND_PORT}",
@@ -16,15 +30,21 @@ class CORSMiddleware(BaseHTTPMiddleware):
         ]
 
         self.allowed_methods = "GET, POST, PUT, DELETE, PATCH, OPTIONS, HEAD"
+        self.allowed_headers = ", ".join(DEFAULT_ALLOWED_HEADERS)
         
         self.generate_cors_origins()
         
         self.whitelist_paths = [
             # Add whitelist paths here (e.g. "/api/example/")
         ]
+
+        # Pre-rendered preflight responses keyed by (origin, requested headers, whitelisted)
+        self._preflight_cache: "OrderedDict[Tuple[str, str, bool], Tuple[List, bytes]]" = OrderedDict()
+        self._preflight_cache_size = settings.CORS_PREFLIGHT_CACHE_SIZE
+        self._rejected_preflight = self._render(JSONResponse(status_code=200, content={}))
     
     def generate_cors_origins(self):
-        """Generate HTTP and HTTPS versions of the sources"""
+        """Generate HTTP and HTTPS versions of the sources and the lookup set of allowed origins"""
         self.cors_origins = []
         for host in self.allowed_hosts:
             if host == "*":
@@ -34,6 +54,15 @@ class CORSMiddleware(BaseHTTPMiddleware):
                 f"http://{host}",
                 f"https://{host}"
             ])
+
+        # Both the raw (lower-cased) and the normalized form of every origin, for O(1) lookups
+        allowed = set()
+        for origin in self.cors_origins:
+            if origin == "*":
+                continue
+            allowed.add(origin.lower())
+            allowed.add(self._normalize_origin(origin))
+        self.allowed_origins = frozenset(allowed)
     
     def is_whitelist_path(self, path: str) -> bool:
         """Check if path is in whitelist"""
@@ -57,41 +86,20 @@ class CORSMiddleware(BaseHTTPMiddleware):
         """Check if origin is allowed, with normalized comparison"""
         if not origin:
             return False
-        
-        normalized_origin = self._normalize_origin(origin)
-        
-        for allowed in self.cors_origins:
-            if allowed == "*":
-                continue
-            
-            try:
-                normalized_allowed = self._normalize_origin(allowed)
-                if normalized_origin == normalized_allowed:
-                    return True
-            except Exception:
-                pass
-        
-        return origin.lower() in [a.lower() for a in self.cors_origins if a != "*"]
+
+        # Browsers send the origin exactly as configured in the common case, so skip parsing
+        if origin.lower() in self.allowed_origins:
+            return True
+        return self._normalize_origin(origin) in self.allowed_origins
     
-    def get_allowed_headers(self, request: Request) -> str:
+    def get_allowed_headers(self, request_headers: Mapping[str, str]) -> str:
         """Get allowed headers string for CORS response"""
-        allowed_headers = [
-            "content-type",
-            "authorization",
-            "accept",
-            "accept-language",
-            "cache-control",
-            "pragma",
-            "x-requested-with",
-        ]
-        
-        requested_headers = request.headers.get("access-control-request-headers", "")
-        if requested_headers:
-            requested_list = [h.strip().lower() for h in requested_headers.split(",")]
-            allowed_headers.extend(requested_list)
-        
-        allowed_headers = sorted(list(set(allowed_headers)))
-        return ", ".join(allowed_headers)
+        requested_headers = request_headers.get("access-control-request-headers", "")
+        if not requested_headers:
+            return ", ".join(sorted(DEFAULT_ALLOWED_HEADERS))
+
+        allowed_headers = DEFAULT_ALLOWED_HEADERS + [h.strip().lower() for h in requested_headers.split(",")]
+        return ", ".join(sorted(set(allowed_headers)))
     
     def _should_allow_origin(self, origin: str, is_whitelisted: bool) -> bool:
         """Check if origin should be allowed"""
@@ -104,13 +112,17 @@ class CORSMiddleware(BaseHTTPMiddleware):
         if origin:
             headers["Access-Control-Allow-Origin"] = origin
             headers["Access-Control-Allow-Credentials"] = "true"
+
+    def _render(self, response: JSONResponse) -> Tuple[List, bytes]:
+        """Freeze a response into its raw ASGI headers and body"""
+        return response.raw_headers, response.body
     
-    def handle_preflight(self, request: Request, origin: str, is_whitelisted: bool) -> JSONResponse:
+    def handle_preflight(self, request_headers: Mapping[str, str], origin: str, is_whitelisted: bool) -> JSONResponse:
         """Handle OPTIONS preflight requests"""
         if not self._should_allow_origin(origin, is_whitelisted):
             return JSONResponse(status_code=200, content={})
         
-        allowed_headers_str = self.get_allowed_headers(request)
+        allowed_headers_str = self.get_allowed_headers(request_headers)
         
         headers = {
             "Access-Control-Allow-Methods": self.allowed_methods,
@@ -121,30 +133,57 @@ class CORSMiddleware(BaseHTTPMiddleware):
         
         self._set_cors_origin_headers(headers, origin)
         return JSONResponse(status_code=200, content={}, headers=headers)
+
+    def get_preflight_response(self, request_headers: Mapping[str, str], origin: str, is_whitelisted: bool) -> Tuple[List, bytes]:
+        """Return the pre-rendered preflight response, rendering it on the first request of its kind"""
+        if not self._should_allow_origin(origin, is_whitelisted):
+            return self._rejected_preflight
+
+        cache_key = (origin, request_headers.get("access-control-request-headers", ""), is_whitelisted)
+        rendered = self._preflight_cache.get(cache_key)
+        if rendered is not None:
+            self._preflight_cache.move_to_end(cache_key)
+            return rendered
+
+        rendered = self._render(self.handle_preflight(request_headers, origin, is_whitelisted))
+        self._preflight_cache[cache_key] = rendered
+        if len(self._preflight_cache) > self._preflight_cache_size:
+            self._preflight_cache.popitem(last=False)
+        return rendered
     
-    def add_cors_headers(self, response, origin: str, is_whitelisted: bool):
-        """Add CORS headers to response"""
-        response.headers["Vary"] = "Origin"
+    def add_cors_headers(self, headers: MutableHeaders, origin: str, is_whitelisted: bool):
+        """Add CORS headers to response headers"""
+        headers["Vary"] = "Origin"
         
         if not self._should_allow_origin(origin, is_whitelisted):
             return
         
-        self._set_cors_origin_headers(response.headers, origin)
-        response.headers["Access-Control-Allow-Methods"] = self.allowed_methods
-        response.headers["Access-Control-Allow-Headers"] = "content-type, authorization, accept, accept-language, cache-control, pragma, x-requested-with"
+        self._set_cors_origin_headers(headers, origin)
+        headers["Access-Control-Allow-Methods"] = self.allowed_methods
+        headers["Access-Control-Allow-Headers"] = self.allowed_headers
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Handle CORS requests"""
-        path = request.url.path
-        origin = request.headers.get("origin")
-        is_whitelisted = self.is_whitelist_path(path)
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_view = get_request_view(scope)
+        origin = request_view.headers.get("origin")
+        is_whitelisted = self.is_whitelist_path(request_view.path)
         
-        if request.method == "OPTIONS":
-            return self.handle_preflight(request, origin, is_whitelisted)
+        if request_view.method == "OPTIONS":
+            raw_headers, body = self.get_preflight_response(request_view.headers, origin, is_whitelisted)
+            await send({"type": "http.response.start", "status": 200, "headers": list(raw_headers)})
+            await send({"type": "http.response.body", "body": body})
+            return
         
-        response = await call_next(request)
-        self.add_cors_headers(response, origin, is_whitelisted)
-        return response
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                self.add_cors_headers(MutableHeaders(scope=message), origin, is_whitelisted)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
 
 def add_cors_middleware(app: FastAPI):
     app.add_middleware(CORSMiddleware)
\ No newline at end of file
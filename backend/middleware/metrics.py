@@ -0,0 +1,44 @@
+import time
+from fastapi import FastAPI
+from core.metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .request_view import get_request_view
+
+EXCLUDED_PATHS = {"/", "/docs", "/redoc", "/openapi.json", "/healthz", "/metrics"}
+KNOWN_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"}
+UNMATCHED_ROUTE = "*"  # Label for paths that match no route, keeps label cardinality bounded
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_view = get_request_view(scope)
+
+        if request_view.path in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            method = request_view.method if request_view.method in KNOWN_METHODS else "OTHER"
+            HTTP_REQUESTS.labels(method, route, f"{status_code // 100}xx").inc()
+            HTTP_REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - start_time)
+
+def add_metrics_middleware(app: FastAPI):
+    app.add_middleware(MetricsMiddleware)
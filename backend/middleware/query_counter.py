@@ -0,0 +1,55 @@
+import logging
+from fastapi import FastAPI
+from core.config import settings
+from core.metrics import DB_QUERIES_PER_REQUEST, DB_REPEATED_QUERY_REQUESTS
+from core.query_counter import start_query_counting, stop_query_counting, get_query_stats
+from starlette.types import ASGIApp, Receive, Scope, Send
+from .request_view import get_request_view
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "*"
+
+class QueryCounterMiddleware:
+    """
+    Count the statements each request runs and flag likely N+1 patterns.
+
+    A request that executes the same normalized SQL more than REPEATED_QUERY_THRESHOLD
+    times logs a warning with the statement and increments db_repeated_query_requests_total.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.threshold = settings.REPEATED_QUERY_THRESHOLD
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = start_query_counting()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            stats = get_query_stats()
+            stop_query_counting(token)
+            if stats.count:
+                self.report(scope, stats)
+
+    def report(self, scope: Scope, stats):
+        route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+        DB_QUERIES_PER_REQUEST.labels(route).observe(stats.count)
+
+        repeated = stats.repeated(self.threshold)
+        if not repeated:
+            return
+        DB_REPEATED_QUERY_REQUESTS.labels(route).inc()
+        request_view = get_request_view(scope)
+        for statement, count in repeated:
+            logger.warning(
+                f"Repeated query on {request_view.method} {route}: {count} executions "
+                f"(threshold {self.threshold}), possible N+1: {statement}",
+                extra={"event": "repeated_query", "route": route, "request_id": request_view.request_id}
+            )
+
+def add_query_counter_middleware(app: FastAPI):
+    app.add_middleware(QueryCounterMiddleware)
@@ -1,65 +1,139 @@
+import time
 import logging
-from utils import get_real_ip
-from core.redis import get_redis
+from typing import Optional
+from core.redis import get_redis, redis_call, RedisUnavailableError
 from core.config import settings
+from core.metrics import RATE_LIMIT_REJECTIONS
 from utils.response import APIResponse
-from fastapi import Request, status
+from fastapi import status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.routing import Match, Router
+from core.rate_limit import get_rate_limit_policy, get_request_cost
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .request_view import get_request_view
 
 logger = logging.getLogger(__name__)
 
 RATE_LIMIT = settings.RATE_LIMIT
 RATE_LIMIT_WINDOW_SECONDS = settings.RATE_LIMIT_WINDOW_SECONDS
 BLOCK_TIME_SECONDS = settings.BLOCK_TIME_SECONDS
-HEALTH_CHECK_PATHS = {"/", "/docs", "/redoc", "/openapi.json"}
+LOCAL_SYNC_BATCH = settings.RATE_LIMIT_LOCAL_SYNC_BATCH
+LOCAL_SYNC_INTERVAL_SECONDS = settings.RATE_LIMIT_LOCAL_SYNC_INTERVAL_SECONDS
+LOCAL_THRESHOLD = settings.RATE_LIMIT_LOCAL_THRESHOLD
+LOCAL_MAX_KEYS = settings.RATE_LIMIT_LOCAL_MAX_KEYS
+CPU_BUDGET = settings.RATE_LIMIT_CPU_BUDGET
+CPU_WINDOW_SECONDS = settings.RATE_LIMIT_CPU_WINDOW_SECONDS
+HASH_MAX_CONCURRENCY = settings.PASSWORD_HASH_MAX_CONCURRENCY
+HEALTH_CHECK_PATHS = {"/", "/docs", "/redoc", "/openapi.json", "/healthz", "/metrics"}
+UNMATCHED_ROUTE = "*"  # Shared bucket for paths that match no route
 
-class RateLimiterMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
+# Count requests and block the IP once the limit is reached, atomically.
+# KEYS[1] = fail counter, KEYS[2] = block key
+# ARGV[1] = limit, ARGV[2] = window seconds, ARGV[3] = block seconds, ARGV[4] = increment
+# Returns {count, ttl_ms}: count is -1 if the IP was already blocked by a concurrent request,
+# ttl_ms is the remaining time of the counter window or of the block.
+COUNT_REQUEST_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return {-1, redis.call('PTTL', KEYS[2])}
+end
+local increment = tonumber(ARGV[4])
+local count = redis.call('INCRBY', KEYS[1], increment)
+if count == increment then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+if count >= tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[2], 1, 'EX', ARGV[3])
+    redis.call('DEL', KEYS[1])
+    return {count, tonumber(ARGV[3]) * 1000}
+end
+return {count, redis.call('PTTL', KEYS[1])}
+"""
+
+class _LocalCount:
+    """Worker-local view of one IP/path counter under the default rate limit"""
+    __slots__ = ("known", "pending", "synced_at", "expires_at", "blocked_until")
+
+    def __init__(self):
+        self.known = 0  # Global count returned by the last sync
+        self.pending = 0  # Requests admitted by this worker since the last sync
+        self.synced_at = 0.0
+        self.expires_at = 0.0
+        self.blocked_until = 0.0
+
+class RateLimiterMiddleware:
+    def __init__(self, app: ASGIApp, router: Optional[Router] = None):
+        self.app = app
         self.whitelist_ips = {"127.0.0.1"}
+        self.routes = []
         self.endpoint_rate_limits = {}
-        self._configure_endpoint_limits()
+        self.endpoint_costs = {}
+        self._static_templates = {}
+        self._configure_endpoint_limits(router)
+        self._count_script = None
+        self._count_script_client = None
+        self._local_counts = {}
+        self._hashing_in_flight = 0
 
-    def _configure_endpoint_limits(self):
+    def _configure_endpoint_limits(self, router: Optional[Router]):
         """
-        Configure rate limits for specific endpoints.
-        Only endpoints listed here will override the default rate limit settings.
-        
-        Format:
-            {
-                "path": {
-                    "limit": (count, window_seconds) or None,  # (allowed_requests, time_window) or None to disable rate limiting
-                    "status_codes": [int, ...],  # Optional: count only these status codes
-                    "clear_on_success": bool  # Optional: clear counter on 2xx responses
-                }
-            }
+        Compile the rate limits and costs declared with @rate_limit and @request_cost
+        into lookups keyed by (method, route template), since one path may serve
+        several endpoints with different policies.
+        Only decorated endpoints override the default rate limit settings.
+
+        Runs when the middleware stack is built at startup, after all routers are included.
         """
-        self.endpoint_rate_limits = {
-            # Add endpoint rate limits here to override default settings
-            "/api/auth/token": {
-                "limit": (60, 60),
-                "status_codes": None,
-                "clear_on_success": False
-            },
-            "/api/auth/login": {
-                "limit": (5, 30),
-                "status_codes": [401, 403],
-                "clear_on_success": True
-            },
-            "/api/roles/permissions": {
-                "limit": (60, 60),
-                "status_codes": None,
-                "clear_on_success": False
-            }
-        }
+        if router is None:
+            return
+
+        for route in router.routes:
+            self.routes.append(route)
+            endpoint = getattr(route, "endpoint", None)
+            if endpoint is None:
+                continue
+            policy = get_rate_limit_policy(endpoint)
+            cost = get_request_cost(endpoint)
+            for method in getattr(route, "methods", None) or ():
+                if policy:
+                    self.endpoint_rate_limits[(method, route.path)] = policy
+                if cost:
+                    self.endpoint_costs[(method, route.path)] = cost
+
+    def _resolve_route_template(self, scope: Scope) -> str:
+        """
+        Resolve the route template (e.g. "/api/users/{user_id}") for a request, matching
+        routes the same way the router does. Paths without parameters are cached
+        per method, as the route matched depends on it.
+        """
+        path = scope["path"]
+        cache_key = (scope["method"], path)
+        template = self._static_templates.get(cache_key)
+        if template:
+            return template
+
+        partial = None
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match is Match.FULL:
+                template = route.path
+                break
+            if match is Match.PARTIAL and partial is None:
+                partial = route.path
+        else:
+            template = partial
+
+        if template is None:
+            return UNMATCHED_ROUTE
+        if template == path:
+            self._static_templates[cache_key] = template
+        return template
     
-    def _get_rate_limit_config(self, path: str) -> dict:
+    def _get_rate_limit_config(self, method: str, template: str) -> dict:
         """
-        Get rate limit configuration for a path.
+        Get rate limit configuration for a method and route template.
         Returns custom config if exists, otherwise returns default config.
         """
-        custom_config = self.endpoint_rate_limits.get(path)
+        custom_config = self.endpoint_rate_limits.get((method, template))
         if custom_config:
             return custom_config
         
@@ -70,77 +144,270 @@ class RateLimiterMiddleware(BaseHTTPMiddleware):
             "clear_on_success": False
         }
 
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
-        method = request.method
+    def _too_many_requests(self, reason: str) -> JSONResponse:
+        RATE_LIMIT_REJECTIONS.labels(reason).inc()
+        resp = APIResponse[None](code=429, message="Too many requests. Try again later.")
+        return JSONResponse(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            content=resp.model_dump(exclude_none=True))
+
+    def _server_busy(self) -> JSONResponse:
+        RATE_LIMIT_REJECTIONS.labels("hashing_busy").inc()
+        resp = APIResponse[None](code=503, message="Server busy. Try again later.")
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            content=resp.model_dump(exclude_none=True),
+                            headers={"Retry-After": "1"})
+
+    async def _consume_cpu_budget(self, redis, ip: str, cost: int) -> bool:
+        """
+        Charge a request's cost to the IP's CPU budget in one script call.
+        Returns True if the budget is exhausted; the IP is then blocked for one budget window.
+        """
+        try:
+            count_script = self._get_count_script(redis)
+            spent, _ = await redis_call(count_script(
+                keys=[f"fail:cpu:{ip}", f"block:cpu:{ip}"],
+                args=[CPU_BUDGET, CPU_WINDOW_SECONDS, CPU_WINDOW_SECONDS, cost]
+            ), name="count_request")
+        except RedisUnavailableError:
+            return False
+        except Exception as e:
+            logger.error(f"Rate limiter error for IP {ip} on CPU budget: {e}")
+            return False
+
+        if spent == -1:
+            return True
+        if spent >= CPU_BUDGET:
+            logger.warning(f"IP {ip} exhausted its CPU budget for {CPU_WINDOW_SECONDS} seconds (spent {spent}, budget: {CPU_BUDGET})")
+            return True
+        return False
+
+    def _get_count_script(self, redis):
+        """Return the counting script bound to the current Redis client (EVALSHA with load fallback)"""
+        if self._count_script is None or self._count_script_client is not redis:
+            self._count_script = redis.register_script(COUNT_REQUEST_SCRIPT)
+            self._count_script_client = redis
+        return self._count_script
+
+    async def _count_response(self, redis, ip: str, path: str, rate_limit_config: dict, status_code: int) -> bool:
+        """
+        Update the counter for a finished request in a single Redis round trip.
+        Returns True if this request reached the limit or the IP was blocked meanwhile.
+        """
+        status_codes = rate_limit_config.get("status_codes")
+        limit_count, window_seconds = rate_limit_config["limit"]
+        clear_on_success = rate_limit_config.get("clear_on_success", False)
+        is_success = 200 <= status_code < 300
+        api_fail_key = f"fail:api:{ip}:{path}"
+
+        should_count = False
+        if not status_codes:
+            should_count = True
+        elif status_codes and status_code in status_codes:
+            should_count = True
+
+        if should_count:
+            try:
+                count_script = self._get_count_script(redis)
+                api_fails, _ = await redis_call(count_script(
+                    keys=[api_fail_key, f"block:api:{ip}:{path}"],
+                    args=[limit_count, window_seconds, BLOCK_TIME_SECONDS, 1]
+                ), name="count_request")
+                logger.info(f"IP {ip} API {path} status {status_code}")
+
+                if api_fails == -1:
+                    return True
+
+                if api_fails >= limit_count:
+                    logger.warning(f"IP {ip} is now blocked for API {path} for {BLOCK_TIME_SECONDS} seconds (count {api_fails}, limit: {limit_count})")
+                    return True
+            except RedisUnavailableError:
+                pass
+            except Exception as e:
+                logger.error(f"Rate limiter error for IP {ip} on API {path}: {e}")
+        elif clear_on_success and is_success:
+            try:
+                await redis_call(redis.delete(api_fail_key), name="delete")
+            except RedisUnavailableError:
+                pass
+            except Exception as e:
+                logger.error(f"Failed to clear count for IP {ip} on API {path}: {e}")
+
+        return False
+
+    def _get_local_count(self, key: str, now: float) -> _LocalCount:
+        """Return the local counter for a key, starting a new one when its window and block are over"""
+        local = self._local_counts.get(key)
+        if local is None or (local.expires_at <= now and local.blocked_until <= now):
+            if len(self._local_counts) >= LOCAL_MAX_KEYS:
+                self._local_counts = {
+                    k: v for k, v in self._local_counts.items()
+                    if v.expires_at > now or v.blocked_until > now
+                }
+                if len(self._local_counts) >= LOCAL_MAX_KEYS:
+                    self._local_counts.clear()
+            local = self._local_counts[key] = _LocalCount()
+        return local
+
+    def _keep_pending(self, local: _LocalCount, increment: int, now: float, window_seconds: int):
+        """Keep a failed sync's requests for the next one; a counter that never synced lives for one window"""
+        local.pending += increment
+        if local.expires_at <= now:
+            local.expires_at = now + window_seconds
+
+    async def _check_local_limit(self, redis, ip: str, path: str, limit: tuple) -> bool:
+        """
+        Count a request against the default rate limit.
+        Returns True if the request must be rejected.
+
+        Each worker admits requests from its local counter and reconciles them to Redis
+        in one script call per LOCAL_SYNC_BATCH requests (or LOCAL_SYNC_INTERVAL_SECONDS).
+        Once the last known global count plus the local pending count passes
+        LOCAL_THRESHOLD of the limit, every request syncs, so the block is exact for
+        this worker. Requests other workers admitted but have not synced yet are not
+        seen, so the limit can be exceeded by at most about
+        2 * workers * (LOCAL_SYNC_BATCH - 1) requests per IP and path per window
+        (72 with 4 workers and the default batch of 10). Blocks found in Redis are
+        cached locally for at most LOCAL_SYNC_INTERVAL_SECONDS.
+        """
+        limit_count, window_seconds = limit
+        now = time.monotonic()
+        local = self._get_local_count(f"{ip}:{path}", now)
+
+        if local.blocked_until > now:
+            return True
+
+        if (
+            local.synced_at
+            and now < local.expires_at
+            and now - local.synced_at < LOCAL_SYNC_INTERVAL_SECONDS
+            and local.pending + 1 < LOCAL_SYNC_BATCH
+            and local.known + local.pending + 1 < limit_count * LOCAL_THRESHOLD
+        ):
+            local.pending += 1
+            return False
+
+        # Flush the pending count together with this request
+        increment = local.pending + 1
+        local.pending = 0
+        local.synced_at = now
+        try:
+            count_script = self._get_count_script(redis)
+            count, ttl_ms = await redis_call(count_script(
+                keys=[f"fail:api:{ip}:{path}", f"block:api:{ip}:{path}"],
+                args=[limit_count, window_seconds, BLOCK_TIME_SECONDS, increment]
+            ), name="count_request")
+        except RedisUnavailableError:
+            self._keep_pending(local, increment, now, window_seconds)
+            return False
+        except Exception as e:
+            self._keep_pending(local, increment, now, window_seconds)
+            logger.error(f"Rate limiter error for IP {ip} on API {path}: {e}")
+            return False
+
+        ttl_seconds = ttl_ms / 1000 if ttl_ms > 0 else window_seconds
+        if count == -1 or count >= limit_count:
+            if count >= limit_count:
+                logger.warning(f"IP {ip} is now blocked for API {path} for {BLOCK_TIME_SECONDS} seconds (count {count}, limit: {limit_count})")
+            local.blocked_until = now + min(ttl_seconds, LOCAL_SYNC_INTERVAL_SECONDS)
+            return True
+
+        local.known = count
+        local.expires_at = now + ttl_seconds
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_view = get_request_view(scope)
 
-        if path in HEALTH_CHECK_PATHS or method == "OPTIONS":
-            return await call_next(request)
+        if request_view.path in HEALTH_CHECK_PATHS or request_view.method == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
 
+        # Counters are keyed by route template, not by the concrete path
+        path = self._resolve_route_template(scope)
+        cost = self.endpoint_costs.get((request_view.method, path))
+
+        if not (cost and cost["hashing"]):
+            await self._apply_rate_limits(scope, receive, send, request_view.method, path, request_view.ip, cost)
+            return
+
+        # Reject instead of queueing once too many hashing requests are in flight
+        if self._hashing_in_flight >= HASH_MAX_CONCURRENCY:
+            logger.warning(f"Rejected {path}: {self._hashing_in_flight} hashing requests in flight (max: {HASH_MAX_CONCURRENCY})")
+            await self._server_busy()(scope, receive, send)
+            return
+
+        self._hashing_in_flight += 1
         try:
-            ip = get_real_ip(request)
-            if ip in self.whitelist_ips:
-                return await call_next(request)
-
-            redis = get_redis()
-            # Get rate limit config
-            rate_limit_config = self._get_rate_limit_config(path)
-            
-            # If limit is None, skip rate limiting for this endpoint
-            if rate_limit_config.get("limit") is None:
-                return await call_next(request)
-            
-            api_block_key = f"block:api:{ip}:{path}"
-            
-            # Check if IP is blocked for this endpoint
-            is_blocked = await redis.get(api_block_key)
-            if is_blocked:
-                resp = APIResponse[None](code=429, message="Too many requests. Try again later.")
-                return JSONResponse(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                                    content=resp.model_dump(exclude_none=True))
-
-            response = await call_next(request)
-            status_codes = rate_limit_config.get("status_codes")
-            limit_count, window_seconds = rate_limit_config["limit"]
-            clear_on_success = rate_limit_config.get("clear_on_success", False)
-            is_success = 200 <= response.status_code < 300
-            
-            should_count = False
-            if not status_codes:
-                should_count = True
-            elif status_codes and response.status_code in status_codes:
-                should_count = True
-
-            if should_count:
-                try:
-                    api_fail_key = f"fail:api:{ip}:{path}"
-                    api_fails = await redis.incr(api_fail_key)
-                    logger.info(f"IP {ip} API {path} status {response.status_code}")
-
-                    if api_fails == 1:
-                        await redis.expire(api_fail_key, window_seconds)
-
-                    if api_fails >= limit_count:
-                        logger.warning(f"IP {ip} is now blocked for API {path} for {BLOCK_TIME_SECONDS} seconds (count {api_fails}, limit: {limit_count})")
-                        await redis.set(api_block_key, 1, ex=BLOCK_TIME_SECONDS)
-                        await redis.delete(api_fail_key)
-                        resp = APIResponse[None](code=429, message="Too many requests. Try again later.")
-                        return JSONResponse(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                                            content=resp.model_dump(exclude_none=True))
-                except Exception as e:
-                    logger.error(f"Rate limiter error for IP {ip} on API {path}: {e}")
-            elif clear_on_success and is_success:
-                try:
-                    api_fail_key = f"fail:api:{ip}:{path}"
-                    await redis.delete(api_fail_key)
-                except Exception as e:
-                    logger.error(f"Failed to clear count for IP {ip} on API {path}: {e}")
-
-            return response
+            await self._apply_rate_limits(scope, receive, send, request_view.method, path, request_view.ip, cost)
+        finally:
+            self._hashing_in_flight -= 1
+
+    async def _apply_rate_limits(self, scope: Scope, receive: Receive, send: Send, method: str, path: str, ip: str, cost: Optional[dict]):
+        if ip in self.whitelist_ips:
+            await self.app(scope, receive, send)
+            return
+
+        redis = get_redis()
+
+        # Expensive routes drain the per-IP CPU budget by their cost
+        if cost and await self._consume_cpu_budget(redis, ip, cost["cost"]):
+            await self._too_many_requests("cpu_budget")(scope, receive, send)
+            return
+
+        rate_limit_config = self._get_rate_limit_config(method, path)
+
+        # If limit is None, skip rate limiting for this endpoint
+        if rate_limit_config.get("limit") is None:
+            await self.app(scope, receive, send)
+            return
 
+        # Default limit: counted locally and reconciled to Redis in batches
+        if (method, path) not in self.endpoint_rate_limits:
+            if await self._check_local_limit(redis, ip, path, rate_limit_config["limit"]):
+                await self._too_many_requests("default_limit")(scope, receive, send)
+                return
+            await self.app(scope, receive, send)
+            return
+
+        # Endpoint limits count per method, so e.g. GET and DELETE on one path do not share a counter
+        path = f"{method} {path}"
+
+        # Check if IP is blocked for this endpoint
+        try:
+            is_blocked = await redis_call(redis.get(f"block:api:{ip}:{path}"), name="get")
+        except RedisUnavailableError:
+            # Fail open: the limiter must not take the API down with Redis
+            await self.app(scope, receive, send)
+            return
         except Exception as e:
             logger.error(f"Unexpected error in rate limiter middleware for path {path}: {e}")
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
+
+        if is_blocked:
+            await self._too_many_requests("endpoint_limit")(scope, receive, send)
+            return
+
+        blocked = False
+
+        async def send_wrapper(message: Message):
+            nonlocal blocked
+            if message["type"] == "http.response.start":
+                # The request that reaches the limit is answered with 429 instead
+                blocked = await self._count_response(redis, ip, path, rate_limit_config, message["status"])
+                if blocked:
+                    await self._too_many_requests("endpoint_limit")(scope, receive, send)
+                    return
+            elif blocked:
+                # Drop the body of the replaced response
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
 
 def add_rate_limiter_middleware(app):
-    app.add_middleware(RateLimiterMiddleware)
\ No newline at end of file
+    app.add_middleware(RateLimiterMiddleware, router=app.router)
\ No newline at end of file
@@ -1,29 +1,234 @@
+import time
+import random
+import asyncio
 import logging
-from utils import get_real_ip
-from fastapi import FastAPI, Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Dict, Optional
+from fastapi import FastAPI
+from core.config import settings
+from core.request_timing import get_request_timings
+from core.query_counter import get_query_stats
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .request_view import get_request_view
 
 logger = logging.getLogger("api_logger")
 
-HEALTH_CHECK_PATHS = {"/", "/docs", "/redoc", "/openapi.json", "/healthz"}
+HEALTH_CHECK_PATHS = {"/", "/docs", "/redoc", "/openapi.json", "/healthz", "/metrics"}
+UNMATCHED_ROUTE = "*"  # summary bucket for paths that match no route, keeps the table bounded
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        method = request.method
-        path = request.url.path
-        client_ip = get_real_ip(request)
-        user_agent = request.headers.get("user-agent", "unknown")
+class _RouteStats:
+    """Per-route counters for one summary interval, with a fixed-size latency reservoir"""
+    __slots__ = ("count", "errors", "suppressed", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.suppressed = 0
+        self.samples = []
+
+    def add(self, duration_ms: float, is_error: bool, reservoir_size: int):
+        self.count += 1
+        if is_error:
+            self.errors += 1
+        # Reservoir sampling: every request has the same chance of being kept, memory stays fixed
+        if len(self.samples) < reservoir_size:
+            self.samples.append(duration_ms)
+        else:
+            index = random.randrange(self.count)
+            if index < reservoir_size:
+                self.samples[index] = duration_ms
+
+    def percentiles(self, *quantiles: float) -> list:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return [None for _ in quantiles]
+        return [round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2) for q in quantiles]
+
+class AccessLogSummary:
+    """
+    Per-route request counts and latency percentiles for this worker.
+
+    A background task started in the lifespan writes one summary line per route
+    every `interval` seconds, so the last interval of an idle worker is flushed too.
+    """
+    def __init__(self, interval: float, reservoir_size: int):
+        self.interval = interval
+        self.reservoir_size = reservoir_size
+        self._route_stats: Dict[str, _RouteStats] = {}
+        self._started_at = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, route_key: str, duration_ms: float, is_error: bool) -> _RouteStats:
+        stats = self._route_stats.get(route_key)
+        if stats is None:
+            stats = self._route_stats[route_key] = _RouteStats()
+        stats.add(duration_ms, is_error, self.reservoir_size)
+        return stats
+
+    def start(self):
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._started_at = time.monotonic()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Cancel the timer and flush the interval in progress"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to write the access log summary: {e}")
+
+    def flush(self):
+        """Write one summary line per route seen since the last flush, then start a new interval"""
+        route_stats, self._route_stats = self._route_stats, {}
+        interval = round(time.monotonic() - self._started_at, 1)
+        self._started_at = time.monotonic()
+
+        for route_key, stats in route_stats.items():
+            p50, p95, p99 = stats.percentiles(0.50, 0.95, 0.99)
+            logger.info(
+                f"API Summary: route={route_key} interval_s={interval} count={stats.count} "
+                f"errors={stats.errors} suppressed={stats.suppressed} p50_ms={p50} p95_ms={p95} p99_ms={p99}",
+                extra={
+                    "event": "access_summary",
+                    "route": route_key,
+                    "stats": {
+                        "interval_s": interval,
+                        "count": stats.count,
+                        "errors": stats.errors,
+                        "suppressed": stats.suppressed,
+                        "p50_ms": p50,
+                        "p95_ms": p95,
+                        "p99_ms": p99,
+                    },
+                }
+            )
+
+access_log_summary = AccessLogSummary(
+    settings.ACCESS_LOG_SUMMARY_INTERVAL_SECONDS,
+    settings.ACCESS_LOG_SUMMARY_RESERVOIR
+)
+
+class RequestLoggingMiddleware:
+    def __init__(self, app: ASGIApp, summary: AccessLogSummary = access_log_summary):
+        self.app = app
+        self.default_sample_rate = settings.ACCESS_LOG_SAMPLE_RATE
+        self.sample_rates = dict(settings.ACCESS_LOG_SAMPLE_RATES)
+        self.slow_ms = settings.ACCESS_LOG_SLOW_MS
+        self.max_lines_per_second = settings.ACCESS_LOG_MAX_LINES_PER_SECOND
+        self.summary = summary
+
+        self._line_budget = float(self.max_lines_per_second)
+        self._budget_refilled_at = time.monotonic()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_view = get_request_view(scope)
 
         # Skip logging for health check and docs
-        if path not in HEALTH_CHECK_PATHS:
-            logger.info(f"API Request: method={method} path={path} ipAddress={client_ip} user-agent=\"{user_agent}\"")
+        if request_view.path in HEALTH_CHECK_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.record(scope, request_view, status_code, (time.perf_counter() - start_time) * 1000)
+
+    def record(self, scope: Scope, request_view, status_code: int, duration_ms: float):
+        """Count the request in the route summary and write its access line if it is selected"""
+        route_path = getattr(scope.get("route"), "path", None)
+        route_key = route_path or UNMATCHED_ROUTE
+        stats = self.summary.add(route_key, duration_ms, status_code >= 500)
+
+        # Server errors and slow requests are always written, even past the line budget,
+        # so they survive incident load; client errors are always selected but budgeted,
+        # and everything else is sampled per route
+        if status_code >= 500 or duration_ms >= self.slow_ms:
+            self.log_access(scope, request_view, route_path, status_code, duration_ms)
+            return
+
+        if status_code >= 400:
+            selected = True
+        else:
+            rate = self.sample_rates.get(route_key, self.default_sample_rate)
+            selected = rate >= 1 or random.random() < rate
+
+        if selected:
+            if self._take_line_budget():
+                self.log_access(scope, request_view, route_path, status_code, duration_ms)
+            else:
+                stats.suppressed += 1
 
-        response = await call_next(request)
+    def _take_line_budget(self) -> bool:
+        """Token bucket capping sampled access lines per second, so their volume is bounded under any load"""
+        now = time.monotonic()
+        self._line_budget = min(
+            float(self.max_lines_per_second),
+            self._line_budget + (now - self._budget_refilled_at) * self.max_lines_per_second,
+        )
+        self._budget_refilled_at = now
+        if self._line_budget < 1:
+            return False
+        self._line_budget -= 1
+        return True
 
-        if path not in HEALTH_CHECK_PATHS:
-            logger.info(f"API Response: method={method} path={path} ipAddress={client_ip} user-agent=\"{user_agent}\" status_code={response.status_code}")
+    def log_access(self, scope: Scope, request_view, route_path, status_code: int, duration_ms: float):
+        user_id = scope.get("state", {}).get("user_id")
+        user_agent = request_view.headers.get("user-agent", "unknown")
+        duration_ms = round(duration_ms, 2)
+        request_timings = get_request_timings()
+        timings = request_timings.breakdown() if request_timings else None
+        details_text = ""
+        if timings:
+            details_text = " timings_ms=" + ",".join(f"{name}:{entry['dur']}" for name, entry in timings.items())
+        query_stats = get_query_stats()
+        queries = None
+        if query_stats:
+            queries = {"count": query_stats.count, "duration_ms": round(query_stats.duration * 1000, 2)}
+            details_text += f" queries={queries['count']} db_ms={queries['duration_ms']}"
 
-        return response
+        logger.info(
+            f"API Access: method={request_view.method} path={request_view.path} route={route_path} "
+            f"ipAddress={request_view.ip} user-agent=\"{user_agent}\" status_code={status_code} "
+            f"duration_ms={duration_ms} user_id={user_id} request_id={request_view.request_id}{details_text}",
+            extra={
+                "event": "access",
+                "request_id": request_view.request_id,
+                "route": route_path,
+                "method": request_view.method,
+                "path": request_view.path,
+                "status": status_code,
+                "duration_ms": duration_ms,
+                "ip": request_view.ip,
+                "user_agent": user_agent,
+                "user_id": user_id,
+                "timings": timings,
+                "queries": queries,
+            }
+        )
 
 def add_request_logging_middleware(app: FastAPI):
-    app.add_middleware(RequestLoggingMiddleware)
\ No newline at end of file
+    app.add_middleware(RequestLoggingMiddleware)
@@ -0,0 +1,42 @@
+import re
+from uuid import uuid4
+from typing import Dict
+from utils import get_scope_real_ip
+from starlette.types import Scope
+
+REQUEST_VIEW_KEY = "request_view"
+# Incoming request ids end up in every log line and the response, so only plain tokens are accepted
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+class RequestView:
+    """
+    Parsed view of an HTTP request shared by all middlewares.
+
+    Built once per request from the ASGI scope and cached in scope["state"], so the
+    path, method, headers and client IP are decoded a single time no matter how
+    many middlewares look at them. Also reachable as request.state.request_view.
+    The request id is taken from a well-formed incoming X-Request-ID header or generated.
+    """
+    __slots__ = ("method", "path", "headers", "ip", "request_id")
+
+    def __init__(self, scope: Scope):
+        self.method: str = scope["method"]
+        self.path: str = scope["path"]
+
+        # Header names are lower-cased bytes in ASGI; the first occurrence wins
+        headers: Dict[str, str] = {}
+        for name, value in scope.get("headers", ()):
+            headers.setdefault(name.decode("latin-1"), value.decode("latin-1"))
+        self.headers = headers
+
+        self.ip: str = get_scope_real_ip(scope, headers)
+        request_id = headers.get("x-request-id")
+        self.request_id: str = request_id if request_id and REQUEST_ID_PATTERN.match(request_id) else uuid4().hex
+
+def get_request_view(scope: Scope) -> RequestView:
+    """Return the request view for an HTTP scope, building it on first use"""
+    state = scope.setdefault("state", {})
+    view = state.get(REQUEST_VIEW_KEY)
+    if view is None:
+        view = state[REQUEST_VIEW_KEY] = RequestView(scope)
+    return view
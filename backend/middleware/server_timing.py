@@ -0,0 +1,40 @@
+from fastapi import FastAPI
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from core.request_timing import get_request_timings, start_request_timing, stop_request_timing
+
+class ServerTimingMiddleware:
+    """
+    Collect per-request db, redis and hash timings and report them in a Server-Timing header.
+
+    Registered just inside the tracing middleware, so every other middleware and the
+    endpoint run inside the collection; the access log reads the same timings for its
+    `timings` field.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = start_request_timing()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", get_request_timings().server_timing_header())
+                # Cross-origin pages only see Server-Timing for origins CORS already allowed
+                allowed_origin = headers.get("access-control-allow-origin")
+                if allowed_origin:
+                    headers.append("Timing-Allow-Origin", allowed_origin)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stop_request_timing(token)
+
+def add_server_timing_middleware(app: FastAPI):
+    app.add_middleware(ServerTimingMiddleware)
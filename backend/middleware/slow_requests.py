@@ -0,0 +1,33 @@
+from fastapi import FastAPI
+from core.slow_requests import slow_request_watchdog
+from starlette.types import ASGIApp, Receive, Scope, Send
+from .request_view import get_request_view
+
+EXCLUDED_PATHS = {"/healthz", "/metrics"}
+# Profiling and memory snapshots are slow on purpose, and the watchdog must not capture its own endpoint
+EXCLUDED_PREFIXES = ("/api/debug/",)
+
+class SlowRequestMiddleware:
+    """Register each request with the slow request watchdog while it is in flight"""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_view = get_request_view(scope)
+
+        if request_view.path in EXCLUDED_PATHS or request_view.path.startswith(EXCLUDED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        token = slow_request_watchdog.begin(scope, request_view.request_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            slow_request_watchdog.end(token)
+
+def add_slow_request_middleware(app: FastAPI):
+    app.add_middleware(SlowRequestMiddleware)
@@ -0,0 +1,61 @@
+from fastapi import FastAPI
+from core.config import settings
+from core.request_context import bind_request_id, reset_request_id
+from core.tracing import finish_request_trace, start_request_trace
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .request_view import get_request_view
+
+class TracingMiddleware:
+    """
+    Bind the request id to the request's context and return it in X-Request-ID.
+
+    Registered outermost so every log record of the request carries the id. With
+    TRACING_ENABLED the request also gets a server span, which the DB, Redis and
+    hashing spans hang under; see core.tracing.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.tracing_enabled = settings.TRACING_ENABLED
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_view = get_request_view(scope)
+        request_id_token = bind_request_id(request_view.request_id)
+        root = None
+        if self.tracing_enabled:
+            root, trace_token = start_request_trace(
+                f"{request_view.method} {request_view.path}",
+                request_view.request_id,
+                request_view.headers.get("traceparent"),
+                {"http.request.method": request_view.method, "url.path": request_view.path, "client.address": request_view.ip}
+            )
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Request-ID", request_view.request_id)
+                if root is not None:
+                    root.set_attribute("http.response.status_code", message["status"])
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if root is not None:
+                # Named by route template once routing has run, so spans group per endpoint
+                route_path = getattr(scope.get("route"), "path", None)
+                if route_path:
+                    root.name = f"{request_view.method} {route_path}"
+                    root.set_attribute("http.route", route_path)
+                finish_request_trace(root, trace_token, error)
+            reset_request_id(request_id_token)
+
+def add_tracing_middleware(app: FastAPI):
+    app.add_middleware(TracingMiddleware)
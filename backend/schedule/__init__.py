@@ -1,5 +1,8 @@
+import time
 from core.database import engine
+from core.metrics import SCHEDULER_JOB_DURATION
 from .cleanup_tasks import CleanupTasks
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_SUBMITTED
 from apscheduler.executors.asyncio import AsyncIOExecutor
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
@@ -13,6 +16,22 @@ jobstores = {
 scheduler = AsyncIOScheduler(jobstores=jobstores, executors=executors)
 cleanup_tasks = CleanupTasks()
 
+# Start times of submitted job runs, keyed by (job id, scheduled run time)
+_job_started_at = {}
+
+def _on_job_submitted(event):
+    for run_time in event.scheduled_run_times:
+        _job_started_at[(event.job_id, run_time)] = time.perf_counter()
+
+def _on_job_finished(event):
+    started_at = _job_started_at.pop((event.job_id, event.scheduled_run_time), None)
+    if started_at is not None:
+        outcome = "error" if event.exception else "success"
+        SCHEDULER_JOB_DURATION.labels(event.job_id, outcome).observe(time.perf_counter() - started_at)
+
+scheduler.add_listener(_on_job_submitted, EVENT_JOB_SUBMITTED)
+scheduler.add_listener(_on_job_finished, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+
 def register_schedules():
     # Add new schedules imports below.
     scheduler.add_job(
@@ -33,6 +33,20 @@ class TestGetUserProfileAPI:
             print(f"Test failed with exception: {str(e)}")
             raise
 
+    @pytest.mark.asyncio
+    async def test_get_user_profile_with_fields(
+        self, client: AsyncClient, account_test_user: Users, account_auth_headers: dict
+    ):
+        """Test user profile retrieval with a sparse fieldset"""
+        response = await client.get(
+            "/api/account/profile?fields=email",
+            headers={"Authorization": account_auth_headers["Authorization"]},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["data"] == {"id": account_test_user.id, "email": account_test_user.email}
+
     @pytest.mark.asyncio
     async def test_get_user_profile_unauthorized(self, client: AsyncClient):
         """Test profile access without authentication token"""
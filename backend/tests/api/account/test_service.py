@@ -42,6 +42,16 @@ class TestGetUserById:
             with pytest.raises(SQLAlchemyError):
                 await get_user_by_id(test_db_session, "test-id")
 
+    @pytest.mark.asyncio
+    async def test_get_user_by_id_with_fields(
+        self, test_db_session: AsyncSession, test_user: Users
+    ):
+        """Test user retrieval selecting only the requested columns"""
+        user = await get_user_by_id(test_db_session, test_user.id, fields=["id", "email"])
+
+        assert not isinstance(user, Users)
+        assert dict(user._mapping) == {"id": test_user.id, "email": test_user.email}
+
 
 class TestUpdateUserProfile:
     """Test update_user_profile service function"""
@@ -0,0 +1,132 @@
+import importlib
+import pytest
+import pytest_asyncio
+from collections import Counter
+from types import SimpleNamespace
+from unittest.mock import patch
+from uuid_utils import uuid7
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+import api
+from core.config import settings
+from core.permissions import Permission
+from models.role_attributes import RoleAttributes
+from models.role_attributes_mapper import RoleAttributesMapper
+from utils.custom_exception import ConflictException
+
+
+@pytest_asyncio.fixture
+async def diagnostics_auth_headers(test_db_session: AsyncSession, users_auth_headers: dict, users_test_role):
+    """Authentication headers of a user whose role also grants DIAGNOSE_SYSTEM"""
+    attribute = RoleAttributes(id=str(uuid7()), name=Permission.DIAGNOSE_SYSTEM.value)
+    test_db_session.add(attribute)
+    await test_db_session.commit()
+    test_db_session.add(RoleAttributesMapper(role_id=users_test_role.id, attributes_id=attribute.id, value=True))
+    await test_db_session.commit()
+    return users_auth_headers
+
+
+def fake_sampler():
+    return SimpleNamespace(
+        duration=1.0,
+        samples=100,
+        sampling_seconds=0.005,
+        overhead=0.005,
+        stacks=Counter({"main:run;api:handler": 60, "main:run;db:query": 40}),
+        collapsed=lambda: "main:run;api:handler 60\nmain:run;db:query 40",
+    )
+
+
+class TestProfileAPI:
+    """Test GET /api/debug/profile endpoint"""
+
+    @pytest.mark.asyncio
+    async def test_profile_success(self, client: AsyncClient, diagnostics_auth_headers: dict):
+        """Test a profile is returned as JSON stacks, most frequent first"""
+        with patch("api.debug.controller.profile_worker", return_value=fake_sampler()) as mock_profile:
+            response = await client.get(
+                "/api/debug/profile?seconds=1&hz=100",
+                headers={"Authorization": diagnostics_auth_headers["Authorization"]},
+            )
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["samples"] == 100
+        assert [stack["count"] for stack in data["stacks"]] == [60, 40]
+        mock_profile.assert_awaited_once_with(1, 100, False)
+
+    @pytest.mark.asyncio
+    async def test_profile_collapsed(self, client: AsyncClient, diagnostics_auth_headers: dict):
+        """Test format=collapsed returns flamegraph input as plain text"""
+        with patch("api.debug.controller.profile_worker", return_value=fake_sampler()):
+            response = await client.get(
+                "/api/debug/profile?format=collapsed&all_threads=true",
+                headers={"Authorization": diagnostics_auth_headers["Authorization"]},
+            )
+
+        assert response.status_code == 200
+        assert response.text == "main:run;api:handler 60\nmain:run;db:query 40"
+
+    @pytest.mark.asyncio
+    async def test_profile_already_running(self, client: AsyncClient, diagnostics_auth_headers: dict):
+        """Test a concurrent profile in the same worker is rejected with 409"""
+        with patch(
+            "api.debug.controller.profile_worker",
+            side_effect=ConflictException("A profile is already running in this worker"),
+        ):
+            response = await client.get(
+                "/api/debug/profile",
+                headers={"Authorization": diagnostics_auth_headers["Authorization"]},
+            )
+
+        assert response.status_code == 409
+
+    @pytest.mark.asyncio
+    async def test_profile_requires_diagnose_permission(self, client: AsyncClient, users_auth_headers: dict):
+        """Test users without DIAGNOSE_SYSTEM get 403 and no profile is taken"""
+        with patch("api.debug.controller.profile_worker") as mock_profile:
+            response = await client.get(
+                "/api/debug/profile",
+                headers={"Authorization": users_auth_headers["Authorization"]},
+            )
+
+        assert response.status_code == 403
+        mock_profile.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_profile_unauthorized(self, client: AsyncClient):
+        """Test the profiler requires authentication"""
+        response = await client.get("/api/debug/profile")
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_profile_seconds_capped(self, client: AsyncClient, diagnostics_auth_headers: dict):
+        """Test profiles longer than PROFILER_MAX_SECONDS are rejected"""
+        response = await client.get(
+            f"/api/debug/profile?seconds={settings.PROFILER_MAX_SECONDS + 1}",
+            headers={"Authorization": diagnostics_auth_headers["Authorization"]},
+        )
+        assert response.status_code == 422
+
+
+class TestDiagnosticsRoutes:
+    """Test which debug routes are mounted"""
+
+    @pytest.fixture
+    def reload_api(self, monkeypatch):
+        def _reload(debug_mode: bool):
+            monkeypatch.setattr(settings, "DEBUG_MODE", debug_mode)
+            return {route.path for route in importlib.reload(api).api_router.routes}
+        yield _reload
+        monkeypatch.undo()
+        importlib.reload(api)
+
+    def test_diagnostics_available_without_debug_mode(self, reload_api):
+        """Test the permission-guarded diagnostics stay mounted when DEBUG_MODE is off"""
+        paths = reload_api(False)
+        assert {"/debug/profile", "/debug/memory/snapshots", "/debug/slow-requests"} <= paths
+        assert "/debug/test-ip" not in paths
+
+    def test_debug_helpers_only_in_debug_mode(self, reload_api):
+        """Test the unguarded debug helpers are mounted only with DEBUG_MODE"""
+        assert "/debug/test-ip" in reload_api(True)
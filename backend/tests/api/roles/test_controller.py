@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 from httpx import AsyncClient
 from api.roles.schema import (
     RoleResponse,
@@ -154,7 +154,9 @@ class TestUpdateRoleAPI:
         role_id = "role-123"
         role_data = {"name": "updated_manager", "description": "Updated manager role"}
 
-        with patch("api.roles.controller.update_role") as mock_update_role:
+        with patch("api.roles.controller.update_role") as mock_update_role, patch(
+            "api.roles.controller.invalidate_user_facets", new_callable=AsyncMock
+        ) as mock_invalidate:
             mock_role = RoleResponse(
                 id=role_id, name="updated_manager", description="Updated manager role"
             )
@@ -171,6 +173,7 @@ class TestUpdateRoleAPI:
             assert data["code"] == 200
             assert data["message"] == "Role updated successfully"
             assert data["data"]["name"] == "updated_manager"
+            mock_invalidate.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_update_role_not_found(
@@ -254,7 +257,9 @@ class TestDeleteRoleAPI:
         """Test successful role deletion"""
         role_id = "role-123"
 
-        with patch("api.roles.controller.delete_role") as mock_delete_role:
+        with patch("api.roles.controller.delete_role") as mock_delete_role, patch(
+            "api.roles.controller.invalidate_user_facets", new_callable=AsyncMock
+        ) as mock_invalidate:
             mock_delete_role.return_value = True
 
             response = await client.delete(
@@ -266,6 +271,7 @@ class TestDeleteRoleAPI:
             data = response.json()
             assert data["code"] == 200
             assert data["message"] == "Role deleted successfully"
+            mock_invalidate.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_delete_role_not_found(
@@ -3,8 +3,10 @@ from datetime import datetime
 from httpx import AsyncClient
 from unittest.mock import patch
 from utils.custom_exception import NotFoundException
-from api.users.schema import UserResponse, UserPagination
+from api.users.schema import UserResponse, UserPagination, UserFieldsPagination
 from api.users.schema import UserDeleteBatchResponse, UserDeleteResult
+from api.users.schema import UserUpdateBatchResponse, UserUpdateResult
+from api.users.schema import UserImportResponse, UserImportError, UserFacets, UserFacetCount
 
 
 class TestUsersController:
@@ -74,6 +76,42 @@ class TestUsersController:
             assert response.status_code == 200
             mock_get_users.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_get_users_with_fields(
+        self, client: AsyncClient, users_auth_headers: dict
+    ):
+        """Test users retrieval with a sparse fieldset"""
+        with patch("api.users.controller.get_all_users") as mock_get_users:
+            mock_get_users.return_value = UserFieldsPagination(
+                users=[{"id": "user1", "email": "user1@example.com"}],
+                total=1,
+                page=1,
+                per_page=10,
+                total_pages=1,
+            )
+
+            response = await client.get(
+                "/api/users?fields=email",
+                headers={"Authorization": users_auth_headers["Authorization"]},
+            )
+
+            assert response.status_code == 200
+            data = response.json()
+            assert data["data"]["users"] == [{"id": "user1", "email": "user1@example.com"}]
+            assert mock_get_users.call_args.kwargs["fields"] == ["id", "email"]
+
+    @pytest.mark.asyncio
+    async def test_get_users_with_unknown_fields(
+        self, client: AsyncClient, users_auth_headers: dict
+    ):
+        """Test users retrieval rejects unknown fields"""
+        response = await client.get(
+            "/api/users?fields=email,hash_password",
+            headers={"Authorization": users_auth_headers["Authorization"]},
+        )
+
+        assert response.status_code == 400
+
     @pytest.mark.asyncio
     async def test_create_user_success(
         self, client: AsyncClient, users_auth_headers: dict
@@ -395,6 +433,177 @@ class TestUsersController:
 
             assert response.status_code == 500
 
+    @pytest.mark.asyncio
+    async def test_import_users_success(
+        self, client: AsyncClient, users_auth_headers: dict
+    ):
+        """Test successful users import from CSV"""
+        with patch("api.users.controller.import_users") as mock_import_users:
+            mock_import_users.return_value = UserImportResponse(
+                errors=[], total_rows=1, success_count=1, failed_count=0
+            )
+
+            response = await client.post(
+                "/api/users/import",
+                content=b"first_name,last_name,email,phone,password\nJohn,Doe,john@example.com,1,Password123!\n",
+                headers={
+                    "Authorization": users_auth_headers["Authorization"],
+                    "Content-Type": "text/csv",
+                },
+            )
+
+            assert response.status_code == 200
+            data = response.json()
+            assert data["message"] == "All users imported successfully"
+            assert data["data"]["success_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_import_users_partial_success(
+        self, client: AsyncClient, users_auth_headers: dict
+    ):
+        """Test users import with partial success"""
+        with patch("api.users.controller.import_users") as mock_import_users:
+            mock_import_users.return_value = UserImportResponse(
+                errors=[UserImportError(row=2, email="user2@example.com", message="Email already exists")],
+                total_rows=2,
+                success_count=1,
+                failed_count=1,
+            )
+
+            response = await client.post(
+                "/api/users/import?format=ndjson",
+                content=b"{}\n{}\n",
+                headers={"Authorization": users_auth_headers["Authorization"]},
+            )
+
+            assert response.status_code == 207
+            data = response.json()
+            assert data["code"] == 207
+            assert data["data"]["errors"][0]["row"] == 2
+
+    @pytest.mark.asyncio
+    async def test_import_users_unsupported_format(
+        self, client: AsyncClient, users_auth_headers: dict
+    ):
+        """Test users import with unsupported Content-Type"""
+        response = await client.post(
+            "/api/users/import",
+            json={"users": []},
+            headers={"Authorization": users_auth_headers["Authorization"]},
+        )
+
+        assert response.status_code == 415
+
+    @pytest.mark.asyncio
+    async def test_export_users_csv(
+        self, client: AsyncClient, users_auth_headers: dict
+    ):
+        """Test users export streams CSV with download headers"""
+        async def mock_export(*args, **kwargs):
+            yield "id,email\r\n"
+            yield "user1,user1@example.com\r\n"
+
+        with patch("api.users.controller.export_users", side_effect=mock_export) as mock_export_users:
+            response = await client.get(
+                "/api/users/export?role=admin",
+                headers={"Authorization": users_auth_headers["Authorization"]},
+            )
+
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/csv")
+            assert "users.csv" in response.headers["content-disposition"]
+            assert response.text == "id,email\r\nuser1,user1@example.com\r\n"
+            assert mock_export_users.call_args.kwargs["role"] == "admin"
+
+    @pytest.mark.asyncio
+    async def test_export_users_unauthorized(self, client: AsyncClient):
+        """Test users export without authentication token"""
+        response = await client.get("/api/users/export")
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_get_user_facets_success(
+        self, client: AsyncClient, users_auth_headers: dict
+    ):
+        """Test user facets retrieval"""
+        with patch("api.users.controller.get_user_facets") as mock_get_facets:
+            mock_get_facets.return_value = UserFacets(
+                status=[UserFacetCount(value="true", count=1)],
+                role=[UserFacetCount(value="admin", count=1)],
+            )
+
+            response = await client.get(
+                "/api/users/facets?keyword=john",
+                headers={"Authorization": users_auth_headers["Authorization"]},
+            )
+
+            assert response.status_code == 200
+            data = response.json()
+            assert data["data"]["role"] == [{"value": "admin", "count": 1}]
+            assert mock_get_facets.call_args.kwargs["keyword"] == "john"
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_users_success(
+        self, client: AsyncClient, users_auth_headers: dict
+    ):
+        """Test successful bulk users update"""
+        with patch("api.users.controller.bulk_update_users") as mock_bulk_update:
+            mock_bulk_update.return_value = UserUpdateBatchResponse(
+                results=[UserUpdateResult(user_id="user1", status="success", message="User updated successfully")],
+                total_users=1,
+                success_count=1,
+                failed_count=0,
+            )
+
+            response = await client.patch(
+                "/api/users",
+                json={"user_ids": ["user1"], "status": False},
+                headers={"Authorization": users_auth_headers["Authorization"]},
+            )
+
+            assert response.status_code == 200
+            data = response.json()
+            assert data["message"] == "All users updated successfully"
+            assert data["data"]["success_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_users_partial_success(
+        self, client: AsyncClient, users_auth_headers: dict
+    ):
+        """Test bulk users update with partial success"""
+        with patch("api.users.controller.bulk_update_users") as mock_bulk_update:
+            mock_bulk_update.return_value = UserUpdateBatchResponse(
+                results=[
+                    UserUpdateResult(user_id="user1", status="success", message="User updated successfully"),
+                    UserUpdateResult(user_id="user2", status="failed", message="User not found"),
+                ],
+                total_users=2,
+                success_count=1,
+                failed_count=1,
+            )
+
+            response = await client.patch(
+                "/api/users",
+                json={"user_ids": ["user1", "user2"], "role": "admin"},
+                headers={"Authorization": users_auth_headers["Authorization"]},
+            )
+
+            assert response.status_code == 207
+            assert response.json()["code"] == 207
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_users_empty_patch(
+        self, client: AsyncClient, users_auth_headers: dict
+    ):
+        """Test bulk users update without fields to change"""
+        response = await client.patch(
+            "/api/users",
+            json={"user_ids": ["user1"]},
+            headers={"Authorization": users_auth_headers["Authorization"]},
+        )
+
+        assert response.status_code == 400
+
 
 class TestUsersControllerValidation:
     """Test Users controller input validation"""
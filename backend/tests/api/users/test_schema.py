@@ -11,6 +11,15 @@ from api.users.schema import (
     PasswordReset,
     UserDeleteResult,
     UserDeleteBatchResponse,
+    UserImportFormat,
+    UserExportFormat,
+    UserFacets,
+    UserFacetCount,
+    UserBulkUpdate,
+    UserUpdateResult,
+    UserUpdateBatchResponse,
+    UserImportError,
+    UserImportResponse,
 )
 
 
@@ -776,4 +785,120 @@ class TestBatchDeleteIntegration:
             success_count=0,
             failed_count=2
         )
-        assert all_failed.success_count == 0  # Should return 400
\ No newline at end of file
+        assert all_failed.success_count == 0  # Should return 400
+
+
+class TestUserImportResponse:
+    """Test user import schema validation"""
+
+    def test_user_import_format_values(self):
+        """Test UserImportFormat enum values"""
+        assert UserImportFormat.CSV.value == "csv"
+        assert UserImportFormat.NDJSON.value == "ndjson"
+        assert UserImportFormat("csv") == UserImportFormat.CSV
+
+    def test_user_export_format_values(self):
+        """Test UserExportFormat enum values"""
+        assert UserExportFormat.CSV.value == "csv"
+        assert UserExportFormat.NDJSON.value == "ndjson"
+        with pytest.raises(ValueError):
+            UserExportFormat("xlsx")
+
+    def test_user_import_error_without_email(self):
+        """Test UserImportError for rows that could not be parsed"""
+        error = UserImportError(row=3, message="Invalid JSON")
+
+        assert error.row == 3
+        assert error.email is None
+        assert error.message == "Invalid JSON"
+
+    def test_user_import_response_partial_success(self):
+        """Test UserImportResponse with failed rows"""
+        import_response = UserImportResponse(
+            errors=[
+                UserImportError(row=2, email="user2@example.com", message="Email already exists")
+            ],
+            total_rows=2,
+            success_count=1,
+            failed_count=1
+        )
+
+        assert import_response.total_rows == 2
+        assert import_response.success_count == 1
+        assert import_response.failed_count == 1
+        assert import_response.errors_truncated is False
+        assert import_response.errors[0].email == "user2@example.com"
+
+    def test_user_import_response_missing_fields(self):
+        """Test UserImportResponse with missing required fields"""
+        with pytest.raises(ValidationError):
+            UserImportResponse(errors=[], total_rows=1)
+
+
+class TestUserFacets:
+    """Test UserFacets schema validation"""
+
+    def test_user_facets_valid_data(self):
+        """Test UserFacets with status and role counts"""
+        facets = UserFacets(
+            status=[UserFacetCount(value="true", count=3), UserFacetCount(value="false", count=1)],
+            role=[UserFacetCount(value="admin", count=2), UserFacetCount(value=None, count=2)]
+        )
+
+        assert facets.status[0].value == "true"
+        assert facets.role[1].value is None
+        assert facets.role[1].count == 2
+
+    def test_user_facets_json_round_trip(self):
+        """Test UserFacets survives the JSON cache round trip"""
+        facets = UserFacets(status=[UserFacetCount(value="true", count=1)], role=[])
+
+        assert UserFacets.model_validate_json(facets.model_dump_json()) == facets
+
+    def test_user_facet_count_missing_count(self):
+        """Test UserFacetCount requires count"""
+        with pytest.raises(ValidationError):
+            UserFacetCount(value="admin")
+
+
+class TestUserBulkUpdate:
+    """Test bulk user update schema validation"""
+
+    def test_user_bulk_update_role_unset_vs_null(self):
+        """Test explicit null role is kept apart from an omitted role"""
+        status_only = UserBulkUpdate(user_ids=["user1"], status=False)
+        remove_role = UserBulkUpdate(user_ids=["user1"], role=None)
+
+        assert "role" not in status_only.model_dump(exclude_unset=True)
+        assert remove_role.model_dump(exclude_unset=True) == {"user_ids": ["user1"], "role": None}
+
+    def test_user_bulk_update_null_status(self):
+        """Test an explicit null status is rejected while an omitted status is allowed"""
+        with pytest.raises(ValidationError):
+            UserBulkUpdate(user_ids=["user1"], status=None)
+        assert "status" not in UserBulkUpdate(user_ids=["user1"], role="user").model_dump(exclude_unset=True)
+
+    def test_user_bulk_update_empty_ids(self):
+        """Test UserBulkUpdate requires at least one user ID"""
+        with pytest.raises(ValidationError):
+            UserBulkUpdate(user_ids=[], status=True)
+
+    def test_user_update_result_invalid_status(self):
+        """Test UserUpdateResult rejects unknown status values"""
+        with pytest.raises(ValidationError):
+            UserUpdateResult(user_id="user1", status="skipped", message="Skipped")
+
+    def test_user_update_batch_response(self):
+        """Test UserUpdateBatchResponse with partial success"""
+        batch_response = UserUpdateBatchResponse(
+            results=[
+                UserUpdateResult(user_id="user1", status="success", message="User updated successfully"),
+                UserUpdateResult(user_id="user2", status="failed", message="User not found")
+            ],
+            total_users=2,
+            success_count=1,
+            failed_count=1
+        )
+
+        assert batch_response.total_users == 2
+        assert batch_response.results[1].message == "User not found"
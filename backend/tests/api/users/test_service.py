@@ -1,12 +1,16 @@
+import json
 import pytest
-from unittest.mock import AsyncMock, patch
-from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from datetime import datetime, timedelta
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from models.users import Users
 from models.roles import Roles
 from models.role_mapper import RoleMapper
-from utils.custom_exception import ConflictException, NotFoundException
+from models.user_sessions import UserSessions
+from core.config import settings
+from utils.custom_exception import ConflictException, NotFoundException, ValidationException, PayloadTooLargeException
 from api.users.services import (
     get_all_users,
     create_user,
@@ -15,12 +19,27 @@ from api.users.services import (
     reset_user_password,
     _assign_user_role,
     _update_user_role,
+    import_users,
+    _iter_import_rows,
+    _import_user_batch,
+    get_import_format,
+    export_users,
+    get_user_facets,
+    invalidate_user_facets,
+    bulk_update_users,
+    USER_FACETS_VERSION_KEY,
 )
 from api.users.schema import (
+    UserImportFormat,
+    UserExportFormat,
     UserCreate,
     UserUpdate,
     UserResponse,
     UserPagination,
+    UserFieldsPagination,
+    UserFacets,
+    UserFacetCount,
+    UserBulkUpdate,
     UserDeleteBatchResponse
 )
 
@@ -278,6 +297,69 @@ class TestGetAllUsers:
         assert result.users[0].email == "a@example.com"
         assert result.users[1].email == "b@example.com"
 
+    @pytest.mark.asyncio
+    async def test_get_all_users_with_fields(self, test_db_session: AsyncSession):
+        """Test users retrieval selecting only the requested fields"""
+        role = Roles(id="role1", name="admin", description="Admin role")
+        user = Users(
+            id="user1",
+            email="user1@example.com",
+            first_name="User",
+            last_name="One",
+            phone="+1234567890",
+            hash_password="hashed_password",
+            status=True,
+            created_at=datetime.now()
+        )
+        test_db_session.add_all([role, user])
+        await test_db_session.commit()
+        test_db_session.add(RoleMapper(user_id="user1", role_id="role1"))
+        await test_db_session.commit()
+
+        result = await get_all_users(
+            db=test_db_session,
+            page=1,
+            per_page=10,
+            fields=["id", "email", "role"]
+        )
+
+        assert isinstance(result, UserFieldsPagination)
+        assert result.total == 1
+        assert result.users == [{"id": "user1", "email": "user1@example.com", "role": "admin"}]
+
+    @pytest.mark.asyncio
+    async def test_get_all_users_with_fields_query_count(self, test_db_session: AsyncSession, assert_max_queries):
+        """Test sparse fieldset retrieval runs a fixed number of queries regardless of page size"""
+        role = Roles(id="role1", name="admin", description="Admin role")
+        users = [
+            Users(
+                id=f"user{i}",
+                email=f"user{i}@example.com",
+                first_name="User",
+                last_name=str(i),
+                hash_password="hashed_password",
+                status=True,
+                created_at=datetime.now()
+            )
+            for i in range(5)
+        ]
+        test_db_session.add_all([role, *users])
+        await test_db_session.commit()
+        test_db_session.add_all([RoleMapper(user_id=user.id, role_id="role1") for user in users])
+        await test_db_session.commit()
+
+        # One count query and one page query; the role is a correlated subquery
+        with assert_max_queries(2):
+            result = await get_all_users(
+                db=test_db_session,
+                page=1,
+                per_page=10,
+                fields=["id", "email", "role"]
+            )
+
+        assert result.total == 5
+        assert all(user["role"] == "admin" for user in result.users)
+
 
 class TestCreateUser:
     """Test create_user service function"""
@@ -434,6 +516,28 @@ class TestUpdateUser:
         
         assert "Email already exists" in str(exc_info.value)
 
+    @pytest.mark.asyncio
+    async def test_update_user_with_fields(self, test_db_session: AsyncSession):
+        """Test user update returning only the requested fields"""
+        user = Users(
+            id="user1",
+            email="user@example.com",
+            first_name="Original",
+            last_name="Name",
+            phone="+1234567890",
+            hash_password="hashed_password",
+            status=True,
+            created_at=datetime.now()
+        )
+        test_db_session.add(user)
+        await test_db_session.commit()
+
+        result = await update_user(
+            test_db_session, "user1", UserUpdate(status=False), fields=["id", "status"]
+        )
+
+        assert result == {"id": "user1", "status": False}
+
 
 class TestDeleteUsers:
     """Test delete_users service function"""
@@ -772,4 +876,391 @@ class TestRoleManagement:
             text("SELECT * FROM role_mapper WHERE user_id = 'user1'")
         )
         mapping = result.fetchone()
-        assert mapping is None
\ No newline at end of file
+        assert mapping is None
+
+
+async def _stream(*chunks: bytes):
+    """Yield raw body chunks like request.stream()"""
+    for chunk in chunks:
+        yield chunk
+
+
+class TestImportUsers:
+    """Test import_users service function"""
+
+    def test_get_import_format(self):
+        """Test import format detection from Content-Type"""
+        assert get_import_format("text/csv; charset=utf-8") == UserImportFormat.CSV
+        assert get_import_format("application/x-ndjson") == UserImportFormat.NDJSON
+        assert get_import_format("application/json") is None
+        assert get_import_format(None) is None
+
+    @pytest.mark.asyncio
+    async def test_import_users_csv_success(self, test_db_session: AsyncSession):
+        """Test CSV import split across chunk boundaries"""
+        role = Roles(id="role1", name="user", description="User role")
+        test_db_session.add(role)
+        await test_db_session.commit()
+
+        body = (
+            b"first_name,last_name,email,phone,password,status,role\n"
+            b"John,Doe,john@example.com,+1234567890,Password123!,true,user\n"
+            b"Jane,Doe,jane@exa"
+        )
+        result = await import_users(
+            test_db_session,
+            _stream(body, b"mple.com,+1234567891,Password123!,,\n"),
+            UserImportFormat.CSV
+        )
+
+        assert result.total_rows == 2
+        assert result.success_count == 2
+        assert result.failed_count == 0
+
+        users = (await test_db_session.execute(text("SELECT email, status FROM users ORDER BY email"))).all()
+        assert [u.email for u in users] == ["jane@example.com", "john@example.com"]
+        mappings = (await test_db_session.execute(text("SELECT COUNT(*) FROM role_mapper"))).scalar()
+        assert mappings == 1
+
+    @pytest.mark.asyncio
+    async def test_import_users_ndjson_row_errors(self, test_db_session: AsyncSession):
+        """Test NDJSON import reports per-row errors"""
+        existing_user = Users(
+            id="existing-user",
+            email="existing@example.com",
+            first_name="Existing",
+            last_name="User",
+            phone="+1234567890",
+            hash_password="hashed_password",
+            status=True,
+            created_at=datetime.now()
+        )
+        test_db_session.add(existing_user)
+        await test_db_session.commit()
+
+        body = b"\n".join([
+            b'{"first_name": "A", "last_name": "B", "email": "new@example.com", "phone": "1", "password": "Password123!"}',
+            b'{"first_name": "A", "last_name": "B", "email": "existing@example.com", "phone": "1", "password": "Password123!"}',
+            b'{"first_name": "A", "last_name": "B", "email": "new@example.com", "phone": "1", "password": "Password123!"}',
+            b'{"first_name": "A", "last_name": "B", "email": "role@example.com", "phone": "1", "password": "Password123!", "role": "missing"}',
+            b'{"first_name": "A"}',
+            b'not json',
+        ])
+        result = await import_users(test_db_session, _stream(body), UserImportFormat.NDJSON)
+
+        assert result.total_rows == 6
+        assert result.success_count == 1
+        assert result.failed_count == 5
+        messages = {error.row: error.message for error in result.errors}
+        assert messages[2] == "Email already exists"
+        assert messages[3] == "Duplicate email in import file"
+        assert messages[4] == "Role 'missing' not found"
+        assert messages[6] == "Invalid JSON"
+
+    @pytest.mark.asyncio
+    async def test_import_user_batch_concurrent_constraint_errors(self):
+        """Test rows retried one by one after a conflicting concurrent write report the constraint they broke"""
+        def integrity_error(code):
+            return IntegrityError("INSERT", {}, Exception(code, "constraint failed"))
+
+        no_existing_emails = MagicMock()
+        no_existing_emails.scalars.return_value.all.return_value = []
+        db = AsyncMock()
+        db.execute.side_effect = [
+            no_existing_emails,
+            integrity_error(1062),
+            # Row by row: taken email, deleted role, other constraint, success
+            integrity_error(1062),
+            None, integrity_error(1452),
+            integrity_error(1048),
+            None, None,
+        ]
+        rows = [
+            (row_number, {"first_name": "A", "last_name": "B", "email": f"user{row_number}@example.com",
+                          "phone": "1", "password": "Password123!", "role": "user"}, None)
+            for row_number in range(1, 5)
+        ]
+
+        with patch("api.users.services.hash_passwords", AsyncMock(return_value=["hashed"] * 4)):
+            errors = await _import_user_batch(db, rows, {"user": "role1"})
+
+        assert [(error.row, error.message) for error in errors] == [
+            (1, "Email already exists"),
+            (2, "Role 'user' not found"),
+            (3, "Rejected by a database constraint"),
+        ]
+        assert db.commit.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_iter_import_rows_csv_quoted_newlines(self):
+        """Test quoted CSV fields may contain newlines, even across chunk boundaries"""
+        body = (
+            b'first_name,last_name,email\n'
+            b'"John\nJr.",Doe,john@example.com\n'
+            b'"Jane ""J""\n\nSmith",D'
+        )
+        rows = [row async for row in _iter_import_rows(_stream(body, b'oe,jane@example.com\n'), UserImportFormat.CSV)]
+
+        assert rows == [
+            (1, {"first_name": "John\nJr.", "last_name": "Doe", "email": "john@example.com"}, None),
+            (2, {"first_name": 'Jane "J"\n\nSmith', "last_name": "Doe", "email": "jane@example.com"}, None),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_iter_import_rows_csv_unterminated_quote(self):
+        """Test an unterminated quoted field is reported instead of silently dropped"""
+        body = b'first_name,last_name\nJohn,Doe\n"Jane,Doe\n'
+        rows = [row async for row in _iter_import_rows(_stream(body), UserImportFormat.CSV)]
+
+        assert rows[0] == (1, {"first_name": "John", "last_name": "Doe"}, None)
+        assert rows[1] == (2, None, "Unterminated quoted field")
+
+    @pytest.mark.asyncio
+    async def test_import_users_body_too_large(self):
+        """Test bodies over USER_IMPORT_MAX_BYTES are rejected"""
+        db = AsyncMock()
+        with patch.object(settings, "USER_IMPORT_MAX_BYTES", 16):
+            with pytest.raises(PayloadTooLargeException):
+                await import_users(db, _stream(b"first_name,email\n", b"John,john@example.com\n"), UserImportFormat.CSV)
+
+    @pytest.mark.asyncio
+    async def test_import_users_too_many_rows(self):
+        """Test imports over USER_IMPORT_MAX_ROWS are rejected"""
+        db = AsyncMock()
+        body = b"\n".join([b'{"first_name": "A"}'] * 3)
+        with patch.object(settings, "USER_IMPORT_MAX_ROWS", 2):
+            with pytest.raises(PayloadTooLargeException):
+                await import_users(db, _stream(body), UserImportFormat.NDJSON)
+
+
+class TestExportUsers:
+    """Test export_users service function"""
+
+    async def _create_users(self, test_db_session: AsyncSession):
+        role = Roles(id="role1", name="admin", description="Admin role")
+        user1 = Users(
+            id="user1",
+            email="john@example.com",
+            first_name="John",
+            last_name="Doe",
+            phone="+1234567890",
+            hash_password="hashed_password",
+            status=True,
+            created_at=datetime.now()
+        )
+        user2 = Users(
+            id="user2",
+            email="jane@example.com",
+            first_name="Jane",
+            last_name="Smith",
+            phone="+1234567891",
+            hash_password="hashed_password",
+            status=False,
+            created_at=datetime.now()
+        )
+        test_db_session.add_all([role, user1, user2])
+        await test_db_session.commit()
+        test_db_session.add(RoleMapper(user_id="user1", role_id="role1"))
+        await test_db_session.commit()
+
+    @pytest.mark.asyncio
+    async def test_export_users_csv(self, test_db_session: AsyncSession):
+        """Test CSV export includes header, roles and status"""
+        await self._create_users(test_db_session)
+
+        chunks = [chunk async for chunk in export_users(test_db_session, UserExportFormat.CSV)]
+        lines = "".join(chunks).strip().split("\r\n")
+
+        assert lines[0] == "id,email,first_name,last_name,phone,status,created_at,role"
+        assert len(lines) == 3
+        assert lines[1].startswith("user1,john@example.com,John,Doe,+1234567890,true,")
+        assert lines[1].endswith(",admin")
+        assert lines[2].endswith(",")
+
+    @pytest.mark.asyncio
+    async def test_export_users_ndjson_with_filters(self, test_db_session: AsyncSession):
+        """Test NDJSON export reuses the users list filters"""
+        await self._create_users(test_db_session)
+
+        chunks = [
+            chunk async for chunk in export_users(
+                test_db_session, UserExportFormat.NDJSON, keyword="jane", status="false"
+            )
+        ]
+        records = [json.loads(line) for line in "".join(chunks).splitlines()]
+
+        assert len(records) == 1
+        assert records[0]["id"] == "user2"
+        assert records[0]["status"] is False
+        assert records[0]["role"] is None
+
+
+class TestUserFacets:
+    """Test get_user_facets service function"""
+
+    @pytest.mark.asyncio
+    async def test_get_user_facets_counts(self, test_db_session: AsyncSession):
+        """Test facet counts per status and role from one query"""
+        role = Roles(id="role1", name="admin", description="Admin role")
+        users = [
+            Users(
+                id=f"user{i}",
+                email=f"user{i}@example.com",
+                first_name="User",
+                last_name=str(i),
+                phone="+1234567890",
+                hash_password="hashed_password",
+                status=i != 3,
+                created_at=datetime.now()
+            )
+            for i in range(1, 4)
+        ]
+        test_db_session.add_all([role, *users])
+        await test_db_session.commit()
+        test_db_session.add(RoleMapper(user_id="user1", role_id="role1"))
+        await test_db_session.commit()
+
+        mock_redis = AsyncMock()
+        mock_redis.get.return_value = None
+
+        result = await get_user_facets(test_db_session, mock_redis)
+
+        assert result.status == [UserFacetCount(value="true", count=2), UserFacetCount(value="false", count=1)]
+        assert result.role == [UserFacetCount(value="admin", count=1), UserFacetCount(value=None, count=2)]
+        mock_redis.set.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_get_user_facets_cache_hit(self, test_db_session: AsyncSession):
+        """Test cached facets are returned without querying the database"""
+        cached = UserFacets(status=[UserFacetCount(value="true", count=5)], role=[])
+        mock_redis = AsyncMock()
+        mock_redis.get.side_effect = ["3", cached.model_dump_json()]
+
+        with patch.object(test_db_session, "execute") as mock_execute:
+            result = await get_user_facets(test_db_session, mock_redis, keyword="john")
+
+        assert result == cached
+        mock_execute.assert_not_called()
+        assert mock_redis.get.call_args.args[0].startswith("cache:users:facets:3:")
+
+    @pytest.mark.asyncio
+    async def test_invalidate_user_facets(self):
+        """Test invalidation bumps the facets cache version"""
+        mock_redis = AsyncMock()
+
+        await invalidate_user_facets(mock_redis)
+
+        mock_redis.incr.assert_called_once_with(USER_FACETS_VERSION_KEY)
+
+
+class TestBulkUpdateUsers:
+    """Test bulk_update_users service function"""
+
+    async def _create_users(self, test_db_session: AsyncSession):
+        role = Roles(id="role1", name="user", description="User role")
+        users = [
+            Users(
+                id=f"user{i}",
+                email=f"user{i}@example.com",
+                first_name="User",
+                last_name=str(i),
+                phone="+1234567890",
+                hash_password="hashed_password",
+                status=True,
+                created_at=datetime.now()
+            )
+            for i in range(1, 3)
+        ]
+        test_db_session.add_all([role, *users])
+        await test_db_session.commit()
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_users_disable_and_assign_role(self, test_db_session: AsyncSession):
+        """Test status and role are applied to all users and sessions are revoked"""
+        await self._create_users(test_db_session)
+        test_db_session.add(UserSessions(
+            id="session1",
+            user_id="user1",
+            jwt_access_token="token",
+            ip_address="127.0.0.1",
+            user_agent="TestAgent/1.0",
+            is_active=True,
+            expires_at=datetime.now() + timedelta(days=1)
+        ))
+        await test_db_session.commit()
+        mock_redis = AsyncMock()
+
+        result = await bulk_update_users(
+            test_db_session,
+            mock_redis,
+            UserBulkUpdate(user_ids=["user1", "user2", "missing"], status=False, role="user")
+        )
+
+        assert result.total_users == 3
+        assert result.success_count == 2
+        assert result.failed_count == 1
+        assert result.results[2].message == "User not found"
+
+        rows = (await test_db_session.execute(text("SELECT status FROM users"))).scalars().all()
+        assert rows == [0, 0]
+        mappings = (await test_db_session.execute(text("SELECT COUNT(*) FROM role_mapper WHERE role_id = 'role1'"))).scalar()
+        assert mappings == 2
+        mock_redis.delete.assert_called_once_with("session:session1")
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_users_redis_failure_after_commit(self, test_db_session: AsyncSession):
+        """Test a failed session DEL after the commit still reports the update as successful"""
+        await self._create_users(test_db_session)
+        test_db_session.add(UserSessions(
+            id="session1",
+            user_id="user1",
+            jwt_access_token="token",
+            ip_address="127.0.0.1",
+            user_agent="TestAgent/1.0",
+            is_active=True,
+            expires_at=datetime.now() + timedelta(days=1)
+        ))
+        await test_db_session.commit()
+        mock_redis = AsyncMock()
+        mock_redis.delete.side_effect = ConnectionError("Redis down")
+
+        result = await bulk_update_users(
+            test_db_session, mock_redis, UserBulkUpdate(user_ids=["user1"], status=False)
+        )
+
+        assert result.success_count == 1
+        rows = (await test_db_session.execute(text("SELECT status FROM users WHERE id = 'user1'"))).scalars().all()
+        assert rows == [0]
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_users_cannot_disable_self(self, test_db_session: AsyncSession):
+        """Test the current user is not disabled by a bulk update"""
+        await self._create_users(test_db_session)
+
+        result = await bulk_update_users(
+            test_db_session,
+            AsyncMock(),
+            UserBulkUpdate(user_ids=["user1", "user2"], status=False),
+            token={"sub": "user1"}
+        )
+
+        assert result.success_count == 1
+        assert result.results[0].message == "Cannot disable your own account"
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_users_unknown_role(self, test_db_session: AsyncSession):
+        """Test an unknown role fails every user"""
+        await self._create_users(test_db_session)
+
+        result = await bulk_update_users(
+            test_db_session, AsyncMock(), UserBulkUpdate(user_ids=["user1", "user2"], role="missing")
+        )
+
+        assert result.success_count == 0
+        assert all(r.message == "Role 'missing' not found" for r in result.results)
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_users_empty_patch(self, test_db_session: AsyncSession):
+        """Test a patch without fields is rejected"""
+        with pytest.raises(ValidationException):
+            await bulk_update_users(test_db_session, AsyncMock(), UserBulkUpdate(user_ids=["user1"]))
@@ -3,6 +3,7 @@ import asyncio
 import pytest_asyncio
 import fastapi_limiter
 from uuid_utils import uuid7
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, patch
 from httpx import AsyncClient, ASGITransport
@@ -10,7 +11,8 @@ from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 from core.config import settings
-from core.database import Base, make_async_url
+from core.database import Base, make_async_url, instrument_engine
+from core.query_counter import start_query_counting, stop_query_counting, get_query_stats
 from core.dependencies import get_db
 from core.redis import get_redis
 from core.security import create_access_token, hash_password
@@ -60,6 +62,8 @@ async def test_engine():
             "autocommit": False,
         },
     )
+    # Let assert_max_queries count statements on the test database
+    instrument_engine(engine)
 
     # Create all tables for testing
     async with engine.begin() as conn:
@@ -169,6 +173,32 @@ def mock_rate_limiter():
         yield
 
 
+@pytest.fixture
+def assert_max_queries():
+    """
+    Fail the test if the enclosed block executes more than `max_queries` statements.
+    Works around service calls and around requests made through `client`.
+
+        with assert_max_queries(2):
+            response = await client.get("/api/users", headers=headers)
+    """
+
+    @contextmanager
+    def _assert_max_queries(max_queries: int):
+        token = start_query_counting()
+        stats = get_query_stats()
+        try:
+            yield stats
+        finally:
+            stop_query_counting(token)
+        statements = "\n".join(f"  {count}x {sql}" for sql, count in stats.statements.items())
+        assert stats.count <= max_queries, (
+            f"Expected at most {max_queries} queries, executed {stats.count}:\n{statements}"
+        )
+
+    return _assert_max_queries
+
+
 @pytest_asyncio.fixture
 async def db_transaction(test_db_session):
     """
@@ -0,0 +1,65 @@
+import sys
+import json
+import logging
+from core.log_formatter import JsonFormatter, TextFormatter
+from core.log_queue import prepare_record
+
+
+def make_record(msg="user %s created", args=("user1",), exc_info=None, **extra):
+    record = logging.LogRecord("api.users", logging.INFO, __file__, 1, msg, args, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestTextFormatter:
+    """Test text log lines"""
+
+    def test_appends_request_id(self):
+        """Test records logged during a request end with its id"""
+        line = TextFormatter("%(levelname)s %(message)s").format(make_record(request_id="req-1"))
+        assert line == "INFO user user1 created request_id=req-1"
+
+    def test_without_request_id(self):
+        """Test records logged outside a request are unchanged"""
+        assert TextFormatter("%(message)s").format(make_record()) == "user user1 created"
+
+    def test_access_line_keeps_single_request_id(self):
+        """Test access lines that already carry the id do not repeat it"""
+        record = make_record("GET /api/users 200 request_id=req-1", (), request_id="req-1")
+        assert TextFormatter("%(message)s").format(record) == "GET /api/users 200 request_id=req-1"
+
+
+class TestJsonFormatter:
+    """Test JSON log lines"""
+
+    def test_fields(self):
+        """Test the message, level, logger and known extra fields are emitted"""
+        record = make_record(request_id="req-1", status=201, duration_ms=12.5, unknown="ignored")
+        payload = json.loads(JsonFormatter().format(record))
+
+        assert payload["message"] == "user user1 created"
+        assert payload["level"] == "INFO"
+        assert payload["logger"] == "api.users"
+        assert payload["request_id"] == "req-1"
+        assert payload["status"] == 201
+        assert payload["duration_ms"] == 12.5
+        assert "unknown" not in payload
+        assert "timestamp" in payload
+
+    def test_exception(self):
+        """Test tracebacks are emitted both from exc_info and from records prepared for the queue"""
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = make_record(exc_info=sys.exc_info())
+
+        direct = json.loads(JsonFormatter().format(record))
+        queued = json.loads(JsonFormatter().format(prepare_record(record)))
+        assert "ValueError: boom" in direct["exception"]
+        assert queued["exception"] == direct["exception"]
+
+    def test_non_serializable_values(self):
+        """Test values JSON cannot encode are written as strings, one line per record"""
+        line = JsonFormatter().format(make_record(stats={"started": object}))
+        assert "\n" not in line
+        assert json.loads(line)["stats"] == {"started": str(object)}
@@ -0,0 +1,104 @@
+import sys
+import queue
+import logging
+import pytest
+from core.log_queue import DispatchingQueueListener, DroppingQueueHandler, prepare_record
+from core.request_context import bind_request_id, reset_request_id
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_record(msg="hello %s", args=("world",), level=logging.INFO, exc_info=None):
+    return logging.LogRecord("test", level, __file__, 1, msg, args, exc_info)
+
+
+@pytest.fixture(autouse=True)
+def reset_dropped(monkeypatch):
+    monkeypatch.setattr(DroppingQueueHandler, "dropped", 0)
+
+
+class TestPrepareRecord:
+    """Test records are made safe to hand to another thread or process"""
+
+    def test_merges_arguments(self):
+        """Test the message is rendered and the original record is left untouched"""
+        record = make_record()
+        prepared = prepare_record(record)
+        assert (prepared.msg, prepared.args) == ("hello world", None)
+        assert record.args == ("world",)
+
+    def test_renders_traceback(self):
+        """Test exc_info is rendered into exc_text, since tracebacks do not pickle"""
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = make_record(exc_info=sys.exc_info())
+        prepared = prepare_record(record)
+        assert prepared.exc_info is None
+        assert "ValueError: boom" in prepared.exc_text
+
+
+class TestDroppingQueueHandler:
+    """Test logging never blocks on a full queue"""
+
+    def test_full_queue_drops_and_counts(self):
+        """Test records beyond the queue size are dropped and counted"""
+        log_queue = queue.Queue(maxsize=1)
+        handler = DroppingQueueHandler(log_queue, ())
+        for _ in range(3):
+            handler.handle(make_record())
+        assert log_queue.qsize() == 1
+        assert DroppingQueueHandler.dropped == 2
+
+    def test_captures_request_id(self):
+        """Test the request id is taken in the logging thread, where the context is bound"""
+        log_queue = queue.Queue()
+        handler = DroppingQueueHandler(log_queue, ())
+        token = bind_request_id("req-1")
+        try:
+            handler.handle(make_record())
+        finally:
+            reset_request_id(token)
+        record, _ = log_queue.get_nowait()
+        assert record.request_id == "req-1"
+
+
+class TestDispatchingQueueListener:
+    """Test the background listener"""
+
+    def test_dispatches_to_target_handlers(self):
+        """Test each record reaches only the handlers it was queued for, respecting their levels"""
+        log_queue = queue.Queue()
+        info_handler, warning_handler, other_handler = CollectingHandler(), CollectingHandler(logging.WARNING), CollectingHandler()
+        handler = DroppingQueueHandler(log_queue, (info_handler, warning_handler))
+        listener = DispatchingQueueListener(log_queue)
+        listener.start()
+        handler.handle(make_record())
+        handler.handle(make_record("careful", (), logging.WARNING))
+        listener.stop()
+
+        assert [r.getMessage() for r in info_handler.records] == ["hello world", "careful"]
+        assert [r.getMessage() for r in warning_handler.records] == ["careful"]
+        assert other_handler.records == []
+
+    def test_reports_dropped_records(self):
+        """Test dropped records are reported once with the next record"""
+        log_queue = queue.Queue(maxsize=1)
+        target = CollectingHandler()
+        handler = DroppingQueueHandler(log_queue, (target,))
+        for _ in range(3):
+            handler.handle(make_record())
+        listener = DispatchingQueueListener(log_queue)
+        listener.start()
+        listener.stop()
+
+        messages = [r.getMessage() for r in target.records]
+        assert messages == ["Log queue full, dropped 2 log records (2 total)", "hello world"]
+        assert listener.reported_dropped == 2
@@ -0,0 +1,155 @@
+import os
+import json
+import queue
+import logging
+import threading
+import subprocess
+import pytest
+from core.log_queue import DroppingQueueHandler
+from core.log_writer import ProcessQueueHandler, get_writer_queue, make_writer_handler, start_log_writer, stop_log_writer
+
+LOGGING_CONFIG = """
+version: 1
+formatters:
+  default:
+    format: "[%(levelname)s] %(name)s: %(message)s"
+handlers:
+  file:
+    class: logging.handlers.TimedRotatingFileHandler
+    formatter: default
+    filename: {filename}
+    when: midnight
+    encoding: utf-8
+"""
+
+
+def make_record(name, msg, *args):
+    return logging.LogRecord(name, logging.INFO, __file__, 1, msg, args, None)
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen(["true"])
+    process.wait()
+    return process.pid
+
+
+def file_handler_config(log_file):
+    return {"filename": str(log_file), "encoding": "utf-8"}
+
+
+@pytest.fixture
+def writer_config(tmp_path):
+    log_file = tmp_path / "logs" / "app.log"
+    config = tmp_path / "logging_config.yaml"
+    config.write_text(LOGGING_CONFIG.format(filename=log_file))
+    yield str(config), log_file
+    stop_log_writer()
+
+
+class TestLogWriter:
+    """Test the shared writer process"""
+
+    def test_writes_records_from_queue(self, writer_config):
+        """Test records sent by workers are formatted and written by the writer process"""
+        config, log_file = writer_config
+        start_log_writer(config, maxsize=100, batch_size=2)
+        handler = make_writer_handler(file_handler_config(log_file), "[%(levelname)s] %(name)s: %(message)s", False, 1.0)
+        for i in range(5):
+            handler.handle(make_record(f"worker{i}", "request %d done", i))
+        stop_log_writer()
+
+        assert get_writer_queue() is None
+        assert log_file.read_text(encoding="utf-8").splitlines() == [
+            f"[INFO] worker{i}: request {i} done" for i in range(5)
+        ]
+
+    def test_json_logs(self, writer_config):
+        """Test the writer uses the JSON formatter and keeps extra fields"""
+        config, log_file = writer_config
+        start_log_writer(config, maxsize=100, batch_size=10, json_logs=True)
+        record = make_record("access", "GET /api/users 200")
+        record.request_id = "req-1"
+        make_writer_handler(file_handler_config(log_file), None, True, 1.0).handle(record)
+        stop_log_writer()
+
+        line = json.loads(log_file.read_text(encoding="utf-8"))
+        assert line["message"] == "GET /api/users 200"
+        assert line["request_id"] == "req-1"
+
+    def test_stop_without_writer(self):
+        """Test stopping is a no-op when no writer runs"""
+        stop_log_writer()
+        assert get_writer_queue() is None
+
+    def test_no_writer_handler_outside_gunicorn(self, tmp_path):
+        """Test workers keep their own file handler when no writer was started"""
+        assert make_writer_handler(file_handler_config(tmp_path / "app.log"), None, False, 1.0) is None
+
+
+class TestProcessQueueHandler:
+    """Test workers push back on a busy writer and survive a dead one"""
+
+    @pytest.fixture(autouse=True)
+    def reset_dropped(self, monkeypatch):
+        monkeypatch.setattr(DroppingQueueHandler, "dropped", 0)
+
+    def test_full_queue_waits_for_writer(self):
+        """Test a full queue blocks the log thread until the writer catches up, losing nothing"""
+        writer_queue = queue.Queue(maxsize=1)
+        fallback = CollectingHandler()
+        handler = ProcessQueueHandler(writer_queue, os.getpid(), fallback, put_timeout=5)
+        written = []
+
+        def slow_writer():
+            for _ in range(3):
+                written.append(writer_queue.get(timeout=5).msg)
+
+        writer = threading.Thread(target=slow_writer)
+        writer.start()
+        for i in range(3):
+            handler.handle(make_record("worker", "record %d", i))
+        writer.join()
+
+        assert written == ["record 0", "record 1", "record 2"]
+        assert DroppingQueueHandler.dropped == 0
+        assert fallback.records == []
+
+    def test_stuck_writer_drops_after_timeout(self):
+        """Test records are dropped and counted only after waiting out the timeout"""
+        fallback = CollectingHandler()
+        handler = ProcessQueueHandler(queue.Queue(maxsize=1), os.getpid(), fallback, put_timeout=0.01)
+        for i in range(3):
+            handler.handle(make_record("worker", "record %d", i))
+        assert DroppingQueueHandler.dropped == 2
+        assert handler.queue.get_nowait().msg == "record 0"
+        assert fallback.records == []
+
+    def test_dead_writer_falls_back_to_local_handler(self):
+        """Test records go to the fallback handler once the writer process is gone"""
+        fallback = CollectingHandler()
+        handler = ProcessQueueHandler(queue.Queue(maxsize=1), dead_pid(), fallback, put_timeout=0.01)
+        for i in range(3):
+            handler.handle(make_record("worker", "record %d", i))
+
+        messages = [record.getMessage() for record in fallback.records]
+        assert "is gone" in messages[0]
+        assert messages[1:] == ["record 1", "record 2"]
+        assert handler.writer_alive is False
+        assert DroppingQueueHandler.dropped == 0
+
+    def test_dead_writer_detected_before_queue_fills(self):
+        """Test a periodic liveness check switches to the fallback without waiting for a full queue"""
+        fallback = CollectingHandler()
+        handler = ProcessQueueHandler(queue.Queue(), dead_pid(), fallback, check_interval=0)
+        handler.handle(make_record("worker", "record"))
+        assert [record.getMessage() for record in fallback.records][1:] == ["record"]
+        assert handler.queue.empty()
@@ -0,0 +1,114 @@
+import os
+import shutil
+import itertools
+import subprocess
+import pytest
+from types import SimpleNamespace
+from core import memory_profiler
+from core.memory_profiler import (
+    SNAPSHOT_SUFFIX, MemoryTracingError, SnapshotNotFoundError, _load_snapshot, diff_snapshots, list_snapshots,
+    take_snapshot
+)
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen(["true"])
+    process.wait()
+    return process.pid
+
+
+def copy_snapshot(directory, snapshot_id, pid, taken_at_ms) -> str:
+    copy_id = f"{pid}-{taken_at_ms}"
+    shutil.copy(directory / (snapshot_id + SNAPSHOT_SUFFIX), directory / (copy_id + SNAPSHOT_SUFFIX))
+    return copy_id
+
+
+@pytest.fixture
+def tracing():
+    was_tracing = memory_profiler.tracemalloc.is_tracing()
+    memory_profiler.start_tracing(5)
+    yield
+    if not was_tracing:
+        memory_profiler.stop_tracing()
+
+
+class TestTakeSnapshot:
+    """Test snapshots are written and pruned"""
+
+    def test_requires_tracing(self, tmp_path):
+        """Test a snapshot is refused while tracemalloc is off"""
+        if memory_profiler.tracemalloc.is_tracing():
+            pytest.skip("tracemalloc is enabled for the whole test run")
+        with pytest.raises(MemoryTracingError):
+            take_snapshot(str(tmp_path), 3)
+        assert list_snapshots(str(tmp_path)) == []
+
+    def test_prunes_own_snapshots(self, tmp_path, tracing, monkeypatch):
+        """Test only this worker's newest MEMORY_MAX_SNAPSHOTS_PER_WORKER snapshots are kept"""
+        taken_at = itertools.count(1)
+        monkeypatch.setattr(memory_profiler, "time", SimpleNamespace(time=lambda: next(taken_at)))
+        infos = [take_snapshot(str(tmp_path), 2) for _ in range(4)]
+
+        assert infos[-1]["pid"] == os.getpid()
+        assert infos[-1]["traced_bytes"] > 0
+        assert [info["snapshot_id"] for info in list_snapshots(str(tmp_path))] == [
+            info["snapshot_id"] for info in infos[-2:]
+        ]
+
+    def test_prunes_exited_workers(self, tmp_path, tracing):
+        """Test snapshots of exited workers are capped as a whole, while live workers keep theirs"""
+        snapshot_id = take_snapshot(str(tmp_path), 2)["snapshot_id"]
+        first_dead, second_dead, live = dead_pid(), dead_pid(), os.getppid()
+        copy_snapshot(tmp_path, snapshot_id, first_dead, 1000)
+        copy_snapshot(tmp_path, snapshot_id, second_dead, 2000)
+        copy_snapshot(tmp_path, snapshot_id, first_dead, 3000)
+        for taken_at_ms in (1000, 2000, 3000):
+            copy_snapshot(tmp_path, snapshot_id, live, taken_at_ms)
+
+        take_snapshot(str(tmp_path), 2)
+
+        remaining = {(info["pid"], info["taken_at"]) for info in list_snapshots(str(tmp_path))}
+        assert {(pid, taken_at) for pid, taken_at in remaining if pid in (first_dead, second_dead)} == {
+            (second_dead, 2.0), (first_dead, 3.0)
+        }
+        assert len(list_snapshots(str(tmp_path), live)) == 3
+        assert len(list_snapshots(str(tmp_path), os.getpid())) == 2
+
+
+class TestDiffSnapshots:
+    """Test comparing snapshots"""
+
+    @pytest.fixture
+    def snapshot_ids(self, tmp_path, tracing):
+        base_id = take_snapshot(str(tmp_path), 10)["snapshot_id"]
+        grown = [bytearray(1024) for _ in range(200)]
+        target_id = take_snapshot(str(tmp_path), 10)["snapshot_id"]
+        del grown
+        # Pretend the target was taken by another worker
+        other_id = copy_snapshot(tmp_path, target_id, dead_pid(), 1)
+        os.remove(tmp_path / (target_id + SNAPSHOT_SUFFIX))
+        return base_id, other_id
+
+    @pytest.mark.parametrize("group_by", ["lineno", "filename", "traceback"])
+    def test_diff_across_workers(self, tmp_path, snapshot_ids, group_by):
+        """Test snapshots of two workers can be compared under each grouping"""
+        base_id, target_id = snapshot_ids
+        diff = diff_snapshots(str(tmp_path), base_id, target_id, group_by, 5)
+
+        assert diff["total_size_diff"] >= 200 * 1024
+        assert 0 < len(diff["entries"]) <= 5
+        top = diff["entries"][0]
+        assert top["location"].startswith(__file__)
+        assert top["location"] == top["traceback"][0]
+        assert top["size_diff"] >= 200 * 1024
+        if group_by == "traceback":
+            assert len(top["traceback"]) > 1
+        else:
+            assert len(top["traceback"]) == 1
+
+    @pytest.mark.parametrize("snapshot_id", ["1-2", "abc", "../1-2", "1-2/../../etc"])
+    def test_unknown_or_malformed_id(self, tmp_path, snapshot_id):
+        """Test ids that are malformed or have no file are not found, and never leave the directory"""
+        (tmp_path / ("../1-2" + SNAPSHOT_SUFFIX)).write_bytes(b"")
+        with pytest.raises(SnapshotNotFoundError):
+            _load_snapshot(str(tmp_path), snapshot_id)
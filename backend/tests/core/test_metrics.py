@@ -0,0 +1,45 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from core.metrics import is_scrape_allowed
+from main import app
+
+
+def make_client(peer: str) -> AsyncClient:
+    transport = ASGITransport(app=app, client=(peer, 50000))
+    return AsyncClient(transport=transport, base_url="http://testserver")
+
+
+class TestMetricsAccess:
+    """Test /metrics is only served to METRICS_ALLOWED_NETWORKS"""
+
+    @pytest.mark.parametrize("ip", ["127.0.0.1", "::1", "10.250.0.12"])
+    def test_allowed_networks(self, ip):
+        """Test loopback and the compose network may scrape"""
+        assert is_scrape_allowed(ip) is True
+
+    @pytest.mark.parametrize("ip", ["203.0.113.7", "10.0.0.1", "unknown", ""])
+    def test_other_addresses(self, ip):
+        """Test any other client, and unresolvable ones, are refused"""
+        assert is_scrape_allowed(ip) is False
+
+    @pytest.mark.asyncio
+    async def test_scraper_on_compose_network(self):
+        """Test a scraper connecting directly on the compose network gets the metrics"""
+        async with make_client("10.250.0.12") as client:
+            response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert "http_requests_total" in response.text
+
+    @pytest.mark.asyncio
+    async def test_external_client_gets_404(self):
+        """Test a direct connection from outside gets 404"""
+        async with make_client("203.0.113.7") as client:
+            response = await client.get("/metrics")
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_external_client_behind_nginx_gets_404(self):
+        """Test a client proxied by nginx is judged by its own address, not nginx's"""
+        async with make_client("10.250.0.2") as client:
+            response = await client.get("/metrics", headers={"X-Forwarded-For": "203.0.113.7"})
+        assert response.status_code == 404
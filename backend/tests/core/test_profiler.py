@@ -0,0 +1,83 @@
+import time
+import threading
+import pytest
+from core import profiler
+from core.profiler import ProfilerBusyError, StackSampler, sample_stacks
+
+
+def wait_in_marked_frame(started: threading.Event, stop: threading.Event):
+    started.set()
+    stop.wait(5)
+
+
+@pytest.fixture
+def target_thread():
+    """A thread parked in a recognizable frame while the test samples it"""
+    started, stop = threading.Event(), threading.Event()
+    thread = threading.Thread(target=wait_in_marked_frame, args=(started, stop), name="target-thread")
+    thread.start()
+    started.wait(5)
+    yield thread
+    stop.set()
+    thread.join()
+
+
+class TestStackSampler:
+    """Test the sampling profiler"""
+
+    def test_collapsed_output(self):
+        """Test collapsed stacks are "frames count" lines, most frequent first"""
+        sampler = StackSampler(hz=100, max_overhead=0.02)
+        sampler.stacks["main:run;api:handler"] = 2
+        sampler.stacks["main:run;api:handler;db:query"] = 5
+        assert sampler.collapsed() == "main:run;api:handler;db:query 5\nmain:run;api:handler 2"
+
+    def test_samples_only_the_given_thread(self, target_thread):
+        """Test a thread id limits samples to that thread, without a thread name prefix"""
+        sampler = StackSampler(hz=200, max_overhead=0.5, thread_id=target_thread.ident)
+        sampler.run(0.05)
+
+        assert sampler.samples > 0
+        assert sum(sampler.stacks.values()) == sampler.samples
+        for stack in sampler.stacks:
+            assert stack.startswith("threading:Thread._bootstrap")
+            assert f"{__name__}:wait_in_marked_frame" in stack
+
+    def test_all_threads_except_sampler(self, target_thread):
+        """Test sampling every thread prefixes stacks with thread names and skips the sampler"""
+        sampler = StackSampler(hz=200, max_overhead=0.5)
+        sampler.run(0.05)
+
+        thread_names = {stack.split(";", 1)[0] for stack in sampler.stacks}
+        assert "target-thread" in thread_names
+        # The sampler runs in this thread, which is never sampled
+        assert threading.current_thread().name not in thread_names
+
+    def test_overhead_stays_under_limit(self, monkeypatch):
+        """Test expensive samples make the sampler back off to max_overhead"""
+        sampler = StackSampler(hz=1000, max_overhead=0.1)
+        monkeypatch.setattr(sampler, "_take_sample", lambda own_id: time.sleep(0.002))
+        sampler.run(0.3)
+
+        # 1000 Hz of 2 ms samples would be all overhead; the backoff keeps it near 10%
+        assert sampler.samples < 100
+        assert sampler.overhead <= 0.1 + 0.02
+
+
+class TestSampleStacks:
+    """Test one profile at a time per worker"""
+
+    def test_concurrent_profile_is_rejected(self):
+        """Test a second profile while one runs raises ProfilerBusyError"""
+        assert profiler._profile_lock.acquire(blocking=False)
+        try:
+            with pytest.raises(ProfilerBusyError):
+                sample_stacks(0.01, 100, 0.02)
+        finally:
+            profiler._profile_lock.release()
+
+    def test_lock_released_after_profile(self):
+        """Test the lock is free again once a profile finished"""
+        sampler = sample_stacks(0.01, 100, 0.5)
+        assert sampler.duration > 0
+        assert not profiler._profile_lock.locked()
@@ -0,0 +1,72 @@
+import pytest
+from core.query_counter import (
+    QueryStats, get_query_stats, normalize_sql, record_query, start_query_counting, stop_query_counting
+)
+
+
+class TestNormalizeSql:
+    """Test statements are reduced to their shape"""
+
+    def test_collapses_whitespace(self):
+        """Test newlines, tabs and repeated spaces become single spaces"""
+        assert normalize_sql("  SELECT *\n\tFROM   users\n") == "SELECT * FROM users"
+
+    @pytest.mark.parametrize("placeholders", ["%s", "%s, %s", "%s,%s, %s , %s", "?, ?", "%(id_1)s, %(id_2)s"])
+    def test_collapses_placeholder_lists(self, placeholders):
+        """Test IN lists of any length and parameter style normalize to the same statement"""
+        statement = f"SELECT * FROM users WHERE id IN ({placeholders})"
+        assert normalize_sql(statement) == "SELECT * FROM users WHERE id IN (?)"
+
+    def test_collapses_multi_row_values(self):
+        """Test multi-row inserts normalize per row regardless of the row count"""
+        assert normalize_sql("INSERT INTO users (id, email) VALUES (%s, %s), (%s, %s)") == (
+            "INSERT INTO users (id, email) VALUES (?), (?)"
+        )
+
+    def test_replaces_numeric_literals(self):
+        """Test numeric literals are replaced, while digits inside identifiers are kept"""
+        assert normalize_sql("SELECT * FROM users_2 LIMIT 20 OFFSET 40") == "SELECT * FROM users_2 LIMIT ? OFFSET ?"
+
+
+class TestQueryStats:
+    """Test statements are counted per scope"""
+
+    def test_nested_scopes_all_count(self):
+        """Test a statement is counted by the inner scope and every enclosing one"""
+        outer_token = start_query_counting()
+        outer = get_query_stats()
+        try:
+            record_query("SELECT 1", 0.5)
+            inner_token = start_query_counting()
+            inner = get_query_stats()
+            record_query("SELECT 2", 0.25)
+            stop_query_counting(inner_token)
+            assert get_query_stats() is outer
+        finally:
+            stop_query_counting(outer_token)
+
+        assert get_query_stats() is None
+        assert inner.parent is outer
+        assert (inner.count, inner.duration, inner.statements) == (1, 0.25, {"SELECT ?": 1})
+        assert (outer.count, outer.duration, outer.statements) == (2, 0.75, {"SELECT ?": 2})
+
+    def test_record_without_scope_is_ignored(self):
+        """Test statements run outside any counted scope are not recorded"""
+        record_query("SELECT 1", 0.1)
+        assert get_query_stats() is None
+
+    def test_repeated_above_threshold(self):
+        """Test only statements run more than `threshold` times are returned, most frequent first"""
+        stats = QueryStats()
+        for user_id in range(3):
+            stats.add(f"SELECT * FROM users WHERE id = {user_id}", 0)
+        for _ in range(5):
+            stats.add("SELECT * FROM roles WHERE id IN (%s, %s)", 0)
+        stats.add("SELECT * FROM login_logs", 0)
+
+        assert stats.repeated(2) == [
+            ("SELECT * FROM roles WHERE id IN (?)", 5),
+            ("SELECT * FROM users WHERE id = ?", 3),
+        ]
+        assert stats.repeated(3) == [("SELECT * FROM roles WHERE id IN (?)", 5)]
+        assert stats.repeated(5) == []
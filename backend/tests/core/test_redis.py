@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+import core.redis
+from core.redis import RedisCircuitBreaker, RedisUnavailableError, redis_call
+
+
+async def _fail():
+    raise RedisConnectionError("connection refused")
+
+
+async def _value(value):
+    return value
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    """Breaker that opens on the first failure and allows a probe right away"""
+    breaker = RedisCircuitBreaker(failure_threshold=1, reset_seconds=0)
+    monkeypatch.setattr(core.redis, "redis_breaker", breaker)
+    return breaker
+
+
+class TestRedisCircuitBreaker:
+    """Test RedisCircuitBreaker state transitions"""
+
+    def test_opens_after_threshold(self):
+        """Test the breaker opens after consecutive failures and rejects calls"""
+        breaker = RedisCircuitBreaker(failure_threshold=2, reset_seconds=60)
+        breaker.record_failure()
+        assert breaker.allow() is True
+        breaker.record_failure()
+        assert breaker.is_open
+        assert breaker.allow() is False
+
+    def test_single_probe_when_half_open(self):
+        """Test only one probe is let through after the reset period"""
+        breaker = RedisCircuitBreaker(failure_threshold=1, reset_seconds=0)
+        breaker.record_failure()
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+        breaker.record_success()
+        assert not breaker.is_open
+        assert breaker.allow() is True
+
+
+class TestRedisCall:
+    """Test redis_call with the shared breaker"""
+
+    @pytest.mark.asyncio
+    async def test_connection_error_opens_breaker(self, breaker):
+        """Test connection errors raise RedisUnavailableError and open the breaker"""
+        with pytest.raises(RedisUnavailableError):
+            await redis_call(_fail())
+        assert breaker.is_open
+
+    @pytest.mark.asyncio
+    async def test_successful_probe_closes_breaker(self, breaker):
+        """Test a successful half-open probe closes the breaker"""
+        with pytest.raises(RedisUnavailableError):
+            await redis_call(_fail())
+        assert await redis_call(_value("ok")) == "ok"
+        assert not breaker.is_open
+
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_releases_breaker(self, breaker):
+        """Test a cancelled half-open probe does not leave the breaker rejecting every call"""
+        with pytest.raises(RedisUnavailableError):
+            await redis_call(_fail())
+
+        probe = asyncio.create_task(redis_call(asyncio.Event().wait(), timeout=10))
+        await asyncio.sleep(0)
+        assert breaker.probing
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        assert not breaker.probing
+        assert await redis_call(_value("ok")) == "ok"
+        assert not breaker.is_open
@@ -0,0 +1,100 @@
+import pytest
+from core import request_timing
+from core.request_timing import (
+    RequestTimings, get_request_timings, record_timing, start_request_timing, stop_request_timing, track_timing
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable perf_counter for the timing module"""
+    now = [100.0]
+    monkeypatch.setattr(request_timing.time, "perf_counter", lambda: now[0])
+    return now
+
+
+class TestRequestTimings:
+    """Test the per-request component breakdown"""
+
+    def test_breakdown_order_counts_and_app_time(self, clock):
+        """Test components come in header order with counts, and app is the rest of the request"""
+        timings = RequestTimings()
+        timings.add("hash", 0.2)
+        timings.add("db", 0.01)
+        timings.add("db", 0.02)
+        timings.add("redis", 0.005)
+        clock[0] += 0.5
+
+        breakdown = timings.breakdown()
+
+        assert list(breakdown) == ["db", "redis", "hash", "app", "total"]
+        assert breakdown["db"] == {"dur": 30.0, "count": 2}
+        assert breakdown["redis"] == {"dur": 5.0, "count": 1}
+        assert breakdown["hash"] == {"dur": 200.0, "count": 1}
+        assert breakdown["app"] == {"dur": 265.0}
+        assert breakdown["total"] == {"dur": 500.0}
+
+    def test_unused_components_are_omitted(self, clock):
+        """Test a request without calls only reports app and total"""
+        clock[0] += 0.01
+        assert list(RequestTimings().breakdown()) == ["app", "total"]
+
+    def test_overlapping_calls_clamp_app_time(self, clock):
+        """Test parallel calls adding up to more than the request leave app at zero"""
+        timings = RequestTimings()
+        for _ in range(4):
+            timings.add("hash", 0.1)
+        clock[0] += 0.15
+
+        breakdown = timings.breakdown()
+        assert breakdown["hash"] == {"dur": 400.0, "count": 4}
+        assert breakdown["app"] == {"dur": 0.0}
+
+    def test_server_timing_header(self, clock):
+        """Test the header lists each component with its duration and call count"""
+        timings = RequestTimings()
+        timings.add("db", 0.012)
+        timings.add("redis", 0.001)
+        clock[0] += 0.02
+
+        assert timings.server_timing_header() == (
+            'db;dur=12.0;desc="1x", redis;dur=1.0;desc="1x", app;dur=7.0, total;dur=20.0'
+        )
+
+
+class TestTrackTiming:
+    """Test recording calls into the current request"""
+
+    def test_noop_without_request(self):
+        """Test tracking outside a request records nothing and does not fail"""
+        assert get_request_timings() is None
+        with track_timing("db"):
+            pass
+        record_timing("redis", 0.1)
+        assert get_request_timings() is None
+
+    def test_records_into_current_request(self, clock):
+        """Test tracked blocks are added to the active request and stop with it"""
+        token = start_request_timing()
+        try:
+            with track_timing("hash"):
+                clock[0] += 0.05
+            record_timing("db", 0.01)
+            timings = get_request_timings()
+            assert timings.totals == {"hash": pytest.approx(0.05), "db": 0.01}
+            assert timings.counts == {"hash": 1, "db": 1}
+        finally:
+            stop_request_timing(token)
+        assert get_request_timings() is None
+
+    def test_error_is_still_recorded(self, clock):
+        """Test a block that raises is still counted"""
+        token = start_request_timing()
+        try:
+            with pytest.raises(ValueError):
+                with track_timing("db"):
+                    clock[0] += 0.01
+                    raise ValueError("boom")
+            assert get_request_timings().counts == {"db": 1}
+        finally:
+            stop_request_timing(token)
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+from prometheus_client import REGISTRY
+from core.security import hash_password, hash_passwords, verify_password
+
+
+def queue_depth() -> float:
+    return REGISTRY.get_sample_value("password_hash_queue_depth")
+
+
+class TestPasswordHashing:
+    """Test single-password hashing runs off the event loop"""
+
+    @pytest.mark.asyncio
+    async def test_hash_password_runs_in_hash_pool(self):
+        """Test hash_password runs bcrypt on the hashing worker pool"""
+        threads = []
+
+        def fake_hash(password):
+            threads.append(threading.current_thread().name)
+            return "hashed"
+
+        with patch("core.security.pwd_context.hash", side_effect=fake_hash):
+            assert await hash_password("secret") == "hashed"
+        assert threads[0].startswith("password-hash")
+
+    @pytest.mark.asyncio
+    async def test_verify_password_runs_in_hash_pool(self):
+        """Test verify_password runs bcrypt on the hashing worker pool"""
+        threads = []
+
+        def fake_verify(plain, hashed):
+            threads.append(threading.current_thread().name)
+            return plain == "secret"
+
+        with patch("core.security.pwd_context.verify", side_effect=fake_verify):
+            assert await verify_password("secret", "hashed") is True
+            assert await verify_password("wrong", "hashed") is False
+        assert all(name.startswith("password-hash") for name in threads)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("call", [
+        lambda: hash_password("secret"),
+        lambda: verify_password("secret", "hashed"),
+        lambda: hash_passwords(["secret"]),
+    ])
+    async def test_queue_depth_counts_pending_hashes(self, call):
+        """Test every hashing path is counted in the queue depth gauge until the pool finishes it"""
+        release = threading.Event()
+
+        def blocking(*args):
+            release.wait(5)
+            return True
+
+        baseline = queue_depth()
+        with patch("core.security.pwd_context.hash", side_effect=blocking), \
+                patch("core.security.pwd_context.verify", side_effect=blocking):
+            task = asyncio.create_task(call())
+            await asyncio.sleep(0.01)
+            assert queue_depth() == baseline + 1
+            release.set()
+            await task
+        assert queue_depth() == baseline
@@ -0,0 +1,258 @@
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+import redis.asyncio as aioredis
+import core.tracing
+from core.config import settings
+from core.database import _after_cursor_execute, _before_cursor_execute, _handle_error
+from core.redis import InstrumentedRedis
+from core.security import hash_password
+from core.tracing import (
+    SPAN_KIND_CLIENT, SPAN_KIND_SERVER, STATUS_ERROR, SpanExporter, _parse_traceparent,
+    finish_request_trace, start_request_trace, trace_span
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+class CapturingExporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(spans)
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = CapturingExporter()
+    monkeypatch.setattr(core.tracing, "span_exporter", exporter)
+    # Export only what the sampling rules always keep
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 0.0)
+    return exporter
+
+
+def start_trace(traceparent=None, request_id="req-1"):
+    return start_request_trace("GET /api/users", request_id, traceparent, {"http.request.method": "GET"})
+
+
+class TestTraceparent:
+    """Test W3C traceparent parsing"""
+
+    def test_sampled_traceparent(self):
+        """Test a valid header yields the trace id, parent id and sampled flag"""
+        assert _parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, True)
+
+    def test_unsampled_traceparent_is_normalized(self):
+        """Test surrounding whitespace and upper case hex are accepted"""
+        assert _parse_traceparent(f" 00-{TRACE_ID.upper()}-{PARENT_ID}-00 ") == (TRACE_ID, PARENT_ID, False)
+
+    @pytest.mark.parametrize("header", [
+        None,
+        "",
+        "garbage",
+        f"01-{TRACE_ID}-{PARENT_ID}-01",
+        f"00-{TRACE_ID[:-1]}-{PARENT_ID}-01",
+        f"00-{'0' * 32}-{PARENT_ID}-01",
+    ])
+    def test_invalid_traceparent_is_ignored(self, header):
+        """Test unsupported versions, malformed ids and the all-zero trace id start a new trace"""
+        assert _parse_traceparent(header) == (None, None, False)
+
+    def test_request_continues_callers_trace(self):
+        """Test the server span joins the trace named in traceparent"""
+        root, token = start_trace(f"00-{TRACE_ID}-{PARENT_ID}-01")
+        core.tracing._current_span.reset(token)
+        assert root.trace.trace_id == TRACE_ID
+        assert root.parent_id == PARENT_ID
+        assert root.kind == SPAN_KIND_SERVER
+
+    def test_hex_request_id_doubles_as_trace_id(self):
+        """Test a 32-hex-digit request id is reused as the trace id"""
+        root, token = start_trace(request_id=TRACE_ID)
+        core.tracing._current_span.reset(token)
+        assert root.trace.trace_id == TRACE_ID
+        assert root.parent_id is None
+
+    def test_other_request_id_gets_random_trace_id(self):
+        """Test any other request id gets a fresh trace id"""
+        root, token = start_trace(request_id="req-1")
+        core.tracing._current_span.reset(token)
+        assert len(root.trace.trace_id) == 32
+        assert root.attributes["request_id"] == "req-1"
+
+
+class TestSpanNesting:
+    """Test Redis, DB and hashing spans hang under the current span"""
+
+    @pytest.mark.asyncio
+    async def test_spans_nest_under_request(self, exporter):
+        """Test child spans get the right parents and the root is exported last"""
+        async def fake_execute_command(self, *args, **options):
+            return "PONG"
+
+        root, token = start_trace(f"00-{TRACE_ID}-{PARENT_ID}-01")
+        with patch.object(aioredis.Redis, "execute_command", fake_execute_command), \
+                patch("core.security.pwd_context.hash", return_value="hashed"):
+            with trace_span("load_user") as outer:
+                assert await InstrumentedRedis().execute_command("PING") == "PONG"
+                context = SimpleNamespace()
+                _before_cursor_execute(None, None, "select * from users", {}, context, False)
+                _after_cursor_execute(None, None, "select * from users", {}, context, False)
+            await hash_password("secret")
+        finish_request_trace(root, token)
+
+        assert core.tracing._current_span.get() is None
+        [spans] = exporter.traces
+        by_name = {span.name: span for span in spans}
+        assert spans[-1] is root
+        assert by_name["load_user"].parent_id == root.span_id
+        assert by_name["redis PING"].parent_id == outer.span_id
+        assert by_name["redis PING"].kind == SPAN_KIND_CLIENT
+        assert by_name["db.query"].parent_id == outer.span_id
+        assert by_name["db.query"].attributes["db.operation.name"] == "SELECT"
+        assert by_name["password.hash"].parent_id == root.span_id
+        assert all(span.trace.trace_id == TRACE_ID for span in spans)
+
+    @pytest.mark.asyncio
+    async def test_failed_statement_span_records_error(self, exporter):
+        """Test a failing statement still closes its span with the error"""
+        root, token = start_trace(f"00-{TRACE_ID}-{PARENT_ID}-01")
+        context = SimpleNamespace()
+        _before_cursor_execute(None, None, "update users set status = 0", {}, context, False)
+        _handle_error(SimpleNamespace(execution_context=context, original_exception=RuntimeError("deadlock")))
+        finish_request_trace(root, token)
+
+        [spans] = exporter.traces
+        assert spans[0].name == "db.query"
+        assert spans[0].error == "RuntimeError: deadlock"
+
+    def test_spans_outside_request_are_noops(self):
+        """Test trace_span yields None when no request is being traced"""
+        with trace_span("orphan") as span:
+            assert span is None
+
+    def test_span_limit(self, exporter, monkeypatch):
+        """Test spans beyond TRACE_MAX_SPANS are only counted"""
+        monkeypatch.setattr(settings, "TRACE_MAX_SPANS", 2)
+        root, token = start_trace(f"00-{TRACE_ID}-{PARENT_ID}-01")
+        for _ in range(5):
+            with trace_span("step"):
+                pass
+        finish_request_trace(root, token)
+
+        [spans] = exporter.traces
+        assert len(spans) == 3
+        assert root.attributes["trace.dropped_spans"] == 3
+
+
+class TestSampling:
+    """Test which finished traces are exported"""
+
+    def test_fast_successful_request_is_sampled_out(self, exporter):
+        """Test an unsampled fast 200 is dropped at a zero sample rate"""
+        root, token = start_trace()
+        root.set_attribute("http.response.status_code", 200)
+        finish_request_trace(root, token)
+        assert exporter.traces == []
+
+    def test_server_error_is_always_exported(self, exporter):
+        """Test a 5xx response is kept regardless of the sample rate"""
+        root, token = start_trace()
+        root.set_attribute("http.response.status_code", 503)
+        finish_request_trace(root, token)
+        assert len(exporter.traces) == 1
+
+    def test_exception_is_always_exported(self, exporter):
+        """Test a request that raised is kept with the error on the root span"""
+        root, token = start_trace()
+        finish_request_trace(root, token, ValueError("boom"))
+        assert exporter.traces[0][-1].error == "ValueError: boom"
+
+    def test_slow_request_is_always_exported(self, exporter, monkeypatch):
+        """Test a request slower than TRACE_SLOW_MS is kept"""
+        monkeypatch.setattr(settings, "TRACE_SLOW_MS", 0)
+        root, token = start_trace()
+        finish_request_trace(root, token)
+        assert len(exporter.traces) == 1
+
+
+class TestSpanExporter:
+    """Test OTLP/JSON encoding and delivery"""
+
+    def _finished_spans(self, exporter):
+        root, token = start_trace(f"00-{TRACE_ID}-{PARENT_ID}-01")
+        with trace_span("redis GET", SPAN_KIND_CLIENT, {"db.system.name": "redis", "cached": True, "keys": 2, "ratio": 0.5}):
+            pass
+        root.set_attribute("http.response.status_code", 500)
+        finish_request_trace(root, token)
+        return exporter.traces[0]
+
+    def test_encode_otlp_json(self, exporter, tmp_path):
+        """Test spans are encoded as an ExportTraceServiceRequest"""
+        spans = self._finished_spans(exporter)
+        span_exporter = SpanExporter("", str(tmp_path / "traces.jsonl"), 0, "backend-test", 10)
+
+        payload = json.loads(span_exporter._encode([spans]))
+
+        [resource_spans] = payload["resourceSpans"]
+        assert resource_spans["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "backend-test"}}]
+        child, root = resource_spans["scopeSpans"][0]["spans"]
+        assert child["traceId"] == TRACE_ID
+        assert child["parentSpanId"] == root["spanId"]
+        assert root["parentSpanId"] == PARENT_ID
+        assert int(child["endTimeUnixNano"]) >= int(child["startTimeUnixNano"])
+        attributes = {attribute["key"]: attribute["value"] for attribute in child["attributes"]}
+        assert attributes == {
+            "db.system.name": {"stringValue": "redis"},
+            "cached": {"boolValue": True},
+            "keys": {"intValue": "2"},
+            "ratio": {"doubleValue": 0.5},
+        }
+        assert "status" not in child
+
+    def test_error_span_status(self, exporter, tmp_path):
+        """Test a span that raised carries an error status"""
+        root, token = start_trace()
+        finish_request_trace(root, token, RuntimeError("boom"))
+        span_exporter = SpanExporter("", str(tmp_path / "traces.jsonl"), 0, "backend", 10)
+
+        [encoded] = json.loads(span_exporter._encode(exporter.traces))["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert encoded["status"] == {"code": STATUS_ERROR, "message": "RuntimeError: boom"}
+
+    def test_write_appends_lines_and_rotates(self, tmp_path):
+        """Test each batch is one line and a full file is rotated to <file>.1"""
+        path = tmp_path / "traces" / "traces.jsonl"
+        span_exporter = SpanExporter("", str(path), 10, "backend", 10)
+
+        span_exporter._write(b'{"batch":1}')
+        span_exporter._write(b'{"batch":2}')
+
+        assert path.read_text() == '{"batch":2}\n'
+        assert (tmp_path / "traces" / "traces.jsonl.1").read_text() == '{"batch":1}\n'
+
+    def test_write_posts_to_endpoint(self, tmp_path):
+        """Test batches are POSTed to the collector when an endpoint is set"""
+        endpoint = "http://otel-collector:4318/v1/traces"
+        span_exporter = SpanExporter(endpoint, str(tmp_path / "traces.jsonl"), 0, "backend", 10)
+
+        with patch("core.tracing.urllib.request.urlopen") as urlopen:
+            span_exporter._write(b"{}")
+
+        request = urlopen.call_args.args[0]
+        assert request.full_url == endpoint
+        assert request.data == b"{}"
+        assert request.get_header("Content-type") == "application/json"
+        assert not (tmp_path / "traces.jsonl").exists()
+
+    def test_full_queue_drops_traces(self, tmp_path, monkeypatch):
+        """Test export never blocks and counts traces dropped on a full queue"""
+        span_exporter = SpanExporter("", str(tmp_path / "traces.jsonl"), 0, "backend", 1)
+        monkeypatch.setattr(span_exporter, "_start", lambda: None)
+
+        span_exporter.export([])
+        span_exporter.export([])
+
+        assert span_exporter.dropped == 1
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+from core.config import settings
+from middleware.admission import AdmissionControlMiddleware
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def make_client(app) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver")
+
+
+@pytest.fixture
+def lagging_loop():
+    with patch("middleware.admission.loop_lag_monitor", SimpleNamespace(lag=settings.ADMISSION_MAX_LOOP_LAG_SECONDS + 1)):
+        yield
+
+
+class TestLoopLag:
+    """Test requests are shed while the event loop lags"""
+
+    @pytest.mark.asyncio
+    async def test_lagging_loop_returns_503_with_retry_after(self, lagging_loop):
+        """Test an overloaded worker answers 503 with Retry-After without calling the app"""
+        async def failing_app(scope, receive, send):
+            raise AssertionError("request admitted")
+
+        admission = AdmissionControlMiddleware(failing_app)
+        async with make_client(admission) as client:
+            response = await client.get("/api/users")
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+        assert response.json()["code"] == 503
+        assert admission.shedding is True
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("path", settings.ADMISSION_PRIORITY_PATHS)
+    async def test_priority_paths_bypass_shedding(self, lagging_loop, path):
+        """Test token refresh, health and metrics are admitted while shedding"""
+        admission = AdmissionControlMiddleware(ok_app)
+        async with make_client(admission) as client:
+            response = await client.get(path)
+
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_recovered_loop_admits_again(self):
+        """Test shedding stops once the lag is back under the limit"""
+        admission = AdmissionControlMiddleware(ok_app)
+        admission.shedding = True
+        with patch("middleware.admission.loop_lag_monitor", SimpleNamespace(lag=0.0)):
+            async with make_client(admission) as client:
+                response = await client.get("/api/users")
+
+        assert response.status_code == 200
+        assert admission.shedding is False
+
+
+class TestInFlight:
+    """Test the per-worker in-flight request limit"""
+
+    @pytest.mark.asyncio
+    async def test_in_flight_threshold(self):
+        """Test requests beyond ADMISSION_MAX_IN_FLIGHT are shed until one finishes"""
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            started.set()
+            await release.wait()
+            await ok_app(scope, receive, send)
+
+        admission = AdmissionControlMiddleware(slow_app)
+        admission.max_in_flight = 1
+        async with make_client(admission) as client:
+            first = asyncio.create_task(client.get("/api/users"))
+            await started.wait()
+            assert admission.in_flight == 1
+
+            rejected = await client.get("/api/users")
+            priority = asyncio.create_task(client.get("/healthz"))
+            release.set()
+            assert (await first).status_code == 200
+            assert (await priority).status_code == 200
+            assert admission.in_flight == 0
+
+            admitted = await client.get("/api/users")
+
+        assert rejected.status_code == 503
+        assert rejected.headers["Retry-After"] == str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+        assert admitted.status_code == 200
@@ -0,0 +1,132 @@
+import pytest
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+from core.config import settings
+from middleware.cors import CORSMiddleware
+
+ALLOWED_ORIGIN = f"http://localhost:{settings.FRONTEND_PORT}"
+OTHER_ORIGIN = "https://evil.example.com"
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def make_client(app) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver")
+
+
+def preflight_headers(origin, requested_headers=""):
+    headers = {"Origin": origin, "Access-Control-Request-Method": "POST"}
+    if requested_headers:
+        headers["Access-Control-Request-Headers"] = requested_headers
+    return headers
+
+
+class TestOrigins:
+    """Test allowed origin lookups"""
+
+    @pytest.mark.parametrize("origin", [
+        ALLOWED_ORIGIN,
+        ALLOWED_ORIGIN.upper(),
+        f"https://{settings.HOSTNAME}:{settings.BACKEND_PORT}",
+    ])
+    def test_allowed_origins(self, origin):
+        """Test configured origins match regardless of case and scheme"""
+        assert CORSMiddleware(ok_app).is_allowed_origin(origin) is True
+
+    @pytest.mark.parametrize("origin", ["", OTHER_ORIGIN, f"http://localhost:{settings.FRONTEND_PORT}.evil.com"])
+    def test_rejected_origins(self, origin):
+        """Test other origins are rejected"""
+        assert CORSMiddleware(ok_app).is_allowed_origin(origin) is False
+
+
+class TestPreflight:
+    """Test preflight responses and their LRU cache"""
+
+    @pytest.mark.asyncio
+    async def test_allowed_preflight(self):
+        """Test an allowed preflight returns the CORS headers without calling the app"""
+        async def failing_app(scope, receive, send):
+            raise AssertionError("preflight reached the app")
+
+        async with make_client(CORSMiddleware(failing_app)) as client:
+            response = await client.options("/api/users", headers=preflight_headers(ALLOWED_ORIGIN, "X-Custom, Content-Type"))
+
+        assert response.status_code == 200
+        assert response.headers["Access-Control-Allow-Origin"] == ALLOWED_ORIGIN
+        assert response.headers["Access-Control-Allow-Credentials"] == "true"
+        assert response.headers["Access-Control-Max-Age"] == "3600"
+        assert "x-custom" in response.headers["Access-Control-Allow-Headers"].split(", ")
+
+    @pytest.mark.asyncio
+    async def test_rejected_preflight(self):
+        """Test a preflight from another origin gets no CORS headers"""
+        async with make_client(CORSMiddleware(ok_app)) as client:
+            response = await client.options("/api/users", headers=preflight_headers(OTHER_ORIGIN))
+
+        assert response.status_code == 200
+        assert "Access-Control-Allow-Origin" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_preflight_rendered_once(self):
+        """Test repeated preflights reuse the cached response"""
+        cors = CORSMiddleware(ok_app)
+        with patch.object(cors, "handle_preflight", wraps=cors.handle_preflight) as handle_preflight:
+            async with make_client(cors) as client:
+                first = await client.options("/api/users", headers=preflight_headers(ALLOWED_ORIGIN))
+                second = await client.options("/api/roles", headers=preflight_headers(ALLOWED_ORIGIN))
+
+        assert handle_preflight.call_count == 1
+        assert first.headers == second.headers
+        assert first.content == second.content
+
+    def test_cache_keyed_by_requested_headers(self):
+        """Test different requested headers get their own cached responses"""
+        cors = CORSMiddleware(ok_app)
+        plain = cors.get_preflight_response({}, ALLOWED_ORIGIN, False)
+        custom = cors.get_preflight_response({"access-control-request-headers": "x-custom"}, ALLOWED_ORIGIN, False)
+        assert plain is not custom
+        assert len(cors._preflight_cache) == 2
+
+    def test_rejected_origins_are_not_cached(self):
+        """Test arbitrary origins cannot fill the cache"""
+        cors = CORSMiddleware(ok_app)
+        for i in range(5):
+            assert cors.get_preflight_response({}, f"https://{i}.example.com", False) is cors._rejected_preflight
+        assert len(cors._preflight_cache) == 0
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test the cache keeps at most CORS_PREFLIGHT_CACHE_SIZE entries, evicting the oldest"""
+        cors = CORSMiddleware(ok_app)
+        cors._preflight_cache_size = 2
+        first = cors.get_preflight_response({"access-control-request-headers": "a"}, ALLOWED_ORIGIN, False)
+        cors.get_preflight_response({"access-control-request-headers": "b"}, ALLOWED_ORIGIN, False)
+        # Touch "a" so "b" becomes the oldest entry
+        assert cors.get_preflight_response({"access-control-request-headers": "a"}, ALLOWED_ORIGIN, False) is first
+        cors.get_preflight_response({"access-control-request-headers": "c"}, ALLOWED_ORIGIN, False)
+
+        assert [key[1] for key in cors._preflight_cache] == ["a", "c"]
+
+
+class TestSimpleRequests:
+    """Test CORS headers on regular responses"""
+
+    @pytest.mark.asyncio
+    async def test_allowed_origin_gets_headers(self):
+        """Test responses to an allowed origin carry the CORS headers"""
+        async with make_client(CORSMiddleware(ok_app)) as client:
+            response = await client.get("/api/users", headers={"Origin": ALLOWED_ORIGIN})
+
+        assert response.headers["Access-Control-Allow-Origin"] == ALLOWED_ORIGIN
+        assert response.headers["Vary"] == "Origin"
+
+    @pytest.mark.asyncio
+    async def test_other_origin_gets_only_vary(self):
+        """Test responses to other origins only carry Vary"""
+        async with make_client(CORSMiddleware(ok_app)) as client:
+            response = await client.get("/api/users", headers={"Origin": OTHER_ORIGIN})
+
+        assert "Access-Control-Allow-Origin" not in response.headers
+        assert response.headers["Vary"] == "Origin"
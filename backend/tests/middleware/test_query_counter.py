@@ -0,0 +1,65 @@
+import logging
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+from prometheus_client import REGISTRY
+from core.config import settings
+from core.query_counter import record_query
+from middleware.query_counter import QueryCounterMiddleware
+
+ROUTE = "/api/users/{user_id}"
+
+
+def make_client(app) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver")
+
+
+def repeated_requests() -> float:
+    return REGISTRY.get_sample_value("db_repeated_query_requests_total", {"route": ROUTE}) or 0
+
+
+def app_running(*statements):
+    async def app(scope, receive, send):
+        scope["route"] = SimpleNamespace(path=ROUTE)
+        for statement in statements:
+            record_query(statement, 0.001)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+class TestQueryCounterMiddleware:
+    """Test requests that repeat a statement are flagged"""
+
+    @pytest.fixture(autouse=True)
+    def threshold(self):
+        with patch.object(settings, "REPEATED_QUERY_THRESHOLD", 3):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_repeated_statement_is_flagged(self, caplog):
+        """Test a statement run more than REPEATED_QUERY_THRESHOLD times logs a warning and counts the request"""
+        statements = [f"SELECT * FROM roles WHERE id = {role_id}" for role_id in range(4)]
+        before = repeated_requests()
+        with caplog.at_level(logging.WARNING, logger="middleware.query_counter"):
+            async with make_client(QueryCounterMiddleware(app_running("SELECT 1", *statements))) as client:
+                assert (await client.get("/api/users/1")).status_code == 200
+
+        assert repeated_requests() == before + 1
+        [record] = caplog.records
+        assert record.event == "repeated_query"
+        assert record.route == ROUTE
+        assert "GET /api/users/{user_id}: 4 executions (threshold 3)" in record.getMessage()
+        assert "SELECT * FROM roles WHERE id = ?" in record.getMessage()
+
+    @pytest.mark.asyncio
+    async def test_statements_at_threshold_are_not_flagged(self, caplog):
+        """Test a request running each statement at most REPEATED_QUERY_THRESHOLD times is not flagged"""
+        before = repeated_requests()
+        with caplog.at_level(logging.WARNING, logger="middleware.query_counter"):
+            async with make_client(QueryCounterMiddleware(app_running(*["SELECT 1"] * 3, "SELECT * FROM users"))) as client:
+                assert (await client.get("/api/users/1")).status_code == 200
+
+        assert repeated_requests() == before
+        assert caplog.records == []
@@ -0,0 +1,380 @@
+import time
+import asyncio
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI, HTTPException
+from httpx import AsyncClient, ASGITransport
+from core.rate_limit import rate_limit, request_cost
+from core.redis import RedisUnavailableError
+from middleware.rate_limiter import RateLimiterMiddleware
+
+
+class FakeRedis:
+    """In-memory stand-in for the commands and counting script the limiter uses"""
+
+    def __init__(self):
+        self.values = {}
+        self.expires = {}
+        self.registered_scripts = 0
+        self.script_calls = 0
+
+    def _alive(self, key):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.values
+
+    def _pttl(self, key):
+        return int((self.expires[key] - time.monotonic()) * 1000) if key in self.expires else -1
+
+    async def get(self, key):
+        return self.values.get(key) if self._alive(key) else None
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+        self.expires.pop(key, None)
+
+    def register_script(self, source):
+        self.registered_scripts += 1
+
+        async def count_request(keys, args):
+            # Same steps as COUNT_REQUEST_SCRIPT
+            self.script_calls += 1
+            fail_key, block_key = keys
+            limit, window, block_seconds, increment = (int(arg) for arg in args)
+            if self._alive(block_key):
+                return [-1, self._pttl(block_key)]
+            count = (self.values[fail_key] if self._alive(fail_key) else 0) + increment
+            self.values[fail_key] = count
+            if count == increment:
+                self.expires[fail_key] = time.monotonic() + window
+            if count >= limit:
+                self.values[block_key] = 1
+                self.expires[block_key] = time.monotonic() + block_seconds
+                await self.delete(fail_key)
+                return [count, block_seconds * 1000]
+            return [count, self._pttl(fail_key)]
+        return count_request
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def make_client(app) -> AsyncClient:
+    # Requests come from a non-whitelisted peer so the limits apply
+    transport = ASGITransport(app=app, client=("203.0.113.7", 50000))
+    return AsyncClient(transport=transport, base_url="http://testserver")
+
+
+@pytest.fixture
+def fake_redis():
+    redis = FakeRedis()
+    with patch("middleware.rate_limiter.get_redis", return_value=redis):
+        yield redis
+
+
+class TestHealthChecks:
+    """Test health and metrics paths bypass the limiter"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("path", ["/healthz", "/metrics"])
+    async def test_health_paths_skip_redis(self, path):
+        """Test health probes never reach Redis and cannot be rate limited"""
+        limiter = RateLimiterMiddleware(ok_app)
+        with patch("middleware.rate_limiter.get_redis", side_effect=AssertionError("Redis used")):
+            async with make_client(limiter) as client:
+                response = await client.get(path)
+        assert response.status_code == 200
+
+
+class TestEndpointPolicies:
+    """Test @rate_limit policies are resolved per method and route template"""
+
+    @pytest.fixture
+    def app(self):
+        app = FastAPI()
+
+        @app.get("/api/items")
+        @rate_limit((2, 60))
+        async def list_items():
+            return {}
+
+        @app.delete("/api/items")
+        @rate_limit(None)
+        async def delete_items():
+            return {}
+
+        @app.patch("/api/items/{item_id}")
+        @rate_limit((1, 60))
+        async def update_item(item_id: str):
+            return {}
+
+        return app
+
+    @pytest.mark.asyncio
+    async def test_methods_on_one_path_keep_their_own_policy(self, app, fake_redis):
+        """Test GET and DELETE on one path use their own policy, whichever is seen first"""
+        limiter = RateLimiterMiddleware(app, router=app.router)
+        async with make_client(limiter) as client:
+            # DELETE first, so a path-only cache would reuse its unlimited policy for GET
+            assert (await client.delete("/api/items")).status_code == 200
+            assert (await client.get("/api/items")).status_code == 200
+            assert (await client.get("/api/items")).status_code == 429
+            for _ in range(5):
+                assert (await client.delete("/api/items")).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_policy_lookup_is_keyed_by_method(self, app):
+        """Test policies are compiled per (method, template)"""
+        limiter = RateLimiterMiddleware(app, router=app.router)
+        assert limiter.endpoint_rate_limits[("GET", "/api/items")]["limit"] == (2, 60)
+        assert limiter.endpoint_rate_limits[("DELETE", "/api/items")]["limit"] is None
+        assert ("PATCH", "/api/items") not in limiter.endpoint_rate_limits
+
+    @pytest.mark.asyncio
+    async def test_parameterized_route_shares_counter(self, app, fake_redis):
+        """Test every concrete path of a template counts against one counter"""
+        limiter = RateLimiterMiddleware(app, router=app.router)
+        async with make_client(limiter) as client:
+            assert (await client.patch("/api/items/1")).status_code == 429
+            assert (await client.patch("/api/items/2")).status_code == 429
+        assert "block:api:203.0.113.7:PATCH /api/items/{item_id}" in fake_redis.values
+
+
+class TestCountScript:
+    """Test endpoint limits are counted with the atomic counting script"""
+
+    @pytest.fixture
+    def app(self):
+        app = FastAPI()
+
+        @app.post("/api/login")
+        @rate_limit((2, 60), status_codes=[401], clear_on_success=True)
+        async def login(password: str):
+            if password != "secret":
+                raise HTTPException(status_code=401)
+            return {}
+
+        return app
+
+    @pytest.mark.asyncio
+    async def test_only_listed_status_codes_count(self, app, fake_redis):
+        """Test successful requests are not counted when status_codes is set"""
+        limiter = RateLimiterMiddleware(app, router=app.router)
+        async with make_client(limiter) as client:
+            for _ in range(3):
+                assert (await client.post("/api/login?password=secret")).status_code == 200
+        assert fake_redis.script_calls == 0
+
+    @pytest.mark.asyncio
+    async def test_request_reaching_limit_is_replaced_with_429(self, app, fake_redis):
+        """Test the request that reaches the limit is answered with 429 and the IP is blocked"""
+        limiter = RateLimiterMiddleware(app, router=app.router)
+        async with make_client(limiter) as client:
+            assert (await client.post("/api/login?password=wrong")).status_code == 401
+            blocked = await client.post("/api/login?password=wrong")
+            assert blocked.status_code == 429
+            assert blocked.json()["code"] == 429
+            # Blocked before the app runs, even with the right password
+            assert (await client.post("/api/login?password=secret")).status_code == 429
+
+        assert "block:api:203.0.113.7:POST /api/login" in fake_redis.values
+        assert "fail:api:203.0.113.7:POST /api/login" not in fake_redis.values
+        assert fake_redis.script_calls == 2
+
+    @pytest.mark.asyncio
+    async def test_success_clears_counter(self, app, fake_redis):
+        """Test clear_on_success resets the count after a 2xx response"""
+        limiter = RateLimiterMiddleware(app, router=app.router)
+        async with make_client(limiter) as client:
+            assert (await client.post("/api/login?password=wrong")).status_code == 401
+            assert (await client.post("/api/login?password=secret")).status_code == 200
+            assert (await client.post("/api/login?password=wrong")).status_code == 401
+        assert fake_redis.values["fail:api:203.0.113.7:POST /api/login"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_block_is_reported(self, fake_redis):
+        """Test a request finishing after another one blocked the IP is rejected"""
+        limiter = RateLimiterMiddleware(ok_app)
+        fake_redis.values["block:api:203.0.113.7:POST /api/login"] = 1
+        config = {"limit": (2, 60), "status_codes": None, "clear_on_success": False}
+        assert await limiter._count_response(fake_redis, "203.0.113.7", "POST /api/login", config, 401) is True
+        assert "fail:api:203.0.113.7:POST /api/login" not in fake_redis.values
+
+    @pytest.mark.asyncio
+    async def test_script_registered_once_per_client(self):
+        """Test the script is registered once and again only for a new Redis client"""
+        limiter = RateLimiterMiddleware(ok_app)
+        first, second = FakeRedis(), FakeRedis()
+        assert limiter._get_count_script(first) is limiter._get_count_script(first)
+        limiter._get_count_script(second)
+        assert (first.registered_scripts, second.registered_scripts) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_redis_unavailable_fails_open(self, app, fake_redis):
+        """Test requests are served when the block check cannot reach Redis"""
+        def unavailable(command, *args, **kwargs):
+            command.close()
+            raise RedisUnavailableError("breaker open")
+
+        limiter = RateLimiterMiddleware(app, router=app.router)
+        with patch("middleware.rate_limiter.redis_call", side_effect=unavailable):
+            async with make_client(limiter) as client:
+                for _ in range(3):
+                    assert (await client.post("/api/login?password=wrong")).status_code == 401
+
+
+class TestLocalCount:
+    """Test the default limit is counted per worker and synced to Redis in batches"""
+
+    @pytest.fixture
+    def limits(self, monkeypatch):
+        monkeypatch.setattr("middleware.rate_limiter.RATE_LIMIT", 20)
+        monkeypatch.setattr("middleware.rate_limiter.LOCAL_SYNC_BATCH", 5)
+        monkeypatch.setattr("middleware.rate_limiter.LOCAL_SYNC_INTERVAL_SECONDS", 60)
+        monkeypatch.setattr("middleware.rate_limiter.LOCAL_THRESHOLD", 0.8)
+
+    @pytest.mark.asyncio
+    async def test_requests_sync_in_batches(self, limits, fake_redis):
+        """Test the first request syncs and later ones are flushed once per batch"""
+        limiter = RateLimiterMiddleware(ok_app)
+        async with make_client(limiter) as client:
+            for _ in range(6):
+                assert (await client.get("/api/items")).status_code == 200
+        assert fake_redis.script_calls == 2
+        assert fake_redis.values["fail:api:203.0.113.7:*"] == 6
+
+    @pytest.mark.asyncio
+    async def test_every_request_syncs_past_threshold(self, limits, fake_redis):
+        """Test requests sync one by one near the limit and the limit blocks exactly"""
+        limiter = RateLimiterMiddleware(ok_app)
+        async with make_client(limiter) as client:
+            statuses = [(await client.get("/api/items")).status_code for _ in range(20)]
+            calls_at_limit = fake_redis.script_calls
+            assert (await client.get("/api/items")).status_code == 429
+
+        assert statuses == [200] * 19 + [429]
+        # Counts 16 to 20 pass the 0.8 threshold and sync one by one
+        assert fake_redis.values["block:api:203.0.113.7:*"] == 1
+        assert calls_at_limit >= 5
+        # The block is served from the local cache
+        assert fake_redis.script_calls == calls_at_limit
+
+    @pytest.mark.asyncio
+    async def test_sync_interval_flushes_pending(self, limits, monkeypatch, fake_redis):
+        """Test a stale local count syncs even before the batch is full"""
+        monkeypatch.setattr("middleware.rate_limiter.LOCAL_SYNC_INTERVAL_SECONDS", 0)
+        limiter = RateLimiterMiddleware(ok_app)
+        async with make_client(limiter) as client:
+            for _ in range(3):
+                await client.get("/api/items")
+        assert fake_redis.script_calls == 3
+
+    @pytest.mark.asyncio
+    async def test_pending_count_survives_redis_outage(self, limits, monkeypatch):
+        """Test requests admitted while Redis is down are flushed with the next sync"""
+        monkeypatch.setattr("middleware.rate_limiter.LOCAL_SYNC_INTERVAL_SECONDS", 0)
+        redis = FakeRedis()
+        limiter = RateLimiterMiddleware(ok_app)
+        limit = (20, 60)
+
+        def unavailable(command, *args, **kwargs):
+            command.close()
+            raise RedisUnavailableError("breaker open")
+
+        with patch("middleware.rate_limiter.redis_call", side_effect=unavailable):
+            for _ in range(3):
+                assert await limiter._check_local_limit(redis, "203.0.113.7", "*", limit) is False
+        assert await limiter._check_local_limit(redis, "203.0.113.7", "*", limit) is False
+        assert redis.values["fail:api:203.0.113.7:*"] == 4
+
+    def test_local_counts_are_bounded(self, monkeypatch):
+        """Test expired counters are evicted once LOCAL_MAX_KEYS is reached"""
+        monkeypatch.setattr("middleware.rate_limiter.LOCAL_MAX_KEYS", 2)
+        limiter = RateLimiterMiddleware(ok_app)
+        now = time.monotonic()
+        live = limiter._get_local_count("198.51.100.1:*", now)
+        live.expires_at = now + 60
+        limiter._get_local_count("198.51.100.2:*", now)
+        limiter._get_local_count("198.51.100.3:*", now)
+        assert set(limiter._local_counts) == {"198.51.100.1:*", "198.51.100.3:*"}
+
+
+class TestCpuBudget:
+    """Test expensive routes drain the per-IP CPU budget and cap hashing concurrency"""
+
+    @pytest.fixture
+    def app(self):
+        app = FastAPI()
+
+        @app.post("/api/login")
+        @rate_limit(None)
+        @request_cost(40, hashing=True)
+        async def login():
+            return {}
+
+        @app.get("/api/items")
+        @rate_limit(None)
+        async def list_items():
+            return {}
+
+        return app
+
+    @pytest.mark.asyncio
+    async def test_budget_blocks_ip_once_spent(self, app, fake_redis):
+        """Test the request that exhausts the budget is rejected and the IP stays blocked"""
+        limiter = RateLimiterMiddleware(app, router=app.router)
+        async with make_client(limiter) as client:
+            statuses = [(await client.post("/api/login")).status_code for _ in range(4)]
+            # Routes without a cost are not charged
+            assert (await client.get("/api/items")).status_code == 200
+
+        # Default budget of 100: 40 + 40 pass, the third request reaches 120
+        assert statuses == [200, 200, 429, 429]
+        assert fake_redis.values["block:cpu:203.0.113.7"] == 1
+        assert fake_redis.script_calls == 4
+
+    @pytest.mark.asyncio
+    async def test_budget_fails_open_without_redis(self, app, fake_redis):
+        """Test the budget is skipped when Redis is unavailable"""
+        def unavailable(command, *args, **kwargs):
+            command.close()
+            raise RedisUnavailableError("breaker open")
+
+        limiter = RateLimiterMiddleware(app, router=app.router)
+        with patch("middleware.rate_limiter.redis_call", side_effect=unavailable):
+            async with make_client(limiter) as client:
+                for _ in range(4):
+                    assert (await client.post("/api/login")).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_hashing_concurrency_cap(self, monkeypatch, fake_redis):
+        """Test hashing requests beyond PASSWORD_HASH_MAX_CONCURRENCY get 503 with Retry-After"""
+        monkeypatch.setattr("middleware.rate_limiter.HASH_MAX_CONCURRENCY", 1)
+        started = asyncio.Event()
+        release = asyncio.Event()
+        app = FastAPI()
+
+        @app.post("/api/login")
+        @rate_limit(None)
+        @request_cost(1, hashing=True)
+        async def login():
+            started.set()
+            await release.wait()
+            return {}
+
+        limiter = RateLimiterMiddleware(app, router=app.router)
+        async with make_client(limiter) as client:
+            first = asyncio.create_task(client.post("/api/login"))
+            await started.wait()
+            busy = await client.post("/api/login")
+            release.set()
+            assert (await first).status_code == 200
+            assert (await client.post("/api/login")).status_code == 200
+
+        assert busy.status_code == 503
+        assert busy.headers["Retry-After"] == "1"
+        assert limiter._hashing_in_flight == 0
@@ -0,0 +1,137 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from middleware.request_logging import AccessLogSummary, RequestLoggingMiddleware, _RouteStats, UNMATCHED_ROUTE
+from middleware.request_view import get_request_view
+
+
+class FakeRoute:
+    def __init__(self, path):
+        self.path = path
+
+
+def make_scope(path="/api/users", route="/api/users"):
+    scope = {"type": "http", "method": "GET", "path": path, "headers": [], "client": ("203.0.113.7", 50000)}
+    if route:
+        scope["route"] = FakeRoute(route)
+    return scope
+
+
+def make_middleware(summary=None, **overrides) -> RequestLoggingMiddleware:
+    middleware = RequestLoggingMiddleware(None, summary or AccessLogSummary(60, 16))
+    for name, value in overrides.items():
+        setattr(middleware, name, value)
+    middleware._line_budget = float(middleware.max_lines_per_second)
+    return middleware
+
+
+def record(middleware, status_code, duration_ms=5.0, route="/api/users"):
+    scope = make_scope(route=route)
+    middleware.record(scope, get_request_view(scope), status_code, duration_ms)
+
+
+class TestRouteStats:
+    """Test _RouteStats counters and reservoir"""
+
+    def test_reservoir_is_bounded(self):
+        """Test the latency reservoir keeps a fixed number of samples while counting every request"""
+        stats = _RouteStats()
+        for i in range(10000):
+            stats.add(float(i), i % 100 == 0, 64)
+        assert stats.count == 10000
+        assert stats.errors == 100
+        assert len(stats.samples) == 64
+
+    def test_percentiles(self):
+        """Test percentiles of a fully kept sample"""
+        stats = _RouteStats()
+        for i in range(1, 101):
+            stats.add(float(i), False, 1000)
+        assert stats.percentiles(0.50, 0.95, 0.99) == [51.0, 96.0, 100.0]
+
+    def test_percentiles_without_samples(self):
+        """Test an empty reservoir reports no percentiles"""
+        assert _RouteStats().percentiles(0.5) == [None]
+
+
+class TestSampling:
+    """Test which requests get an access line"""
+
+    def test_sample_rate_zero_drops_successes(self):
+        """Test successful requests on a route sampled at zero are only counted"""
+        middleware = make_middleware(sample_rates={"/api/users": 0.0})
+        with patch.object(middleware, "log_access") as log_access:
+            for _ in range(5):
+                record(middleware, 200)
+        log_access.assert_not_called()
+        assert middleware.summary._route_stats["/api/users"].count == 5
+
+    def test_client_errors_are_budgeted(self):
+        """Test 4xx lines are always selected but capped by the line budget"""
+        middleware = make_middleware(max_lines_per_second=2)
+        with patch.object(middleware, "log_access") as log_access:
+            for _ in range(5):
+                record(middleware, 404)
+        assert log_access.call_count == 2
+        assert middleware.summary._route_stats["/api/users"].suppressed == 3
+
+    def test_server_errors_bypass_budget(self):
+        """Test 5xx lines are written even after the line budget is spent"""
+        middleware = make_middleware(max_lines_per_second=1)
+        with patch.object(middleware, "log_access") as log_access:
+            for _ in range(10):
+                record(middleware, 500)
+        assert log_access.call_count == 10
+        assert middleware.summary._route_stats["/api/users"].errors == 10
+
+    def test_slow_requests_bypass_budget(self):
+        """Test slow lines are written even after the line budget is spent"""
+        middleware = make_middleware(max_lines_per_second=1, slow_ms=100, sample_rates={"/api/users": 0.0})
+        with patch.object(middleware, "log_access") as log_access:
+            for _ in range(3):
+                record(middleware, 200, duration_ms=250.0)
+        assert log_access.call_count == 3
+
+    def test_unmatched_paths_share_a_bucket(self):
+        """Test requests without a route are summarized under one key"""
+        middleware = make_middleware()
+        with patch.object(middleware, "log_access"):
+            record(middleware, 404, route=None)
+        assert UNMATCHED_ROUTE in middleware.summary._route_stats
+
+
+class TestAccessLogSummary:
+    """Test AccessLogSummary flushing"""
+
+    def test_flush_writes_one_line_per_route_and_resets(self):
+        """Test a flush logs every route once and starts a new interval"""
+        summary = AccessLogSummary(60, 16)
+        summary.add("/api/users", 10.0, False)
+        summary.add("/api/roles", 20.0, True)
+        with patch("middleware.request_logging.logger") as logger:
+            summary.flush()
+        routes = [call.kwargs["extra"]["route"] for call in logger.info.call_args_list]
+        assert sorted(routes) == ["/api/roles", "/api/users"]
+        assert summary._route_stats == {}
+
+    @pytest.mark.asyncio
+    async def test_timer_flushes_idle_worker(self):
+        """Test the timer flushes the summary without any further request"""
+        summary = AccessLogSummary(0.05, 16)
+        summary.add("/api/users", 10.0, False)
+        with patch("middleware.request_logging.logger") as logger:
+            summary.start()
+            await asyncio.sleep(0.12)
+            await summary.stop()
+        assert logger.info.call_count == 1
+        assert logger.info.call_args.kwargs["extra"]["stats"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_interval_in_progress(self):
+        """Test stopping the timer writes the last partial interval"""
+        summary = AccessLogSummary(60, 16)
+        with patch("middleware.request_logging.logger") as logger:
+            summary.start()
+            summary.add("/api/users", 10.0, False)
+            await summary.stop()
+        assert logger.info.call_count == 1
@@ -0,0 +1,50 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from core.request_timing import record_timing
+from middleware.server_timing import ServerTimingMiddleware
+
+
+def make_app(headers=()):
+    async def app(scope, receive, send):
+        record_timing("db", 0.004)
+        await send({"type": "http.response.start", "status": 200, "headers": list(headers)})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+def make_client(app) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver")
+
+
+class TestServerTimingMiddleware:
+    """Test the Server-Timing response header"""
+
+    @pytest.mark.asyncio
+    async def test_adds_server_timing(self):
+        """Test responses carry the breakdown of the calls made while serving them"""
+        async with make_client(ServerTimingMiddleware(make_app())) as client:
+            response = await client.get("/api/users")
+
+        parts = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+        assert parts == ["db", "app", "total"]
+        assert 'db;dur=4.0;desc="1x"' in response.headers["Server-Timing"]
+        assert "Timing-Allow-Origin" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_timing_allow_origin_follows_cors(self):
+        """Test Timing-Allow-Origin is only added for an origin CORS already allowed"""
+        origin = "http://localhost:3000"
+        app = make_app([(b"access-control-allow-origin", origin.encode())])
+        async with make_client(ServerTimingMiddleware(app)) as client:
+            response = await client.get("/api/users", headers={"Origin": origin})
+
+        assert response.headers["Timing-Allow-Origin"] == origin
+
+    @pytest.mark.asyncio
+    async def test_requests_do_not_share_timings(self):
+        """Test each request starts from an empty breakdown"""
+        async with make_client(ServerTimingMiddleware(make_app())) as client:
+            await client.get("/api/users")
+            response = await client.get("/api/users")
+
+        assert 'db;dur=4.0;desc="1x"' in response.headers["Server-Timing"]
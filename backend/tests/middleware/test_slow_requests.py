@@ -0,0 +1,49 @@
+import pytest
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+from core.slow_requests import slow_request_watchdog
+from middleware.slow_requests import SlowRequestMiddleware
+
+
+def make_client(app) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver")
+
+
+class TestSlowRequestMiddleware:
+    """Test which requests the slow request watchdog watches"""
+
+    @pytest.mark.asyncio
+    async def test_api_request_is_watched(self):
+        """Test regular requests are registered while in flight and removed afterwards"""
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(len(slow_request_watchdog.in_flight))
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        with patch.object(slow_request_watchdog, "_start"):
+            async with make_client(SlowRequestMiddleware(app)) as client:
+                assert (await client.get("/api/users")).status_code == 200
+
+        assert seen == [1]
+        assert slow_request_watchdog.in_flight == {}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("path", [
+        "/healthz",
+        "/metrics",
+        "/api/debug/profile",
+        "/api/debug/memory/tracing",
+        "/api/debug/memory/diff",
+        "/api/debug/slow-requests",
+    ])
+    async def test_health_and_diagnostics_are_not_watched(self, path):
+        """Test health checks and the diagnostics endpoints never reach the watchdog"""
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        with patch.object(slow_request_watchdog, "begin", side_effect=AssertionError("request watched")):
+            async with make_client(SlowRequestMiddleware(app)) as client:
+                assert (await client.get(path)).status_code == 200
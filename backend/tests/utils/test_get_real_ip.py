@@ -0,0 +1,66 @@
+import pytest
+from utils.get_real_ip import TrustedProxyResolver, get_scope_real_ip, REAL_IP_SCOPE_KEY
+
+
+@pytest.fixture
+def resolver():
+    """Resolver trusting loopback and a compose-style proxy network"""
+    return TrustedProxyResolver(["127.0.0.1/32", "::1/128", "10.250.0.0/24"])
+
+
+class TestTrustedProxyResolver:
+    """Test TrustedProxyResolver.resolve"""
+
+    def test_untrusted_peer_ignores_proxy_headers(self, resolver):
+        """Test a direct peer outside the trusted networks cannot choose its IP with headers"""
+        headers = {"x-forwarded-for": "1.2.3.4", "x-real-ip": "5.6.7.8"}
+        assert resolver.resolve(headers, "192.168.1.20") == "192.168.1.20"
+
+    def test_private_lan_peer_is_not_trusted(self, resolver):
+        """Test RFC1918 peers outside the configured networks are not trusted"""
+        assert resolver.resolve({"x-forwarded-for": "1.2.3.4"}, "10.0.0.5") == "10.0.0.5"
+        assert resolver.resolve({"x-forwarded-for": "1.2.3.4"}, "172.16.0.9") == "172.16.0.9"
+
+    def test_spoofed_leftmost_forwarded_for(self, resolver):
+        """Test a client-supplied leftmost entry is ignored in favour of the address nginx saw"""
+        headers = {"x-forwarded-for": "9.9.9.9, 203.0.113.7"}
+        assert resolver.resolve(headers, "10.250.0.3") == "203.0.113.7"
+
+    def test_chain_of_trusted_hops(self, resolver):
+        """Test trusted hops are skipped from the right until the first untrusted address"""
+        headers = {"x-forwarded-for": "9.9.9.9, 203.0.113.7, 127.0.0.1, 10.250.0.8"}
+        assert resolver.resolve(headers, "10.250.0.3") == "203.0.113.7"
+
+    def test_all_hops_trusted(self, resolver):
+        """Test the leftmost hop is the origin when every hop is a trusted proxy"""
+        headers = {"x-forwarded-for": "10.250.0.9, 127.0.0.1"}
+        assert resolver.resolve(headers, "10.250.0.3") == "10.250.0.9"
+
+    def test_malformed_hop_stops_the_walk(self, resolver):
+        """Test nothing left of a malformed hop is trusted"""
+        headers = {"x-forwarded-for": "203.0.113.7, not-an-ip"}
+        assert resolver.resolve(headers, "10.250.0.3") == "10.250.0.3"
+
+    def test_real_ip_from_trusted_peer(self, resolver):
+        """Test X-Real-IP is used from a trusted peer without X-Forwarded-For"""
+        assert resolver.resolve({"x-real-ip": "203.0.113.7"}, "127.0.0.1") == "203.0.113.7"
+
+    def test_missing_client(self, resolver):
+        """Test requests without a peer address resolve to unknown"""
+        assert resolver.resolve({}, None) == "unknown"
+
+
+class TestGetScopeRealIp:
+    """Test get_scope_real_ip"""
+
+    def test_resolves_once_per_scope(self):
+        """Test the resolved IP is stored in the scope and reused"""
+        scope = {"client": ("127.0.0.1", 50000)}
+        assert get_scope_real_ip(scope, {"x-forwarded-for": "203.0.113.7"}) == "203.0.113.7"
+        assert scope[REAL_IP_SCOPE_KEY] == "203.0.113.7"
+        assert get_scope_real_ip(scope, {"x-forwarded-for": "198.51.100.1"}) == "203.0.113.7"
+
+    def test_untrusted_scope_client(self):
+        """Test the peer address is used when it is not a trusted proxy"""
+        scope = {"client": ("198.51.100.1", 50000)}
+        assert get_scope_real_ip(scope, {"x-forwarded-for": "203.0.113.7"}) == "198.51.100.1"
@@ -1,3 +1,4 @@
 # Add new utils imports below.
-from .get_real_ip import get_real_ip
+from .get_real_ip import get_real_ip, resolve_real_ip, get_scope_real_ip
+from .fields import parse_fields
 from .response import APIResponse, parse_responses, common_responses
\ No newline at end of file
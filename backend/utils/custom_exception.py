@@ -21,13 +21,14 @@ class BaseServiceException(Exception):
             self.log_level = log_level
         
         log_msg = f"[{self.error_code}] | {self.message}"
+        log_extra = {"event": "error", "error_code": self.error_code}
 
         if self.log_level == "error":
-            logger.error(log_msg)
+            logger.error(log_msg, extra=log_extra)
         elif self.log_level == "warning":
-            logger.warning(log_msg)
+            logger.warning(log_msg, extra=log_extra)
         else:
-            logger.info(log_msg)
+            logger.info(log_msg, extra=log_extra)
         super().__init__(self.message)
 
 class ServerException(BaseServiceException):
@@ -68,4 +69,9 @@ class ConflictException(BaseServiceException):
 class TokenException(BaseServiceException):
     """Token related exceptions"""
     def __init__(self, message: str = "Token error", details: Dict[str, Any] = None):
-        super().__init__(message=message, error_code="TOKEN_ERROR", details=details, status_code=401, log_level="warning")
\ No newline at end of file
+        super().__init__(message=message, error_code="TOKEN_ERROR", details=details, status_code=401, log_level="warning")
+
+class PayloadTooLargeException(BaseServiceException):
+    """Request body or row count over the allowed limit"""
+    def __init__(self, message: str = "Payload too large", details: Dict[str, Any] = None):
+        super().__init__(message=message, error_code="PAYLOAD_TOO_LARGE", details=details, status_code=413, log_level="warning")
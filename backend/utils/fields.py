@@ -0,0 +1,29 @@
+from typing import Iterable, List, Optional
+from utils.custom_exception import ValidationException
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], required: Iterable[str] = ("id",)) -> Optional[List[str]]:
+    """
+    Parse a comma separated `fields` query parameter into a column list
+
+    Args:
+        fields: Raw query value (e.g. "email,first_name"), None or empty means all fields
+        allowed: Field names that can be requested
+        required: Field names that are always returned
+
+    Returns:
+        Optional[List[str]]: Requested fields in declaration order, or None for all fields
+    """
+    if not fields:
+        return None
+
+    allowed = list(allowed)
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValidationException(
+            f"Unknown fields: {', '.join(sorted(unknown))}",
+            details={"allowed_fields": allowed}
+        )
+
+    requested.update(required)
+    return [field for field in allowed if field in requested]
@@ -1,29 +1,95 @@
+from functools import lru_cache
 from fastapi import Request
+from core.config import settings
+from starlette.types import Scope
+from typing import Iterable, Mapping, Optional
+from ipaddress import ip_address, ip_network
 
-def get_real_ip(request: Request) -> str:
+REAL_IP_SCOPE_KEY = "real_ip"
+
+class TrustedProxyResolver:
+    """
+    Resolve the client IP behind a chain of trusted proxies.
+
+    Proxy headers are only honoured when the direct peer is a trusted proxy.
+    X-Forwarded-For is then walked from the right, skipping trusted hops, and the
+    first untrusted address is the client; entries further left are client-supplied
+    and ignored, so a spoofed header cannot change the resolved IP.
+    """
+    def __init__(self, trusted_proxies: Iterable[str]):
+        self.networks = tuple(ip_network(cidr, strict=False) for cidr in trusted_proxies)
+        self.is_trusted = lru_cache(maxsize=4096)(self._is_trusted)
+
+    def _is_trusted(self, ip: str) -> bool:
+        try:
+            address = ip_address(ip)
+        except ValueError:
+            return False
+        return any(address in network for network in self.networks)
+
+    def resolve(self, headers: Mapping[str, str], client_host: Optional[str]) -> str:
+        if not client_host:
+            return "unknown"
+        if not self.is_trusted(client_host):
+            return client_host
+
+        forwarded_for = headers.get("x-forwarded-for")
+        if forwarded_for:
+            hops = [hop.strip() for hop in forwarded_for.split(",")]
+            for hop in reversed(hops):
+                try:
+                    ip_address(hop)
+                except ValueError:
+                    # Malformed hop: do not trust anything to its left
+                    return client_host
+                if not self.is_trusted(hop):
+                    return hop
+            # Every hop is a trusted proxy, so the leftmost one is the origin
+            return hops[0]
+
+        real_ip = headers.get("x-real-ip")
+        if real_ip:
+            return real_ip.strip()
+
+        return client_host
+
+trusted_proxy_resolver = TrustedProxyResolver(settings.TRUSTED_PROXIES)
+
+def resolve_real_ip(headers: Mapping[str, str], client_host: Optional[str]) -> str:
     """
-    Get the real client IP address, prioritizing proxy headers
+    Resolve the real client IP address from request headers and the peer address
     
-    Priority order:
-    1. X-Forwarded-For (takes first IP, usually the original client)
+    Priority order (only when client_host is a trusted proxy):
+    1. X-Forwarded-For (rightmost address that is not a trusted proxy)
     2. X-Real-IP (real IP set by nginx)
-    3. request.client.host (direct connection IP)
+    3. client_host (direct connection IP)
     
     Args:
-        request: FastAPI request object
+        headers: Request headers (lower-cased names)
+        client_host: Direct connection IP, if known
         
     Returns:
         str: Real client IP address
     """
-    # First try X-Forwarded-For
-    forwarded_for = request.headers.get("x-forwarded-for")
-    if forwarded_for:
-        return forwarded_for.split(",")[0].strip()
-    
-    # Then try X-Real-IP
-    real_ip = request.headers.get("x-real-ip")
-    if real_ip:
-        return real_ip.strip()
+    return trusted_proxy_resolver.resolve(headers, client_host)
+
+def get_scope_real_ip(scope: Scope, headers: Mapping[str, str]) -> str:
+    """Return the client IP stored in the ASGI scope, resolving and storing it on first use"""
+    real_ip = scope.get(REAL_IP_SCOPE_KEY)
+    if real_ip is None:
+        client = scope.get("client")
+        real_ip = scope[REAL_IP_SCOPE_KEY] = resolve_real_ip(headers, client[0] if client else None)
+    return real_ip
+
+def get_real_ip(request: Request) -> str:
+    """
+    Get the real client IP address, prioritizing trusted proxy headers.
+    The result is shared through the ASGI scope, so it is resolved once per request.
     
-    # Fallback to direct connection IP
-    return request.client.host if request.client else "unknown"
\ No newline at end of file
+    Args:
+        request: FastAPI request object
+        
+    Returns:
+        str: Real client IP address
+    """
+    return get_scope_real_ip(request.scope, request.headers)
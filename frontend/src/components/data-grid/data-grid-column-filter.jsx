@@ -22,13 +22,15 @@ function DataGridColumnFilter(
     column,
     title,
     options,
+    counts,
     className,
     buttonClassName,
     popoverClassName
   }
 ) {
   const { t } = useTranslation();
-  const facets = column?.getFacetedUniqueValues();
+  // Server-side counts (Map of value -> count) take precedence over the loaded rows
+  const facets = counts ?? column?.getFacetedUniqueValues();
   const selectedValues = new Set(column?.getFilterValue());
 
   // Store filter options in column meta for tooltip display (set immediately, not just in useEffect)
@@ -37,11 +37,21 @@ import {
  * @param {boolean} params.enableSelection - Whether selection mode is enabled
  * @param {Array} params.roles - List of roles
  * @param {boolean} params.canManageUsers - Whether user has manage-users permission
+ * @param {Object} params.facets - User counts per status and role from the facets API
  * @returns {Array} Column definitions array
  */
-export function useUsersTableColumns({ t, handleEdit, handleDelete, handleResetPassword, enableSelection, roles, canManageUsers = false }) {
+export function useUsersTableColumns({ t, handleEdit, handleDelete, handleResetPassword, enableSelection, roles, canManageUsers = false, facets = null }) {
   const { i18n } = useTranslation();
 
+  const roleCounts = React.useMemo(
+    () => (facets?.role ? new Map(facets.role.map((facet) => [facet.value, facet.count])) : undefined),
+    [facets]
+  );
+  const statusCounts = React.useMemo(
+    () => (facets?.status ? new Map(facets.status.map((facet) => [facet.value, facet.count])) : undefined),
+    [facets]
+  );
+
   return React.useMemo(
     () => {
       const baseColumns = [];
@@ -155,6 +165,7 @@ export function useUsersTableColumns({ t, handleEdit, handleDelete, handleResetP
                       value: role.name || role,
                       label: role.name || role,
                     }))}
+                    counts={roleCounts}
                   />
                 ) : undefined
               }
@@ -194,6 +205,7 @@ export function useUsersTableColumns({ t, handleEdit, handleDelete, handleResetP
                     column={column}
                     title={t("pages.usersManagement.fields.status.label", "Status")}
                     options={statusFilterOptions}
+                    counts={statusCounts}
                   />
                 }
               />
@@ -329,6 +341,6 @@ export function useUsersTableColumns({ t, handleEdit, handleDelete, handleResetP
       }
       return baseColumns;
     },
-    [t, handleEdit, handleDelete, handleResetPassword, enableSelection, roles, i18n.language, canManageUsers]
+    [t, handleEdit, handleDelete, handleResetPassword, enableSelection, roles, i18n.language, canManageUsers, roleCounts, statusCounts]
   );
 }
\ No newline at end of file
@@ -33,6 +33,7 @@ export function UsersTable() {
   }, [currentUserId, currentUser]);
   const [searchParams, setSearchParams] = useSearchParams();
   const [data, setData] = React.useState([]);
+  const [facets, setFacets] = React.useState(null);
   const [isLoading, setIsLoading] = React.useState(true);
   const [pagination, setPagination] = React.useState({
     total: 0,
@@ -168,6 +169,16 @@ export function UsersTable() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  // Fetch filter counts for the current keyword (cached server-side)
+  const fetchFacets = React.useCallback(async (keyword = '') => {
+    const facetParams = keyword && keyword.trim() ? { keyword: keyword.trim() } : {};
+    const response = await usersService.getUserFacets(facetParams, { returnStatus: true });
+
+    if (response.status === "success" && response.data) {
+      setFacets(response.data);
+    }
+  }, []);
+
   // Fetch users data from API
   const fetchUsers = React.useCallback(async (params = {}) => {
     setIsLoading(true);
@@ -206,6 +217,7 @@ export function UsersTable() {
       apiParams.desc = desc;
     }
 
+    fetchFacets(keyword);
     const response = await usersService.getAllUsers(apiParams, { returnStatus: true });
 
     if (response.status === "success" && response.data) {
@@ -225,7 +237,7 @@ export function UsersTable() {
     }
 
     setIsLoading(false);
-  }, []);
+  }, [fetchFacets]);
 
   // Open edit dialog for user
   const handleEdit = React.useCallback((user) => {
@@ -344,6 +356,7 @@ export function UsersTable() {
     enableSelection,
     roles,
     canManageUsers,
+    facets,
   });
 
   // Open create user dialog
@@ -16,6 +16,14 @@ export const usersService = {
       ...config,
     }),
 
+  // Get user counts per status and role for the current keyword
+  getUserFacets: (params = {}, config = {}) =>
+    apiService.get(`${USERS_BASE}/facets`, params, {
+      showErrorToast: false,
+      showSuccessToast: false,
+      ...config,
+    }),
+
   // Create user
   createUser: (userData, config = {}) => 
     apiService.post(`${USERS_BASE}`, userData, {